@@ -1,5 +1,8 @@
 from flask import Flask
 import os
+import time
 
+# When the package was first imported, so the time taken to load the API can be measured where it is served
+started = time.time()
 app = Flask(__name__)
 app.config.from_object(os.getenv('SETTINGS'))
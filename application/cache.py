@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+class TTLCache(object):
+    """Thread-safe least recently used cache whose entries expire after a time to live (seconds)
+
+    When weigh is given max_size bounds the total weight of the entries, as returned by weigh(value), rather than their
+    number, so the cache can be bounded by memory.
+    """
+
+    def __init__(self, max_size, ttl, weigh=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.weigh = weigh
+        self.counters = Counter()
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return cached value for key, or default if it is missing or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return default
+            expires, value, weight = entry
+            if expires <= time.monotonic():
+                self._remove(key)
+                self.counters['expirations'] += 1
+                self.counters['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Cache value for key, evicting least recently used entries beyond max size
+        """
+        ttl = self.ttl if ttl is None else ttl
+        weight = self.weigh(value) if self.weigh else 1
+        if ttl <= 0 or weight > self.max_size:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, weight)
+            self._weight += weight
+            while self._weight > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.counters['evictions'] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._weight -= entry[2]
+        return entry
+
+    def invalidate(self, key):
+        """Remove key from the cache if present
+        """
+        with self._lock:
+            if self._remove(key) is not None:
+                self.counters['invalidations'] += 1
+
+    def invalidate_where(self, predicate):
+        """Remove every key for which predicate(key) is true
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Hit, miss, expiry, eviction and invalidation counters along with hit ratio, current size and weight
+        """
+        with self._lock:
+            stats = {name: self.counters[name] for name in ('hits', 'misses', 'expirations', 'evictions', 'invalidations')}
+            stats['size'] = len(self._entries)
+            stats['weight'] = self._weight
+        lookups = stats['hits'] + stats['misses']
+        stats['hit-ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
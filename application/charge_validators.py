@@ -1,5 +1,6 @@
+from collections import namedtuple
+
 from application import register_utils, app
-import jsonschema
 
 
 LAND_COMP_ACT_S8 = '{} {} {}'.format(app.config['LAND_COMP_ACT_S8_INSTRUMENT'],
@@ -8,69 +9,109 @@ LAND_COMP_ACT_S8 = '{} {} {}'.format(app.config['LAND_COMP_ACT_S8_INSTRUMENT'],
 LAND_COMP_ACT_S52 = '{} {} {}'.format(app.config['LAND_COMP_ACT_S52_INSTRUMENT'],
                                       app.config['LAND_COMP_ACT_S52_YEAR'],
                                       app.config['LAND_COMP_ACT_S52_PROVISION'])
+S8_DEFINITION = "local-land-charge.json#/definitions/land-compensation-charge-s8"
+S52_DEFINITION = "local-land-charge.json#/definitions/land-compensation-charge-s52"
+PROVISION_FIELDS = ('statutory-instrument', 'year', 'provision')
+
+
+def provision_key(instrument, year, provision):
+    """Normalised (instrument, year, provision) key of a statutory provision
+    """
+    return tuple(' '.join(str(value).split()).lower() for value in (instrument, year, provision))
+
+
+# Statutory provisions with their own validation rules, indexed by normalised key
+PROVISION_RULES = {
+    provision_key(app.config['LAND_COMP_ACT_S8_INSTRUMENT'], app.config['LAND_COMP_ACT_S8_YEAR'],
+                  app.config['LAND_COMP_ACT_S8_PROVISION']): "s8",
+    provision_key(app.config['LAND_COMP_ACT_S52_INSTRUMENT'], app.config['LAND_COMP_ACT_S52_YEAR'],
+                  app.config['LAND_COMP_ACT_S52_PROVISION']): "s52"
+}
+
+ClassifiedProvision = namedtuple('ClassifiedProvision', ['curie', 'record', 'error', 'valid', 'rule'])
+
+
+class ProvisionClassification(object):
+    """Statutory provisions of a charge, each retrieved and classified against PROVISION_RULES once, when first needed
+
+    Iterating again replays the classified provisions, so every validator shares the same retrievals.
+    """
+
+    def __init__(self, curies):
+        self.curies = curies
+        self._classified = []
+
+    def __iter__(self):
+        for index, curie in enumerate(self.curies):
+            if index == len(self._classified):
+                self._classified.append(classify_provision(curie))
+            yield self._classified[index]
+
+
+def classify_provision(curie):
+    """Retrieve statutory provision and find the rule, if any, that applies to it
+    """
+    error = None
+    try:
+        record = register_utils.retrieve_curie(curie)
+    except Exception as e:
+        error = str(e)
+        record = None
+    valid = bool(record) and any(field in record for field in PROVISION_FIELDS)
+    rule = None
+    if valid and all(field in record for field in PROVISION_FIELDS):
+        rule = PROVISION_RULES.get(provision_key(*(record[field] for field in PROVISION_FIELDS)))
+    return ClassifiedProvision(curie, record, error, valid, rule)
+
+
+def classify_provisions(json_payload):
+    """Classification of the payload's statutory provisions, shared by all validators in the validation scope
+    """
+    return register_utils.scoped_value(('statutory-provisions', id(json_payload)),
+                                       lambda: ProvisionClassification(json_payload.get('statutory-provisions') or []))
+
+
+def statutory_provision_curies(sub_domain, end_point, end_point_pattern, method, json_payload):
+    """Curies of the statutory provisions needed by the charge validators
+    """
+    stat_provs = json_payload.get('statutory-provisions')
+    if not isinstance(stat_provs, list):
+        return []
+    return [stat_prov for stat_prov in stat_provs if isinstance(stat_prov, str)]
 
 
 def validate_s8_compensation_charge(sub_domain, end_point, end_point_pattern, method, json_payload):
     """Additional validation for s8 compensation charge
     """
-    try:
-        jsonschema.validate(json_payload, {"$ref": "local-land-charge.json#/definitions/land-compensation-charge-s8"},
-                            resolver=register_utils.RELATIVE_RESOLVER)
-        s8_schema = True
-    except jsonschema.ValidationError as e:
-        s8_schema = False
-    s8_provision = False
-    errors = []
-    if 'statutory-provisions' in json_payload:
-        for stat_prov in json_payload['statutory-provisions']:
-            try:
-                record = register_utils.retrieve_curie(stat_prov)
-            except Exception as e:
-                errors.append(str(e))
-                record = None
-            if not record:
-                errors.append("Failed to retrieve statutory provision '{}' for {} validation".format(stat_prov, LAND_COMP_ACT_S8))
-            elif 'provision' not in record and 'statutory-instrument' not in record and 'year' not in record:
-                errors.append("Invalid statutory provision '{}' for {} validation".format(stat_prov, LAND_COMP_ACT_S8))
-            elif '{} {} {}'.format(record['statutory-instrument'], record['year'], record['provision']).lower() == LAND_COMP_ACT_S8.lower():
-                s8_provision = True
-                break
-    if s8_provision and not s8_schema:
-        errors.append("Charges with {} provision must conform to land-compensation-charge-s8 definition".format(LAND_COMP_ACT_S8))
-    elif not s8_provision and s8_schema:
-        errors.append("Charges which conform to land-compensation-charge-s8 definition must contain {} provision".format(LAND_COMP_ACT_S8))
-    return {'errors': errors}
+    return validate_compensation_charge(json_payload, "s8", LAND_COMP_ACT_S8, S8_DEFINITION, "land-compensation-charge-s8")
 
 
 def validate_s52_compensation_charge(sub_domain, end_point, end_point_pattern, method, json_payload):
     """Additional validation for s52 compensation charge
     """
-    try:
-        jsonschema.validate(json_payload, {"$ref": "local-land-charge.json#/definitions/land-compensation-charge-s52"},
-                            resolver=register_utils.RELATIVE_RESOLVER)
-        s52_schema = True
-    except jsonschema.ValidationError as e:
-        s52_schema = False
-    s52_provision = False
+    return validate_compensation_charge(json_payload, "s52", LAND_COMP_ACT_S52, S52_DEFINITION, "land-compensation-charge-s52")
+
+
+def validate_compensation_charge(json_payload, rule, provision_name, definition, definition_name):
+    """Check a charge has the given rule's provision if and only if it conforms to the rule's schema definition
+    """
+    schema = register_utils.SCHEMA_REGISTRY.definition_validator(definition).is_valid(json_payload)
+    has_provision = False
     errors = []
-    if 'statutory-provisions' in json_payload:
-        for stat_prov in json_payload['statutory-provisions']:
-            try:
-                record = register_utils.retrieve_curie(stat_prov)
-            except Exception as e:
-                errors.append(str(e))
-                record = None
-            if not record:
-                errors.append("Failed to retrieve statutory provision '{}' for {} validation".format(stat_prov, LAND_COMP_ACT_S52))
-            elif 'provision' not in record and 'statutory-instrument' not in record and 'year' not in record:
-                errors.append("Invalid statutory provision '{}' for {} validation".format(stat_prov, LAND_COMP_ACT_S52))
-            elif '{} {} {}'.format(record['statutory-instrument'], record['year'], record['provision']).lower() == LAND_COMP_ACT_S52.lower():
-                s52_provision = True
-                break
-    if s52_provision and not s52_schema:
-        errors.append("Charges with {} provision must conform to land-compensation-charge-s52 definition".format(LAND_COMP_ACT_S52))
-    elif not s52_provision and s52_schema:
-        errors.append("Charges which conform to land-compensation-charge-s52 definition must contain {} provision".format(LAND_COMP_ACT_S52))
+    for provision in classify_provisions(json_payload):
+        if provision.error:
+            errors.append(provision.error)
+        if not provision.record:
+            errors.append("Failed to retrieve statutory provision '{}' for {} validation".format(provision.curie, provision_name))
+        elif not provision.valid:
+            errors.append("Invalid statutory provision '{}' for {} validation".format(provision.curie, provision_name))
+        elif provision.rule == rule:
+            has_provision = True
+            break
+    if has_provision and not schema:
+        errors.append("Charges with {} provision must conform to {} definition".format(provision_name, definition_name))
+    elif not has_provision and schema:
+        errors.append("Charges which conform to {} definition must contain {} provision".format(definition_name, provision_name))
     return {'errors': errors}
 
 
@@ -86,30 +127,27 @@ def validate_statutory_provisions(sub_domain, end_point, end_point_pattern, meth
     """Additional checks for the statutory provisions
     """
     errors = []
-    if 'statutory-provisions' in json_payload and json_payload['statutory-provisions']:
-        for stat_prov in json_payload['statutory-provisions']:
+    for provision in classify_provisions(json_payload):
+        stat_prov = provision.curie
+        if provision.error:
+            errors.append(provision.error)
+        if not provision.record:
+            errors.append("Failed to retrieve statutory provision '{}' for statutory provision validation".format(stat_prov))
+        elif not provision.valid:
+            errors.append("Invalid statutory provision '{}' for statutory provision validation".format(stat_prov))
+        elif method.lower() == 'post' and 'end-date' in provision.record and provision.record['end-date']:
+            errors.append("New charges cannot use archived statutory provision '{}'".format(stat_prov))
+        elif method.lower() == 'put' and 'end-date' in provision.record and provision.record['end-date']:
             try:
-                record = register_utils.retrieve_curie(stat_prov)
+                pri_id = register_utils.REGISTER_INFO[sub_domain]['primary-id']
+                record = register_utils.retrieve_curie("{}:{}".format(sub_domain, json_payload[pri_id]), fresh=True)
             except Exception as e:
                 errors.append(str(e))
                 record = None
             if not record:
-                errors.append("Failed to retrieve statutory provision '{}' for statutory provision validation".format(stat_prov))
-            elif 'provision' not in record and 'statutory-instrument' not in record and 'year' not in record:
-                errors.append("Invalid statutory provision '{}' for statutory provision validation".format(stat_prov))
-            elif method.lower() == 'post' and 'end-date' in record and record['end-date']:
-                errors.append("New charges cannot use archived statutory provision '{}'".format(stat_prov))
-            elif method.lower() == 'put' and 'end-date' in record and record['end-date']:
-                try:
-                    pri_id = register_utils.REGISTER_INFO[sub_domain]['primary-id']
-                    record = register_utils.retrieve_curie("{}:{}".format(sub_domain, json_payload[pri_id]))
-                except Exception as e:
-                    errors.append(str(e))
-                    record = None
-                if not record:
-                    errors.append("Could not retrieve record '{}:{}' for statutory provision validation".format(sub_domain, json_payload[pri_id]))
-                elif 'statutory-provisions' not in record or stat_prov not in record['statutory-provisions']:
-                    errors.append("Cannot add archived statutory provision '{}'".format(stat_prov))
+                errors.append("Could not retrieve record '{}:{}' for statutory provision validation".format(sub_domain, json_payload[pri_id]))
+            elif 'statutory-provisions' not in record or stat_prov not in record['statutory-provisions']:
+                errors.append("Cannot add archived statutory provision '{}'".format(stat_prov))
     return {'errors': errors}
 
 
@@ -120,7 +158,7 @@ def validate_registration_date(sub_domain, end_point, end_point_pattern, method,
     if method.lower() == 'put':
         try:
             pri_id = register_utils.REGISTER_INFO[sub_domain]['primary-id']
-            record = register_utils.retrieve_curie("{}:{}".format(sub_domain, json_payload[pri_id]))
+            record = register_utils.retrieve_curie("{}:{}".format(sub_domain, json_payload[pri_id]), fresh=True)
         except Exception as e:
             errors.append(str(e))
             record = None
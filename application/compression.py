@@ -0,0 +1,93 @@
+import gzip
+import io
+import json
+import zlib
+
+from flask import request
+
+from application import app
+
+
+# Statuses whose responses have no body to compress
+NO_BODY_STATUSES = (204, 304)
+
+
+def accepts_gzip():
+    """Whether the request's 'Accept-Encoding' allows a gzip response
+    """
+    return request.accept_encodings['gzip'] > 0
+
+
+def gzip_chunks(chunks, level):
+    """Gzip compress an iterable of byte or text chunks as it is consumed, flushing after each chunk so it is sent promptly
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def compress_response(response):
+    """Gzip encode the response when the client accepts it and the body is streamed or at least COMPRESS_MIN_SIZE bytes
+    """
+    if not app.config['COMPRESS_RESPONSES'] or request.method == 'HEAD' or response.status_code in NO_BODY_STATUSES:
+        return response
+    if 'Content-Encoding' in response.headers or response.status_code < 200:
+        return response
+    response.vary.add('Accept-Encoding')
+    if not accepts_gzip():
+        return response
+    if response.is_streamed:
+        response.response = gzip_chunks(response.response, app.config['COMPRESS_LEVEL'])
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(gzip.compress(data, app.config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The compressed body is a different representation of the same content, so only a weak tag still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+class DecompressRequestMiddleware(object):
+    """WSGI middleware decoding gzip request bodies, so views read them as if they were sent uncompressed
+
+    Bodies that are not valid gzip, or that decompress to more than max_size bytes, are rejected with 400.
+    """
+
+    def __init__(self, wsgi_app, max_size):
+        self.wsgi_app = wsgi_app
+        self.max_size = max_size
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding not in ('gzip', 'x-gzip'):
+            return self.wsgi_app(environ, start_response)
+        try:
+            body = self.decompress(environ['wsgi.input'], int(environ.get('CONTENT_LENGTH') or 0))
+        except (ValueError, zlib.error, EOFError) as e:
+            app.logger.warn("Invalid gzip request body: {}".format(str(e)))
+            body = json.dumps({"errors": ["invalid gzip request body: {}".format(str(e))]}).encode('utf-8')
+            start_response('400 BAD REQUEST', [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+            return [body]
+        environ = dict(environ)
+        del environ['HTTP_CONTENT_ENCODING']
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+        return self.wsgi_app(environ, start_response)
+
+    def decompress(self, stream, length):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = decompressor.decompress(stream.read(length) if length else stream.read(), self.max_size + 1)
+        if len(body) > self.max_size:
+            raise ValueError("decompressed body is larger than {} bytes".format(self.max_size))
+        if not decompressor.eof:
+            raise EOFError("compressed body is incomplete")
+        return body
@@ -9,6 +9,105 @@ class Config(object):
     FIL_API_URI = os.getenv('FIL_API_URI', 'further-information-location.data.gov:5001')
     SP_API_URI = os.getenv('SP_API_URI', 'statutory-provision.data.gov:5001')
 
+    # Responses are gzip encoded for clients that accept it when streamed or at least a minimum size (bytes), and gzip encoded
+    # request bodies are accepted up to a decompressed size (bytes)
+    COMPRESS_RESPONSES = os.getenv('COMPRESS_RESPONSES', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+    MAX_DECOMPRESSED_REQUEST_BYTES = int(os.getenv('MAX_DECOMPRESSED_REQUEST_BYTES', str(64 * 1024 * 1024)))
+
+    # Connection pool, timeouts (seconds) and retries used for calls to the register, and the encodings asked of it
+    REGISTER_POOL_SIZE = int(os.getenv('REGISTER_POOL_SIZE', '16'))
+    REGISTER_CONNECT_TIMEOUT = float(os.getenv('REGISTER_CONNECT_TIMEOUT', '3.05'))
+    REGISTER_READ_TIMEOUT = float(os.getenv('REGISTER_READ_TIMEOUT', '30'))
+    REGISTER_GET_RETRIES = int(os.getenv('REGISTER_GET_RETRIES', '2'))
+    REGISTER_RETRY_BACKOFF = float(os.getenv('REGISTER_RETRY_BACKOFF', '0.1'))
+    REGISTER_ACCEPT_ENCODING = os.getenv('REGISTER_ACCEPT_ENCODING', 'gzip')
+
+    # Records fetched for curies are shared between requests, for up to a time to live (seconds) per register
+    CURIE_CACHE_SIZE = int(os.getenv('CURIE_CACHE_SIZE', '10000'))
+    CURIE_CACHE_TTL = float(os.getenv('CURIE_CACHE_TTL', '60'))
+    CURIE_CACHE_REGISTER_TTLS = {
+        "statutory-provision": float(os.getenv('SP_CURIE_CACHE_TTL', '3600')),
+        "llc-registering-authority": float(os.getenv('RA_CURIE_CACHE_TTL', '3600')),
+        "further-information-location": float(os.getenv('FIL_CURIE_CACHE_TTL', '600')),
+        "local-land-charge": float(os.getenv('LLC_CURIE_CACHE_TTL', '5'))
+    }
+    # Entity tags of returned records are remembered for a time to live (seconds) to answer 'If-None-Match' without the register
+    ETAG_CACHE_SIZE = int(os.getenv('ETAG_CACHE_SIZE', '10000'))
+    ETAG_CACHE_TTL = float(os.getenv('ETAG_CACHE_TTL', '5'))
+    # GET responses are served from memory for a time to live (seconds), up to a total size of bodies (characters)
+    RESPONSE_CACHE_BYTES = int(os.getenv('RESPONSE_CACHE_BYTES', str(64 * 1024 * 1024)))
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '10'))
+    # Geometry search responses are served from memory for a time to live (seconds), up to a total size of bodies (characters),
+    # with search geometries compared after rounding coordinates to a number of decimal places
+    GEOMETRY_CACHE_BYTES = int(os.getenv('GEOMETRY_CACHE_BYTES', str(32 * 1024 * 1024)))
+    GEOMETRY_CACHE_TTL = float(os.getenv('GEOMETRY_CACHE_TTL', '60'))
+    GEOMETRY_CACHE_PRECISION = int(os.getenv('GEOMETRY_CACHE_PRECISION', '3'))
+    # Schema errors reported for an invalid record, unless set by the 'max-errors' query parameter. Validation stops once this
+    # many are found, 1 failing fast on the first, and 0 gives the full report of every error
+    VALIDATION_MAX_ERRORS = int(os.getenv('VALIDATION_MAX_ERRORS', '0'))
+    # Most positions accepted in a geometry, larger geometries are rejected before schema validation
+    GEOMETRY_MAX_VERTICES = int(os.getenv('GEOMETRY_MAX_VERTICES', '100000'))
+    # Registers copied in process so their records are looked up without calling the register. Copies are refreshed from the
+    # latest entry number every interval (seconds), and lookups go to the register when the last refresh is older than the
+    # staleness bound (seconds)
+    REPLICA_REGISTERS = [register for register in os.getenv('REPLICA_REGISTERS', 'statutory-provision').split(',') if register]
+    REPLICA_REFRESH_INTERVAL = float(os.getenv('REPLICA_REFRESH_INTERVAL', '30'))
+    REPLICA_MAX_STALENESS = float(os.getenv('REPLICA_MAX_STALENESS', '300'))
+    REPLICA_PAGE_SIZE = int(os.getenv('REPLICA_PAGE_SIZE', '1000'))
+    # Whether 'resolve=1' is answered by resolving curie links in the API, through the curie cache, rather than by the register,
+    # and how many levels of links within linked records are resolved
+    RESOLVE_IN_API = os.getenv('RESOLVE_IN_API', 'true').lower() == 'true'
+    RESOLVE_MAX_DEPTH = int(os.getenv('RESOLVE_MAX_DEPTH', '1'))
+    # Number of threads used to look up curies in parallel before additional validation
+    CURIE_PREFETCH_WORKERS = int(os.getenv('CURIE_PREFETCH_WORKERS', '8'))
+    # Whether the register serves 'GET /records?ids=a,b,c', and the most ids accepted by 'GET /records?ids='
+    REGISTER_BULK_LOOKUP = os.getenv('REGISTER_BULK_LOOKUP', 'false').lower() == 'true'
+    MAX_LOOKUP_IDS = int(os.getenv('MAX_LOOKUP_IDS', '100'))
+
+    # Relay 'GET /records' from the register in chunks (bytes) rather than loading it whole, optionally
+    # re-encoding record by record with sorted keys
+    STREAM_RECORDS = os.getenv('STREAM_RECORDS', 'false').lower() == 'true'
+    STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '65536'))
+    STREAM_CANONICAL = os.getenv('STREAM_CANONICAL', 'true').lower() == 'true'
+    # Batch creation with 'POST /records/batch': largest batch, whether an invalid record rejects the whole batch ('atomic')
+    # or only itself ('partial'), records per register call and whether the register accepts 'POST /records/batch' itself
+    MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '1000'))
+    BATCH_MODE = os.getenv('BATCH_MODE', 'atomic')
+    BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '100'))
+    BATCH_WRITE_WORKERS = int(os.getenv('BATCH_WRITE_WORKERS', '4'))
+    REGISTER_BATCH_CREATE = os.getenv('REGISTER_BATCH_CREATE', 'false').lower() == 'true'
+    # Largest page of records that can be requested with 'GET /records?page-size='
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '1000'))
+
+    # Per route and sub-domain request counters and duration histograms, served at '/metrics', and whether responses carry a
+    # 'Server-Timing' header with the time spent in each phase of the request
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() == 'true'
+
+    # Codec used to decode register responses and encode API responses ('json' or 'orjson'), and whether successful register
+    # responses are relayed without re-encoding because they are already canonical ('true'), never ('false') or once a number
+    # of responses in a row have been checked ('detect'), re-checking one in every so many relayed responses
+    JSON_CODEC = os.getenv('JSON_CODEC', 'json')
+    REGISTER_CANONICAL_JSON = os.getenv('REGISTER_CANONICAL_JSON', 'detect')
+    REGISTER_CANONICAL_SAMPLES = int(os.getenv('REGISTER_CANONICAL_SAMPLES', '20'))
+    REGISTER_CANONICAL_RECHECK = int(os.getenv('REGISTER_CANONICAL_RECHECK', '100'))
+
+    # Whether validated creates and updates are queued and answered with 202 and a job to poll: never ('false'), always ('true')
+    # or when asked for with 'Prefer: respond-async' ('prefer'). Queued writes are journalled in a directory, one journal per
+    # process, and sent by a pool of threads, retrying failures up to a number of attempts with an exponential backoff (seconds)
+    ASYNC_WRITES = os.getenv('ASYNC_WRITES', 'false')
+    WRITE_QUEUE_DIR = os.getenv('WRITE_QUEUE_DIR', '/tmp/llc-api-write-queue')
+    WRITE_QUEUE_WORKERS = int(os.getenv('WRITE_QUEUE_WORKERS', '4'))
+    WRITE_QUEUE_MAX_PENDING = int(os.getenv('WRITE_QUEUE_MAX_PENDING', '10000'))
+    WRITE_QUEUE_MAX_ATTEMPTS = int(os.getenv('WRITE_QUEUE_MAX_ATTEMPTS', '5'))
+    WRITE_QUEUE_RETRY_BACKOFF = float(os.getenv('WRITE_QUEUE_RETRY_BACKOFF', '0.5'))
+    WRITE_QUEUE_HISTORY = int(os.getenv('WRITE_QUEUE_HISTORY', '10000'))
+
+    # Routes and schemas compiled from the RAML by build_schema_bundle.py
+    SCHEMA_BUNDLE = os.getenv('SCHEMA_BUNDLE', os.path.join(os.path.dirname(__file__), 'static', 'schema-bundle.json'))
+
     LAND_COMP_ACT_S8_INSTRUMENT = os.getenv('LAND_COMP_ACT_S8_INSTRUMENT', 'Land Compensation Act')
     LAND_COMP_ACT_S8_PROVISION = os.getenv('LAND_COMP_ACT_S8_PROVISION', 'section 8(4)')
     LAND_COMP_ACT_S8_YEAR = os.getenv('LAND_COMP_ACT_S8_YEAR', '1973')
@@ -25,3 +124,4 @@ class DevelopmentConfig(Config):
 
 class TestConfig(DevelopmentConfig):
     TESTING = True
+    REPLICA_REGISTERS = []
@@ -0,0 +1,56 @@
+import re
+
+from application import register_utils
+
+
+# A link to a record, as '<register>:<primary id>'
+CURIE_PATTERN = re.compile(r'^([a-z][a-z-]*):([^:\s]+)$')
+
+
+def curie_links(value, found=None):
+    """Unique curies of known registers among the strings anywhere within a JSON value, in the order first seen
+    """
+    found = {} if found is None else found
+    if isinstance(value, str):
+        match = CURIE_PATTERN.match(value)
+        if match and match.group(1) in register_utils.REGISTER_INFO:
+            found[value] = True
+    elif isinstance(value, dict):
+        for item in value.values():
+            curie_links(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            curie_links(item, found)
+    return found
+
+
+def resolve(value, max_depth):
+    """Copy of a JSON value with its curie links replaced by the records they refer to, to max_depth levels of links
+
+    The links of each level are deduplicated and looked up together through the curie cache, concurrently or with the
+    register's bulk lookup. Links to records that do not exist are left as they are.
+    """
+    records = {}
+    pending = [value]
+    for _ in range(max_depth):
+        links = {}
+        for item in pending:
+            curie_links(item, links)
+        curies = [curie for curie in links if curie not in records]
+        if not curies:
+            break
+        fetched = register_utils.retrieve_curies(curies)
+        records.update(fetched)
+        pending = [record for record in fetched.values() if record is not None]
+    return _splice(value, records, max_depth)
+
+
+def _splice(value, records, depth):
+    if isinstance(value, str):
+        record = records.get(value) if depth > 0 else None
+        return _splice(record, records, depth - 1) if record is not None else value
+    if isinstance(value, dict):
+        return {key: _splice(item, records, depth) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_splice(item, records, depth) for item in value]
+    return value
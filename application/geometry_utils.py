@@ -0,0 +1,67 @@
+import hashlib
+import json
+
+
+def canonical_geometry(geometry, precision):
+    """Canonical form of a GeoJSON object, so equivalent search geometries compare equal
+
+    Coordinates are rounded to precision decimal places, and every polygon ring is closed, starts at its lowest position and
+    is oriented counter-clockwise for an exterior ring or clockwise for a hole. Anything that is not a recognised geometry is
+    returned unchanged.
+    """
+    if not isinstance(geometry, dict):
+        return geometry
+    canonical = dict(geometry)
+    geometry_type = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    try:
+        if geometry_type == 'Point':
+            canonical['coordinates'] = _position(coordinates, precision)
+        elif geometry_type in ('MultiPoint', 'LineString'):
+            canonical['coordinates'] = [_position(position, precision) for position in coordinates]
+        elif geometry_type == 'MultiLineString':
+            canonical['coordinates'] = [[_position(position, precision) for position in line] for line in coordinates]
+        elif geometry_type == 'Polygon':
+            canonical['coordinates'] = _polygon(coordinates, precision)
+        elif geometry_type == 'MultiPolygon':
+            canonical['coordinates'] = [_polygon(polygon, precision) for polygon in coordinates]
+        elif geometry_type == 'GeometryCollection':
+            canonical['geometries'] = [canonical_geometry(member, precision) for member in geometry.get('geometries', [])]
+    except (TypeError, ValueError, IndexError):
+        return geometry
+    return canonical
+
+
+def geometry_key(function, resolve, geometry, precision):
+    """Hash identifying a geometry search by function, resolve value and canonical geometry
+    """
+    text = json.dumps([function, resolve, canonical_geometry(geometry, precision)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _position(position, precision):
+    # Adding 0.0 turns -0.0 into 0.0 so both round to the same key
+    return [round(float(value), precision) + 0.0 for value in position]
+
+
+def _polygon(rings, precision):
+    return [_ring(ring, precision, exterior=index == 0) for index, ring in enumerate(rings)]
+
+
+def _ring(ring, precision, exterior):
+    positions = [_position(position, precision) for position in ring]
+    if len(positions) > 1 and positions[0] == positions[-1]:
+        positions = positions[:-1]
+    if not positions:
+        return positions
+    if (_signed_area(positions) < 0) == exterior:
+        positions.reverse()
+    start = positions.index(min(positions))
+    positions = positions[start:] + positions[:start]
+    return positions + positions[:1]
+
+
+def _signed_area(positions):
+    """Twice the signed area of an unclosed ring, positive when counter-clockwise
+    """
+    return sum(x1 * y2 - x2 * y1 for (x1, y1, *_), (x2, y2, *_) in zip(positions, positions[1:] + positions[:1]))
@@ -0,0 +1,97 @@
+import numpy
+
+
+# Extent of valid coordinates for each coordinate reference system, as [min x, min y, max x, max y]
+CRS_BOUNDS = {"EPSG:27700": [0, 0, 700000, 1300000]}
+# Geometries without a crs are taken to be British National Grid, as all register geometries are
+DEFAULT_CRS = "EPSG:27700"
+
+
+class GeometryError(ValueError):
+    pass
+
+
+def check_geometry(geometry, max_vertices):
+    """Check the coordinates of a GeoJSON geometry with NumPy before the slower JSON schema validation
+
+    Returns (errors, bbox) where bbox is [min x, min y, max x, max y] of all positions, or None if the geometry has no
+    coordinates. Objects that are not recognised geometries are left for the schema to reject.
+    """
+    if not isinstance(geometry, dict):
+        return [], None
+    try:
+        arrays = []
+        _collect(geometry, arrays, [max_vertices])
+        if not arrays:
+            return [], None
+        positions = numpy.concatenate(arrays)
+        if not numpy.isfinite(positions).all():
+            raise GeometryError("coordinates must be finite numbers")
+        bbox = [float(value) for value in numpy.concatenate([positions.min(axis=0), positions.max(axis=0)])]
+        crs = _crs_name(geometry)
+        bounds = CRS_BOUNDS.get(crs)
+        if bounds and (bbox[0] < bounds[0] or bbox[1] < bounds[1] or bbox[2] > bounds[2] or bbox[3] > bounds[3]):
+            raise GeometryError("coordinates must be within the bounds {} of {}".format(bounds, crs))
+    except GeometryError as e:
+        return ["geometry: {}".format(str(e))], None
+    return [], bbox
+
+
+def _collect(geometry, arrays, remaining):
+    geometry_type = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    if geometry_type == 'Point':
+        arrays.append(_positions([coordinates], 1, geometry_type, remaining))
+    elif geometry_type == 'MultiPoint':
+        arrays.append(_positions(coordinates, 1, geometry_type, remaining))
+    elif geometry_type == 'LineString':
+        arrays.append(_positions(coordinates, 2, geometry_type, remaining))
+    elif geometry_type == 'MultiLineString':
+        for line in _parts(coordinates, geometry_type):
+            arrays.append(_positions(line, 2, geometry_type, remaining))
+    elif geometry_type == 'Polygon':
+        for ring in _parts(coordinates, geometry_type):
+            arrays.append(_ring(ring, geometry_type, remaining))
+    elif geometry_type == 'MultiPolygon':
+        for polygon in _parts(coordinates, geometry_type):
+            for ring in _parts(polygon, geometry_type):
+                arrays.append(_ring(ring, geometry_type, remaining))
+    elif geometry_type == 'GeometryCollection':
+        for member in _parts(geometry.get('geometries'), geometry_type):
+            if isinstance(member, dict):
+                _collect(member, arrays, remaining)
+
+
+def _parts(coordinates, geometry_type):
+    if not isinstance(coordinates, list):
+        raise GeometryError("{} coordinates must be an array".format(geometry_type))
+    return coordinates
+
+
+def _positions(coordinates, min_positions, geometry_type, remaining):
+    remaining[0] -= len(_parts(coordinates, geometry_type))
+    if remaining[0] < 0:
+        raise GeometryError("geometry has too many positions")
+    try:
+        positions = numpy.array(coordinates, dtype=float)
+    except (TypeError, ValueError):
+        raise GeometryError("{} coordinates must be [x, y] positions of numbers".format(geometry_type))
+    if positions.ndim != 2 or positions.shape[1] != 2:
+        raise GeometryError("{} coordinates must be [x, y] positions of numbers".format(geometry_type))
+    if len(positions) < min_positions:
+        raise GeometryError("{} must have at least {} positions".format(geometry_type, min_positions))
+    return positions
+
+
+def _ring(coordinates, geometry_type, remaining):
+    positions = _positions(coordinates, 4, geometry_type + " ring", remaining)
+    if not (positions[0] == positions[-1]).all():
+        raise GeometryError("{} rings must end at their first position".format(geometry_type))
+    return positions
+
+
+def _crs_name(geometry):
+    crs = geometry.get('crs')
+    if isinstance(crs, dict) and isinstance(crs.get('properties'), dict):
+        return crs['properties'].get('name')
+    return DEFAULT_CRS
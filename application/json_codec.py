@@ -0,0 +1,117 @@
+import json
+import threading
+from collections import Counter
+
+from application import app
+
+
+class JSONCodec(object):
+    """Canonical JSON encoding, with sorted keys, and decoding with the standard library json module
+    """
+    name = 'json'
+
+    def dumps(self, value):
+        return json.dumps(value, sort_keys=True)
+
+    def loads(self, data):
+        return json.loads(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+    def decode_response(self, response):
+        # requests decodes with the standard library already
+        return response.json()
+
+
+class OrjsonCodec(JSONCodec):
+    """Canonical JSON encoding and decoding with orjson, which writes without spaces after separators
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def dumps(self, value):
+        return self.orjson.dumps(value, option=self.orjson.OPT_SORT_KEYS).decode('utf-8')
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+    def decode_response(self, response):
+        return self.loads(response.content)
+
+
+# Codecs by the name given in JSON_CODEC, further codecs can be added by name
+CODECS = {'json': JSONCodec, 'orjson': OrjsonCodec}
+
+
+def load_codec(name):
+    """Codec of the given name, or the standard library codec if the codec's package is not installed
+    """
+    try:
+        return CODECS[name]()
+    except ImportError as e:
+        app.logger.warn("JSON codec '{}' unavailable, using 'json': {}".format(name, str(e)))
+        return JSONCodec()
+
+
+class CanonicalRelay(object):
+    """Relays a register's response bytes untouched when they are already the canonical encoding of their JSON
+
+    In mode 'true' every response is trusted to be canonical, and in mode 'false' every response is decoded and re-encoded.
+    In mode 'detect' each register's responses are compared with their re-encoding until samples in a row match, after
+    which they are relayed, re-checking one response in every recheck (0 for never) and re-encoding again on the first
+    mismatch.
+    """
+
+    def __init__(self, codec, mode, samples, recheck):
+        self.codec = codec
+        self.mode = mode
+        self.samples = samples
+        self.recheck = recheck
+        self.matches = Counter()
+        self.relayed = Counter()
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def _trusted(self, register):
+        if self.mode != 'detect':
+            return self.mode == 'true'
+        with self._lock:
+            if self.matches[register] < self.samples:
+                return False
+            self.relayed[register] += 1
+            return not self.recheck or self.relayed[register] % self.recheck != 0
+
+    def _checked(self, register, canonical):
+        with self._lock:
+            self.counters['checks'] += 1
+            if canonical:
+                self.matches[register] += 1
+            else:
+                self.counters['mismatches'] += 1
+                self.matches[register] = 0
+                self.relayed[register] = 0
+
+    def encode(self, register, response):
+        """Canonical body of a successful register response and its decoded value, None if it was relayed without decoding
+        """
+        raw = response.content
+        if isinstance(raw, bytes) and self._trusted(register):
+            with self._lock:
+                self.counters['relayed'] += 1
+            return raw, None
+        value = self.codec.decode_response(response)
+        body = self.codec.dumps(value)
+        if self.mode == 'detect':
+            self._checked(register, isinstance(raw, bytes) and raw == body.encode('utf-8'))
+        with self._lock:
+            self.counters['encoded'] += 1
+        return body, value
+
+    def stats(self):
+        with self._lock:
+            return {"relayed": self.counters['relayed'],
+                    "encoded": self.counters['encoded'],
+                    "checks": self.counters['checks'],
+                    "mismatches": self.counters['mismatches'],
+                    "trusted": sorted(register for register, matches in self.matches.items() if matches >= self.samples)}
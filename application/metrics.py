@@ -0,0 +1,183 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+from application import app
+
+
+# Upper bounds (seconds) of the duration histogram buckets
+BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+HELP = {
+    "llc_api_requests_total": "Requests handled, by route, method, sub-domain and status",
+    "llc_api_request_duration_seconds": "Time to produce a response, by route, method and sub-domain",
+    "llc_api_phase_duration_seconds": "Time spent in each phase of a request, excluding time in nested phases, by route and sub-domain"
+}
+
+
+class Histogram(object):
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class Metrics(object):
+    """Counters and duration histograms keyed by metric name and label values, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self, families=()):
+        """Prometheus text exposition of the counters and histograms, followed by the given families
+
+        families is a list of (name, type, help, [(labels, value)]) where labels is a tuple of (label, value) pairs.
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, list(histogram.counts), histogram.sum) for key, histogram in self.histograms.items())
+        lines = []
+        described = set()
+        for (name, labels), value in counters:
+            _describe(lines, described, name, "counter", HELP.get(name))
+            lines.append(_sample(name, labels, value))
+        for (name, labels), counts, total in histograms:
+            _describe(lines, described, name, "histogram", HELP.get(name))
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ["+Inf"], counts):
+                cumulative += count
+                lines.append(_sample(name + "_bucket", labels + (("le", str(bound)),), cumulative))
+            lines.append(_sample(name + "_sum", labels, round(total, 6)))
+            lines.append(_sample(name + "_count", labels, cumulative))
+        for name, metric_type, help_text, samples in families:
+            _describe(lines, described, name, metric_type, help_text)
+            for labels, value in samples:
+                lines.append(_sample(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+def _describe(lines, described, name, metric_type, help_text):
+    if name in described:
+        return
+    described.add(name)
+    if help_text:
+        lines.append("# HELP {} {}".format(name, help_text))
+    lines.append("# TYPE {} {}".format(name, metric_type))
+
+
+def _sample(name, labels, value):
+    if value is None:
+        value = "NaN"
+    elif value is True or value is False:
+        value = int(value)
+    if not labels:
+        return "{} {}".format(name, value)
+    text = ",".join('{}="{}"'.format(label, str(label_value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                    for label, label_value in labels)
+    return "{}{{{}}} {}".format(name, text, value)
+
+
+METRICS = Metrics()
+
+
+class RequestTiming(object):
+    """Time spent in named phases of one request, each phase excluding the time of phases nested within it
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = OrderedDict()
+        self.stack = []
+
+    def start(self, phase):
+        self.stack.append([phase, time.perf_counter(), 0.0])
+
+    def stop(self):
+        phase, started, nested = self.stack.pop()
+        elapsed = time.perf_counter() - started
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed - nested
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def header(self, total):
+        """Server-Timing header value with the phase and total durations in milliseconds
+        """
+        entries = ["{};dur={:.2f}".format(phase, seconds * 1000) for phase, seconds in self.phases.items()]
+        entries.append("total;dur={:.2f}".format(total * 1000))
+        return ", ".join(entries)
+
+
+def _timing():
+    if not has_request_context():
+        return None
+    return getattr(g, 'request_timing', None)
+
+
+@contextmanager
+def timed(phase, nested=True):
+    """Time the enclosed code as the named phase of the current request
+
+    Does nothing outside a request, when metrics are disabled, or when nested is False and another phase is being timed,
+    so shared code such as register calls is counted in the phase that made it.
+    """
+    timing = _timing()
+    if timing is None or (not nested and timing.stack):
+        yield
+        return
+    timing.start(phase)
+    try:
+        yield
+    finally:
+        timing.stop()
+
+
+def start_request():
+    if app.config['METRICS_ENABLED']:
+        g.request_timing = RequestTiming()
+
+
+def finish_request(response, route, method, sub_domain):
+    """Record the request's duration and phases, adding the Server-Timing header to the response
+    """
+    timing = _timing()
+    if timing is None:
+        return response
+    # Streamed bodies are still being sent, so only the time to the first byte is measured
+    total = time.perf_counter() - timing.started
+    labels = (("route", route), ("method", method), ("sub_domain", sub_domain))
+    METRICS.inc("llc_api_requests_total", labels + (("status", str(response.status_code)),))
+    METRICS.observe("llc_api_request_duration_seconds", labels, total)
+    for phase, seconds in timing.phases.items():
+        METRICS.observe("llc_api_phase_duration_seconds", (("route", route), ("sub_domain", sub_domain), ("phase", phase)), seconds)
+    if app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = timing.header(total)
+    return response
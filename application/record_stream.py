@@ -0,0 +1,143 @@
+import codecs
+import heapq
+import json
+import re
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'\s*')
+
+# Parser states for the top level object
+_START, _FIRST_KEY, _KEY, _COLON, _VALUE, _COMMA, _END = range(7)
+
+
+class _Incomplete(Exception):
+    pass
+
+
+def iter_items(chunks):
+    """Incrementally parse a JSON object from an iterable of byte chunks, yielding each top level (key, value) pair
+
+    Only the current record and the unread part of the current chunk are held in memory.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    eof = False
+    state = _START
+    key = None
+    while state != _END:
+        try:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                raise _Incomplete()
+            char = buffer[pos]
+            if state == _START:
+                if char != '{':
+                    raise ValueError("Expected JSON object")
+                pos += 1
+                state = _FIRST_KEY
+            elif state == _FIRST_KEY and char == '}':
+                pos += 1
+                state = _END
+            elif state in (_FIRST_KEY, _KEY):
+                key, pos = _decode(buffer, pos, eof)
+                if not isinstance(key, str):
+                    raise ValueError("Expected JSON object key")
+                state = _COLON
+            elif state == _COLON:
+                if char != ':':
+                    raise ValueError("Expected ':' after JSON object key")
+                pos += 1
+                state = _VALUE
+            elif state == _VALUE:
+                value, end = _decode(buffer, pos, eof)
+                # A number at the end of the buffer may continue in the next chunk
+                if not eof and _WHITESPACE.match(buffer, end).end() >= len(buffer):
+                    raise _Incomplete()
+                pos = end
+                state = _COMMA
+                yield key, value
+            elif state == _COMMA:
+                if char not in ',}':
+                    raise ValueError("Expected ',' or '}' in JSON object")
+                pos += 1
+                state = _KEY if char == ',' else _END
+        except _Incomplete:
+            if eof:
+                raise ValueError("Unexpected end of JSON object")
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+                chunk = b''
+            text = decoder.decode(chunk, final=eof) if isinstance(chunk, bytes) else chunk
+            buffer = buffer[pos:] + text
+            pos = 0
+
+
+def _decode(buffer, pos, eof):
+    try:
+        return _DECODER.raw_decode(buffer, pos)
+    except ValueError:
+        if eof:
+            raise
+        raise _Incomplete()
+
+
+def canonical_chunks(chunks, chunk_size):
+    """Re-encode a streamed JSON object record by record with sorted keys, as json.dumps(sort_keys=True) would
+
+    Keys within each record are sorted, the order of the top level keys is kept from the source.
+    """
+    parts = []
+    size = 0
+    separator = '{'
+    for key, value in iter_items(chunks):
+        part = '{}{}: {}'.format(separator, json.dumps(key), json.dumps(value, sort_keys=True))
+        separator = ', '
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            size = 0
+    parts.append('{}' if separator == '{' else '}')
+    yield ''.join(parts).encode('utf-8')
+
+
+def relay(response, chunk_size, canonical):
+    """Yield the body of a streamed register response in chunks, closing the response when done
+    """
+    try:
+        chunks = response.iter_content(chunk_size=chunk_size)
+        if canonical:
+            chunks = canonical_chunks(chunks, chunk_size)
+        for chunk in chunks:
+            yield chunk
+    finally:
+        response.close()
+
+
+def entry_number(record):
+    """Entry number of a register record, as an integer
+    """
+    return int(record.get('entry-number', -1))
+
+
+def select_page(items, cursor, page_size):
+    """Select the page_size (key, record) pairs with the lowest entry numbers after cursor
+
+    Returns the page in entry number order and whether further records follow it. Only one page of records
+    is held in memory, so a register that does not paginate itself can be paged through a stream.
+    """
+    remaining = [0]
+
+    def after_cursor():
+        for key, record in items:
+            if entry_number(record) > cursor:
+                remaining[0] += 1
+                yield key, record
+
+    page = heapq.nsmallest(page_size, after_cursor(), key=lambda item: entry_number(item[1]))
+    return page, remaining[0] > page_size
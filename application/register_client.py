@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Only idempotent reads are retried, a failed write may still have reached the register
+RETRY_METHODS = ('get',)
+
+
+class RegisterClient(object):
+    """Thread-safe keep-alive HTTP client for the register backend
+
+    Each thread gets its own session but all sessions share one connection pool, so connections to the
+    register are reused across requests and threads. Responses are requested with the given 'Accept-Encoding' and
+    decoded as they are read.
+    """
+
+    def __init__(self, pool_size, connect_timeout, read_timeout, get_retries, retry_backoff=0.1, accept_encoding=None):
+        self.pool_size = pool_size
+        self.accept_encoding = accept_encoding
+        self.timeout = (connect_timeout, read_timeout)
+        self.get_retries = get_retries
+        self.retry_backoff = retry_backoff
+        self.adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.counters = Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            if self.accept_encoding:
+                session.headers['Accept-Encoding'] = self.accept_encoding
+            self._local.session = session
+        return session
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def request(self, method, url, json=None, stream=False, headers=None):
+        """Send request, retrying connection failures and timeouts for idempotent methods
+
+        When stream is True the body is read as it is consumed and the response must be closed by the caller. headers are
+        sent in addition to the session's.
+        """
+        method = method.lower()
+        attempts = 1 + (self.get_retries if method in RETRY_METHODS else 0)
+        for attempt in range(attempts):
+            self._count('requests')
+            try:
+                return self._session().request(method, url, json=json, timeout=self.timeout, stream=stream, headers=headers)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count('errors')
+                if attempt + 1 >= attempts:
+                    raise
+                self._count('retries')
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+    def stats(self):
+        """Request counters and the state of each connection pool
+        """
+        pools = []
+        pool_manager = self.adapter.poolmanager
+        for key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({"host": "{}://{}:{}".format(pool.scheme, pool.host, pool.port),
+                          "max-size": self.pool_size,
+                          "connections-opened": pool.num_connections,
+                          "requests": pool.num_requests,
+                          "idle": pool.pool.qsize() if pool.pool else 0})
+        with self._lock:
+            stats = {"requests": self.counters["requests"],
+                     "errors": self.counters["errors"],
+                     "retries": self.counters["retries"]}
+        stats["pools"] = pools
+        return stats
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import Counter
+
+from application import app, record_stream
+
+
+class RegisterReplica(object):
+    """In-process copy of a small register, loaded in full then refreshed with the entries after the latest entry number
+
+    fetch(cursor) returns a dictionary of primary id to record, for all records when cursor is None or else for records
+    with an entry number after cursor. Lookups are only answered for records the replica holds, while the last successful
+    sync is within max_staleness seconds, and never for records written through this process since the last sync, so
+    callers can fall back to the register for records added since.
+    """
+
+    def __init__(self, register, fetch, refresh_interval, max_staleness):
+        self.register = register
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.records = {}
+        self.latest = -1
+        self.synced = None
+        self.counters = Counter()
+        # Primary ids written since they were last synced, with the invalidation count when written
+        self._dirty = {}
+        self._invalidations = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def lookup(self, primary_id):
+        """Return (True, record) when the replica holds a current copy of the record, else (False, None)
+        """
+        with self._lock:
+            if not self._fresh() or primary_id in self._dirty or primary_id not in self.records:
+                self.counters['fallbacks'] += 1
+                return False, None
+            self.counters['hits'] += 1
+            return True, self.records[primary_id]
+
+    def _fresh(self):
+        return self.synced is not None and time.monotonic() - self.synced <= self.max_staleness
+
+    @property
+    def ready(self):
+        with self._lock:
+            return self._fresh()
+
+    def sync(self):
+        """Load all records, or once loaded apply the entries after the latest entry number
+        """
+        with self._lock:
+            cursor = self.latest if self.synced is not None else None
+            invalidations = self._invalidations
+        records = self.fetch(cursor)
+        with self._lock:
+            if cursor is None:
+                self.records = {}
+            for primary_id, record in records.items():
+                number = record_stream.entry_number(record)
+                if cursor is None or number > cursor:
+                    self.records[primary_id] = record
+                    self.latest = max(self.latest, number)
+                    # Only writes made before the fetch started are known to be included in it
+                    if self._dirty.get(primary_id, invalidations + 1) <= invalidations:
+                        del self._dirty[primary_id]
+            self.synced = time.monotonic()
+            self.counters['syncs'] += 1
+
+    def invalidate(self, primary_id):
+        """Stop answering for a record that has been written until a sync brings in its new entry
+        """
+        with self._lock:
+            self._invalidations += 1
+            self._dirty[primary_id] = self._invalidations
+
+    def start(self):
+        """Load and keep refreshing the replica on a background thread
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="{}-replica".format(self.register))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                with self._lock:
+                    self.counters['sync-errors'] += 1
+                app.logger.warn("Failed to sync '{}' replica: {}".format(self.register, str(e)))
+            self._stop.wait(self.refresh_interval)
+
+    def stats(self):
+        """Size, latest entry number, age (seconds) and lookup and sync counters of the replica
+        """
+        with self._lock:
+            return {"size": len(self.records),
+                    "latest-entry": self.latest,
+                    "age": round(time.monotonic() - self.synced, 3) if self.synced is not None else None,
+                    "ready": self._fresh(),
+                    "hits": self.counters['hits'],
+                    "fallbacks": self.counters['fallbacks'],
+                    "syncs": self.counters['syncs'],
+                    "sync-errors": self.counters['sync-errors']}
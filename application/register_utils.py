@@ -1,131 +1,595 @@
+import hashlib
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import quote
+
 import flask
 import requests
 
-from application import app, charge_validators, register_validators
-import jsonschema
-import ramlfications
+from application import app, cache, charge_validators, geometry_validators, json_codec, metrics, record_stream, register_replica, \
+    register_validators, register_client, schema_registry, write_queue
 
 
 REGISTER_INFO = {
     "local-land-charge": {
-        "raml": ramlfications.parse(app.static_folder + '/schema/local-land-charge.raml'),
+        "raml-file": "local-land-charge.raml",
         "additional-validation": [register_validators.validate_primary_id, register_validators.validate_archive_update,
                                   charge_validators.validate_s8_compensation_charge, charge_validators.validate_s52_compensation_charge,
                                   charge_validators.validate_instrument_provisions, charge_validators.validate_statutory_provisions,
                                   charge_validators.validate_registration_date, charge_validators.validate_further_information],
+        "prefetch-curies": [charge_validators.statutory_provision_curies],
+        "fresh-curies": [register_validators.record_curies],
         "primary-id": "local-land-charge",
-        "geometry-search": True
+        "geometry-search": True,
+        "geometry-field": "geometry"
     },
     "further-information-location": {
-        "raml": ramlfications.parse(app.static_folder + '/schema/further-information-location.raml'),
+        "raml-file": "further-information-location.raml",
         "additional-validation": [register_validators.validate_primary_id, register_validators.validate_archive_update],
+        "prefetch-curies": [],
+        "fresh-curies": [register_validators.record_curies],
         "primary-id": "further-information-location",
-        "geometry-search": False
+        "geometry-search": False,
+        "geometry-field": None
     },
     "llc-registering-authority": {
-        "raml": ramlfications.parse(app.static_folder + '/schema/llc-registering-authority.raml'),
+        "raml-file": "llc-registering-authority.raml",
         "additional-validation": [register_validators.validate_primary_id, register_validators.validate_archive_update],
+        "prefetch-curies": [],
+        "fresh-curies": [register_validators.record_curies],
         "primary-id": "llc-registering-authority",
-        "geometry-search": False
+        "geometry-search": False,
+        "geometry-field": None
     },
     "statutory-provision": {
-        "raml": ramlfications.parse(app.static_folder + '/schema/statutory-provision.raml'),
+        "raml-file": "statutory-provision.raml",
         "additional-validation": [register_validators.validate_primary_id, register_validators.validate_archive_update],
+        "prefetch-curies": [],
+        "fresh-curies": [register_validators.record_curies],
         "primary-id": "statutory-provision",
-        "geometry-search": False
+        "geometry-search": False,
+        "geometry-field": None
     }
 }
-# Resolver to get json schemas from relative paths
-RELATIVE_RESOLVER = jsonschema.RefResolver('file://' + app.static_folder + '/schema/', None)
+# Validators for all end points and schema definitions, built once so requests never rebuild or re-read schemas. Routes come
+# from the prebuilt schema bundle (see build_schema_bundle.py), parsing the RAML only when the bundle is missing or stale
+STARTUP_STATS = {}
+_started = time.time()
+SCHEMA_FILES = schema_registry.load_schema_files(app.static_folder + '/schema')
+SCHEMA_ROUTES, STARTUP_STATS["schema-source"] = schema_registry.load_routes(
+    app.static_folder + '/schema', {sub_domain: info["raml-file"] for sub_domain, info in REGISTER_INFO.items()}, app.config['SCHEMA_BUNDLE'],
+    SCHEMA_FILES)
+STARTUP_STATS["routes-seconds"] = round(time.time() - _started, 3)
+if STARTUP_STATS["schema-source"] != "bundle":
+    app.logger.warn("Schema bundle '{}' missing or stale, parsed RAML instead".format(app.config['SCHEMA_BUNDLE']))
+SCHEMA_REGISTRY = schema_registry.SchemaRegistry(app.static_folder + '/schema', SCHEMA_ROUTES, SCHEMA_FILES)
+STARTUP_STATS["registry-seconds"] = round(SCHEMA_REGISTRY.build_time, 3)
+app.logger.info("Schema routes loaded from {} in {:.3f}s, registry built in {:.3f}s".format(
+    STARTUP_STATS["schema-source"], STARTUP_STATS["routes-seconds"], SCHEMA_REGISTRY.build_time))
+
+# Shared keep-alive client for all calls to the register
+REGISTER_CLIENT = register_client.RegisterClient(app.config['REGISTER_POOL_SIZE'], app.config['REGISTER_CONNECT_TIMEOUT'],
+                                                 app.config['REGISTER_READ_TIMEOUT'], app.config['REGISTER_GET_RETRIES'],
+                                                 app.config['REGISTER_RETRY_BACKOFF'], app.config['REGISTER_ACCEPT_ENCODING'])
+
+# Codec for JSON decoded from the register and re-encoded in responses, and the relay of register responses already canonical
+JSON_CODEC = json_codec.load_codec(app.config['JSON_CODEC'])
+CANONICAL_RELAY = json_codec.CanonicalRelay(JSON_CODEC, app.config['REGISTER_CANONICAL_JSON'], app.config['REGISTER_CANONICAL_SAMPLES'],
+                                            app.config['REGISTER_CANONICAL_RECHECK'])
+
+# Cache of records for curies shared between requests to reduce amount of calls
+CURIE_CACHE = cache.TTLCache(app.config['CURIE_CACHE_SIZE'], app.config['CURIE_CACHE_TTL'])
+
+# Entity tags of the latest unresolved representations returned, keyed by (sub-domain, path), so conditional requests
+# can be answered without calling the register
+ETAG_CACHE = cache.TTLCache(app.config['ETAG_CACHE_SIZE'], app.config['ETAG_CACHE_TTL'])
+
+# Serialised bodies and entity tags of GET responses keyed by (sub-domain, path, resolve), bounded by total body size
+RESPONSE_CACHE = cache.TTLCache(app.config['RESPONSE_CACHE_BYTES'], app.config['RESPONSE_CACHE_TTL'], weigh=lambda value: len(value[0]))
+
+# Geometry search responses (body, Truncated header) keyed by (sub-domain, resolve, canonical search hash)
+GEOMETRY_CACHE = cache.TTLCache(app.config['GEOMETRY_CACHE_BYTES'], app.config['GEOMETRY_CACHE_TTL'], weigh=lambda value: len(value[0]))
 
-# Cache dictionary for curies to reduce amount of calls
-CURIE_CACHE = {}
+# Bounded pool used to look up curies in parallel
+CURIE_EXECUTOR = ThreadPoolExecutor(max_workers=app.config['CURIE_PREFETCH_WORKERS'])
 
+# Bounded pool used to send records to the register in parallel
+WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=app.config['BATCH_WRITE_WORKERS'])
 
-def validate_json(sub_domain, end_point_pattern, method, json_payload):
+# In-process copies of small registers, so their records can be looked up without calling the register
+REPLICAS = {register: register_replica.RegisterReplica(register, lambda cursor, register=register: _fetch_replica_records(register, cursor),
+                                                       app.config['REPLICA_REFRESH_INTERVAL'], app.config['REPLICA_MAX_STALENESS'])
+            for register in app.config['REPLICA_REGISTERS']}
+
+# Creates and updates accepted to be written to the register later, unless ASYNC_WRITES is 'false'
+WRITE_QUEUE = write_queue.WriteQueue(app.config['WRITE_QUEUE_DIR'], lambda job: _send_write(job), app.config['WRITE_QUEUE_WORKERS'],
+                                     app.config['WRITE_QUEUE_MAX_PENDING'], app.config['WRITE_QUEUE_MAX_ATTEMPTS'],
+                                     app.config['WRITE_QUEUE_RETRY_BACKOFF'], app.config['WRITE_QUEUE_HISTORY']) \
+    if app.config['ASYNC_WRITES'] != 'false' else None
+
+# Request-scoped validation state, private to the thread running the validation
+VALIDATION_STATE = threading.local()
+
+
+def validate_json(sub_domain, end_point_pattern, method, json_payload, max_errors=None):
     """Validation the given json for the given end point and method for the given register sub domain
+
+    Validation stops once max_errors schema errors are found, and at most max_errors are formatted and returned. The default
+    is VALIDATION_MAX_ERRORS, with 0 for a full report sorted by path.
     """
+    if max_errors is None:
+        max_errors = app.config['VALIDATION_MAX_ERRORS']
     if sub_domain not in REGISTER_INFO:
         return {"errors": ['invalid sub-domain']}
-    # Get RAML resource
-    raml = REGISTER_INFO[sub_domain]["raml"]
-    raml_end_point = end_point_pattern.replace('<', '{').replace('>', '}')
-    raml_resource = None
-    for resource in raml.resources:
-        if resource.path == raml_end_point and resource.method.lower() == method.lower():
-            raml_resource = resource
-            break
-    if not raml_resource:
-        return {"errors": ['cannot find RAML resource definition']}
-    raml_schema = None
-    # Get schema name from RAML resource
-    if raml_resource.body:
-        for body in raml_resource.body:
-            if body.mime_type == "application/json":
-                schema_name = body.schema
-                for schema in raml.schemas:
-                    if schema_name in schema:
-                        raml_schema = schema[schema_name]
-                        break
-                break
-    if not raml_schema:
-        return {"errors": ['cannot find schema in RAML resource definition']}
-    # Load schema and validate against it
-    try:
-        validator = jsonschema.Draft4Validator(raml_schema, resolver=RELATIVE_RESOLVER)
-    except jsonschema.SchemaError:
-        return {"errors": ['invalid json schema']}
-    errors = sorted(validator.iter_errors(json_payload), key=lambda e: e.path)
-    error_return = []
+    # Get prebuilt validator for RAML resource
+    with metrics.timed('schema-lookup'):
+        validator, lookup_error = SCHEMA_REGISTRY.endpoint_validator(sub_domain, end_point_pattern, method)
+    if lookup_error:
+        return {"errors": [lookup_error]}
+    # Check geometry coordinates cheaply first, the bounding box is returned for later stages
+    bbox = None
+    geometry = payload_geometry(sub_domain, end_point_pattern, json_payload)
+    if geometry is not None:
+        with metrics.timed('geometry-check'):
+            geometry_errors, bbox = geometry_validators.check_geometry(geometry, app.config['GEOMETRY_MAX_VERTICES'])
+        if geometry_errors:
+            return {"errors": geometry_errors}
+    with metrics.timed('schema-validation'):
+        if max_errors:
+            errors = sorted(itertools.islice(validator.iter_errors(json_payload), max_errors), key=lambda e: e.path)
+        else:
+            errors = sorted(validator.iter_errors(json_payload), key=lambda e: e.path)
+    error_return = list(itertools.islice(_format_errors(errors), max_errors or None))
+    result = {"errors": error_return}
+    if bbox is not None and not error_return:
+        result["bbox"] = bbox
+    return result
+
+
+def _format_errors(errors):
+    # Error and sub-error messages, formatted only as they are consumed
     for error in errors:
-        error_return.append("{}, {}".format(str(list(error.schema_path)), error.message))
+        yield "{}, {}".format(str(list(error.schema_path)), error.message)
         for suberror in sorted(error.context, key=lambda e: e.schema_path):
-            error_return.append("{}, {}".format(str(list(suberror.schema_path)), suberror.message))
-    return {"errors": error_return}
+            yield "{}, {}".format(str(list(suberror.schema_path)), suberror.message)
+
+
+def payload_geometry(sub_domain, end_point_pattern, json_payload):
+    """GeoJSON geometry within the given json, the whole json for a geometry search
+    """
+    if end_point_pattern == '/records/geometry/<function>':
+        return json_payload
+    geometry_field = REGISTER_INFO[sub_domain]['geometry-field']
+    if geometry_field and isinstance(json_payload, dict):
+        return json_payload.get(geometry_field)
+    return None
 
 
 def additional_validation(sub_domain, end_point, end_point_pattern, method, json_payload):
     """Perform additional validation based on given parameters
     """
-    # Reset curie cache
-    CURIE_CACHE.clear()
     if sub_domain not in REGISTER_INFO:
         return {"errors": ['invalid sub-domain']}
-    error_return = []
-    for validator in REGISTER_INFO[sub_domain]["additional-validation"]:
-        result = validator(sub_domain, end_point, end_point_pattern, method, json_payload)
-        error_return = error_return + result['errors']
-    CURIE_CACHE.clear()
+    with validation_scope():
+        prefetch_curies(collect_curies(sub_domain, end_point, end_point_pattern, method, json_payload),
+                        collect_curies(sub_domain, end_point, end_point_pattern, method, json_payload, fresh=True))
+        error_return = []
+        for validator in REGISTER_INFO[sub_domain]["additional-validation"]:
+            with metrics.timed(validator.__name__):
+                result = validator(sub_domain, end_point, end_point_pattern, method, json_payload)
+            error_return = error_return + result['errors']
     return {"errors": error_return}
 
 
-def retrieve_curie(curie):
+def validate_batch(sub_domain, end_point, end_point_pattern, method, json_payloads, max_errors=None):
+    """Perform json and additional validation of each of the given payloads, sharing curie lookups between them
+
+    Returns a result per payload, in order, each with at most max_errors schema errors as for validate_json
+    """
+    if sub_domain not in REGISTER_INFO:
+        return [{"errors": ['invalid sub-domain']} for json_payload in json_payloads]
+    results = []
+    with validation_scope():
+        curies = set()
+        fresh_curies = set()
+        for json_payload in json_payloads:
+            if isinstance(json_payload, dict):
+                curies.update(collect_curies(sub_domain, end_point, end_point_pattern, method, json_payload))
+                fresh_curies.update(collect_curies(sub_domain, end_point, end_point_pattern, method, json_payload, fresh=True))
+        prefetch_curies(curies, fresh_curies)
+        for json_payload in json_payloads:
+            result = validate_json(sub_domain, end_point_pattern, method, json_payload, max_errors)
+            if not result['errors']:
+                result = additional_validation(sub_domain, end_point, end_point_pattern, method, json_payload)
+            results.append(result)
+    return results
+
+
+def collect_curies(sub_domain, end_point, end_point_pattern, method, json_payload, fresh=False):
+    """Curies that the additional validation of the given payload will look up, or with fresh those it looks up fresh
+    """
+    curies = set()
+    for collector in REGISTER_INFO[sub_domain]["fresh-curies" if fresh else "prefetch-curies"]:
+        curies.update(collector(sub_domain, end_point, end_point_pattern, method, json_payload))
+    return curies
+
+
+@contextmanager
+def validation_scope():
+    """Scope curie lookups to one validation on the current thread
+
+    Every validator in the scope sees the same version of each record, even if the shared cache entry expires or is
+    invalidated by another request part way through. Nested scopes share the outermost scope's state.
+    """
+    outermost = getattr(VALIDATION_STATE, 'curies', None) is None
+    if outermost:
+        VALIDATION_STATE.curies = {}
+        VALIDATION_STATE.memo = {}
+    try:
+        yield
+    finally:
+        if outermost:
+            VALIDATION_STATE.curies = None
+            VALIDATION_STATE.memo = None
+
+
+def scoped_value(key, factory):
+    """Value made by factory once per validation scope for key, so validators can share work; made afresh outside a scope
+    """
+    memo = getattr(VALIDATION_STATE, 'memo', None)
+    if memo is None:
+        return factory()
+    if key not in memo:
+        memo[key] = factory()
+    return memo[key]
+
+
+def _cached_record(curie):
+    # Record from the current validation scope, else from the shared cache (pinning it in the scope)
+    scoped = getattr(VALIDATION_STATE, 'curies', None)
+    if scoped is not None and curie in scoped:
+        return scoped[curie]
+    record = CURIE_CACHE.get(curie)
+    _remember(curie, record)
+    return record
+
+
+def _remember(curie, record):
+    scoped = getattr(VALIDATION_STATE, 'curies', None)
+    if scoped is not None and record is not None:
+        scoped[curie] = record
+
+
+def prefetch_curies(curies, fresh_curies=()):
+    """Look up the given curies in parallel so they are cached before validators need them
+
+    fresh_curies are fetched from the register alongside, for the fresh lookups of the current validation scope
+    """
+    # Failures are left for the validators to retry and report
+    try:
+        with metrics.timed('curie-prefetch'):
+            fresh = [(curie, CURIE_EXECUTOR.submit(_fetch_record, curie)) for curie in fresh_curies]
+            retrieve_curies(curies)
+            for curie, future in fresh:
+                record = future.result()
+                scoped_value(("fresh", curie), lambda: record)
+    except Exception as e:
+        app.logger.info("Failed to prefetch curies: {}".format(str(e)))
+
+
+def retrieve_curies(curies):
+    """Lookup the given curies and return dictionary of curie to record, with None for curies not found
+
+    Uses the register's bulk lookup when enabled, falling back to parallel single lookups
+    """
+    records = {}
+    missing = []
+    for curie in OrderedDict.fromkeys(curies):
+        record = _cached_record(curie)
+        found, replica_record = _replica_lookup(curie) if record is None else (False, None)
+        if record is not None:
+            records[curie] = record
+        elif found:
+            records[curie] = replica_record
+        else:
+            missing.append(curie)
+    errors = []
+    if missing:
+        with metrics.timed('curie-fetch'):
+            errors = _fetch_curies(missing, records)
+    for curie, record in records.items():
+        _remember(curie, record)
+    if errors:
+        raise errors[0]
+    return records
+
+
+def _fetch_curies(curies, records):
+    # Fetches curies from the registers into records, returning the lookup errors
+    if app.config['REGISTER_BULK_LOOKUP']:
+        primary_ids = OrderedDict()
+        for curie in curies:
+            register, _, primary_id = curie.partition(':')
+            if register in REGISTER_INFO and primary_id and ':' not in primary_id:
+                primary_ids.setdefault(register, []).append(primary_id)
+        for register, register_ids in primary_ids.items():
+            found = _bulk_retrieve(register, register_ids)
+            if found is not None:
+                for primary_id in register_ids:
+                    records["{}:{}".format(register, primary_id)] = found.get(primary_id)
+        curies = [curie for curie in curies if curie not in records]
+    if len(curies) == 1:
+        results = [_retrieve_curie_result(curies[0])]
+    else:
+        results = CURIE_EXECUTOR.map(_retrieve_curie_result, curies)
+    errors = []
+    for curie, record, error in results:
+        if error:
+            errors.append(error)
+        else:
+            records[curie] = record
+    return errors
+
+
+def start_replicas():
+    """Start loading and refreshing the register replicas in the background
+    """
+    for replica in REPLICAS.values():
+        replica.start()
+
+
+def start_write_queue():
+    """Send the pending writes of the write queue's journal and those queued from now on, in the background
+    """
+    if WRITE_QUEUE is not None:
+        WRITE_QUEUE.start()
+
+
+def _send_write(job):
+    # Write a queued job to the register with its id as the idempotency key, returning (status code, primary id, error)
+    response = register_request(job['register'], job['end-point'], job['parameters'], job['method'], job['payload'],
+                                headers={"Idempotency-Key": job['id']})
+    if response.status_code not in (200, 201):
+        return response.status_code, None, response.text
+    primary_id = JSON_CODEC.decode_response(response)[REGISTER_INFO[job['register']]['primary-id']]
+    invalidate_record(job['register'], primary_id)
+    return response.status_code, primary_id, None
+
+
+def _fetch_replica_records(register, cursor):
+    # All records of the register, or those with entries after cursor, following the register's pages when it paginates
+    records = {}
+    parameters = [] if cursor is None else ["page-size={}".format(app.config['REPLICA_PAGE_SIZE'])]
+    while True:
+        cursor_parameter = [] if cursor is None else ["cursor={}".format(cursor)]
+        response = register_request(register, "/records", parameters + cursor_parameter, 'get', None)
+        if response.status_code != 200:
+            raise Exception("Failed to retrieve records for '{}' replica, response was {}".format(register, response.status_code))
+        records.update(response.json())
+        next_cursor = response.headers.get('Next-Cursor')
+        if cursor is None or not next_cursor or int(next_cursor) <= cursor:
+            return records
+        cursor = int(next_cursor)
+
+
+def _replica_lookup(curie):
+    # (True, record) if a replica holds a current copy of curie's record, else (False, None) to call the register
+    register, _, primary_id = curie.partition(':')
+    replica = REPLICAS.get(register)
+    if replica is None or not primary_id:
+        return False, None
+    return replica.lookup(primary_id)
+
+
+def _retrieve_curie_result(curie):
+    try:
+        return curie, retrieve_curie(curie), None
+    except Exception as e:
+        return curie, None, e
+
+
+def _bulk_retrieve(register, primary_ids):
+    # Returns records keyed by primary id, or None if the register could not serve the bulk lookup
+    response = register_request(register, "/records", ["ids=" + quote(','.join(primary_ids))], 'get', None)
+    if response.status_code != 200:
+        app.logger.info("Bulk lookup unavailable for register '{}', response was {}".format(register, response.status_code))
+        return None
+    found = response.json()
+    if not isinstance(found, dict):
+        return None
+    for primary_id in primary_ids:
+        if found.get(primary_id) is not None:
+            CURIE_CACHE.set("{}:{}".format(register, primary_id), found[primary_id], app.config['CURIE_CACHE_REGISTER_TTLS'].get(register))
+    return found
+
+
+def retrieve_curie(curie, fresh=False):
     """Lookup the given curie and return record if found/valid, else return None
+
+    A fresh lookup, for a record whose current state is validated such as one being updated, skips the shared cache and
+    replicas and asks the register, once per validation scope
     """
-    if curie in CURIE_CACHE:
-        return CURIE_CACHE[curie]
-    register, primary_id = curie.split(':')
+    if fresh:
+        return scoped_value(("fresh", curie), lambda: _fetch_record(curie))
+    record = _cached_record(curie)
+    if record is not None:
+        return record
+    found, record = _replica_lookup(curie)
+    if found:
+        _remember(curie, record)
+        return record
+    return _fetch_record(curie)
+
+
+def _fetch_record(curie):
+    # Record for curie from its register, or None if there is no such record, refreshing the shared cache
+    register, _, primary_id = curie.partition(':')
     if register not in REGISTER_INFO:
         raise Exception("Invalid register name '{}'".format(register))
-    response = register_request(register, "/record/" + primary_id, [], 'get', None)
+    with metrics.timed('curie-fetch'):
+        response = register_request(register, "/record/" + quote(primary_id, safe=''), [], 'get', None)
     if response.status_code == 404:
         return None
     if response.status_code == 200:
         record = response.json()
-        CURIE_CACHE[curie] = record
+        CURIE_CACHE.set(curie, record, app.config['CURIE_CACHE_REGISTER_TTLS'].get(register))
+        _remember(curie, record)
         return record
     response.raise_for_status()
 
 
-def register_request(sub_domain, end_point, parameters, method, json_payload):
+def invalidate_record(sub_domain, primary_id):
+    """Discard cached data for a record that has been created or updated
+    """
+    CURIE_CACHE.invalidate("{}:{}".format(sub_domain, primary_id))
+    if sub_domain in REPLICAS:
+        REPLICAS[sub_domain].invalidate(primary_id)
+    ETAG_CACHE.invalidate((sub_domain, "/record/{}".format(primary_id)))
+    ETAG_CACHE.invalidate((sub_domain, "/records"))
+    # Resolved responses of any register may embed the record
+    paths = ("/records", "/record/{}".format(primary_id))
+    RESPONSE_CACHE.invalidate_where(lambda key: key[2] is not None or (key[0] == sub_domain and key[1] in paths))
+    GEOMETRY_CACHE.invalidate_where(lambda key: key[0] == sub_domain or key[1] is not None)
+
+
+def record_etag(record):
+    """Entity tag for a register record, from its item hash, or None if it has none
+    """
+    if not isinstance(record, dict):
+        return None
+    return record.get('item-hash') or None
+
+
+def records_etag(records):
+    """Entity tag for all records of a register, from the latest entry number, or None if a record has no entry number
+    """
+    if not isinstance(records, dict) or not all(isinstance(record, dict) and 'entry-number' in record for record in records.values()):
+        return None
+    return "entry-{}".format(max((record_stream.entry_number(record) for record in records.values()), default=0))
+
+
+# An entry number in JSON text; a key in a string value has escaped quotes so does not match
+ENTRY_NUMBER_PATTERN = re.compile(rb'"entry-number":\s*"?(-?\d+)')
+
+
+def raw_records_etag(body):
+    """Entity tag as for records_etag, read from the JSON bytes of all records of a register without decoding them
+
+    A body with no entry numbers has no tag, but unlike records_etag one without entry numbers for some records still does
+    """
+    numbers = [int(number) for number in ENTRY_NUMBER_PATTERN.findall(body)]
+    if not numbers:
+        return "entry-0" if body.strip() == b'{}' else None
+    return "entry-{}".format(max(numbers))
+
+
+def body_etag(body):
+    """Entity tag for a response body, used where resolved records may change without a new entry
+    """
+    return hashlib.sha1(body if isinstance(body, bytes) else body.encode('utf-8')).hexdigest()
+
+
+def create_records(sub_domain, json_payloads, parameters):
+    """Create the given records in the register in chunks
+
+    Each chunk is sent in one call when the register supports batch creation, otherwise its records are sent in
+    parallel. Returns (status code, created record or None, error text or None) per payload, in order
+    """
+    results = []
+    chunk_size = app.config['BATCH_CHUNK_SIZE']
+    for start in range(0, len(json_payloads), chunk_size):
+        chunk = json_payloads[start:start + chunk_size]
+        chunk_results = None
+        if app.config['REGISTER_BATCH_CREATE']:
+            chunk_results = _batch_create(sub_domain, chunk, parameters)
+        if chunk_results is None:
+            chunk_results = WRITE_EXECUTOR.map(lambda json_payload: _create(sub_domain, json_payload, parameters), chunk)
+        results.extend(chunk_results)
+    return results
+
+
+def _create(sub_domain, json_payload, parameters):
+    response = register_request(sub_domain, "/records", parameters, 'post', json_payload)
+    if response.status_code != 201:
+        return response.status_code, None, response.text
+    return response.status_code, response.json(), None
+
+
+def _batch_create(sub_domain, json_payloads, parameters):
+    # Returns None if the register has no batch creation, so records can be sent individually
+    response = register_request(sub_domain, "/records/batch", parameters, 'post', json_payloads)
+    if response.status_code in (404, 405):
+        app.logger.info("Batch creation unavailable for register '{}', response was {}".format(sub_domain, response.status_code))
+        return None
+    if response.status_code in (200, 201):
+        records = response.json()
+        if isinstance(records, list) and len(records) == len(json_payloads):
+            return [(201, record, None) for record in records]
+    return [(response.status_code, None, response.text) for json_payload in json_payloads]
+
+
+def register_request(sub_domain, end_point, parameters, method, json_payload, stream=False, headers=None):
     """Send request to register backend
     """
     try:
-        response = getattr(requests, method.lower())("{}/{}{}?{}".format(app.config['LLC_REGISTER_URL'], sub_domain, end_point, '&'.join(parameters)),
-                                                     json=json_payload)
+        with metrics.timed('register', nested=False):
+            response = REGISTER_CLIENT.request(method, "{}/{}{}?{}".format(app.config['LLC_REGISTER_URL'], sub_domain, end_point, '&'.join(parameters)),
+                                               json=json_payload, stream=stream, headers=headers)
     except requests.HTTPError as e:
         if e.response.text.startswith("<!DOCTYPE HTML"):
             flask.abort(500)
         else:
             return e.response
     return response
+
+
+def service_metrics():
+    """Cache, register client, schema registry, replica, write queue and startup statistics as (name, type, help, samples) metric families
+    """
+    caches = [("curie", CURIE_CACHE), ("etag", ETAG_CACHE), ("response", RESPONSE_CACHE), ("geometry", GEOMETRY_CACHE)]
+    cache_stats = [(name, cache_instance.stats()) for name, cache_instance in caches]
+    client_stats = REGISTER_CLIENT.stats()
+    registry_stats = SCHEMA_REGISTRY.stats()
+    replica_stats = [(register, replica.stats()) for register, replica in sorted(REPLICAS.items())]
+    relay_stats = CANONICAL_RELAY.stats()
+    queue_stats = [WRITE_QUEUE.stats()] if WRITE_QUEUE is not None else []
+    return [
+        ("llc_api_cache_entries", "gauge", "Entries held in each cache",
+         [((("cache", name),), stats["size"]) for name, stats in cache_stats]),
+        ("llc_api_cache_weight", "gauge", "Total weight of the entries in each cache",
+         [((("cache", name),), stats["weight"]) for name, stats in cache_stats]),
+        ("llc_api_cache_events_total", "counter", "Cache hits, misses, expirations, evictions and invalidations",
+         [((("cache", name), ("event", event)), stats[event])
+          for name, stats in cache_stats for event in ("hits", "misses", "expirations", "evictions", "invalidations")]),
+        ("llc_api_register_requests_total", "counter", "Requests sent to the register, failed requests and retries",
+         [((("result", result),), client_stats[result]) for result in ("requests", "errors", "retries")]),
+        ("llc_api_register_pool_connections", "gauge", "Connections opened and idle in each register connection pool",
+         [((("host", pool["host"]), ("state", state)), pool[key])
+          for pool in client_stats["pools"] for state, key in (("opened", "connections-opened"), ("idle", "idle"))]),
+        ("llc_api_schema_lookups_total", "counter", "Schema validator lookups found and not found in the registry",
+         [((("result", "hit"),), sum(registry_stats["hits"].values())), ((("result", "miss"),), sum(registry_stats["misses"].values()))]),
+        ("llc_api_replica_records", "gauge", "Records held in each register replica",
+         [((("register", register),), stats["size"]) for register, stats in replica_stats]),
+        ("llc_api_replica_age_seconds", "gauge", "Time since each register replica was last synced",
+         [((("register", register),), stats["age"]) for register, stats in replica_stats]),
+        ("llc_api_replica_ready", "gauge", "Whether each register replica is answering lookups",
+         [((("register", register),), stats["ready"]) for register, stats in replica_stats]),
+        ("llc_api_replica_events_total", "counter", "Register replica lookup hits and fallbacks, syncs and sync errors",
+         [((("register", register), ("event", event)), stats[event])
+          for register, stats in replica_stats for event in ("hits", "fallbacks", "syncs", "sync-errors")]),
+        ("llc_api_register_responses_total", "counter", "Successful register responses relayed as received or decoded and re-encoded",
+         [((("result", result),), relay_stats[result]) for result in ("relayed", "encoded")]),
+        ("llc_api_write_queue_jobs", "gauge", "Queued writes waiting for or being written to the register",
+         [((("state", state),), stats[state]) for stats in queue_stats for state in ("queued", "running")]),
+        ("llc_api_write_queue_events_total", "counter", "Writes queued, written, failed, retried and rejected because the queue was full",
+         [((("event", event),), stats[event]) for stats in queue_stats for event in ("submitted", "done", "failed", "retries", "rejected")]),
+        ("llc_api_startup_seconds", "gauge", "Time taken by each stage of starting the API",
+         [((("stage", name[:-len("-seconds")]),), value) for name, value in sorted(STARTUP_STATS.items()) if name.endswith("-seconds")]),
+        ("llc_api_schema_source", "gauge", "Whether schema routes were loaded from the bundle or parsed from RAML",
+         [((("source", STARTUP_STATS.get("schema-source")),), 1)])
+    ]
@@ -1,6 +1,15 @@
 from application import register_utils
 
 
+def record_curies(sub_domain, end_point, end_point_pattern, method, json_payload):
+    """Curie of the existing record needed to validate an update, which is looked up fresh
+    """
+    pri_id = register_utils.REGISTER_INFO[sub_domain]['primary-id']
+    if method.lower() == 'put' and pri_id in json_payload:
+        return ["{}:{}".format(sub_domain, json_payload[pri_id])]
+    return []
+
+
 def validate_primary_id(sub_domain, end_point, end_point_pattern, method, json_payload):
     if method.lower() == 'put':
         pri_id = register_utils.REGISTER_INFO[sub_domain]['primary-id']
@@ -14,7 +23,7 @@ def validate_archive_update(sub_domain, end_point, end_point_pattern, method, js
     if method.lower() == 'put':
         try:
             pri_id = register_utils.REGISTER_INFO[sub_domain]['primary-id']
-            record = register_utils.retrieve_curie("{}:{}".format(sub_domain, json_payload[pri_id]))
+            record = register_utils.retrieve_curie("{}:{}".format(sub_domain, json_payload[pri_id]), fresh=True)
         except Exception as e:
             errors.append(str(e))
             record = None
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import jsonschema
+
+
+# Error messages returned by validate_json, kept here so the registry can store them against end points
+RESOURCE_NOT_FOUND = 'cannot find RAML resource definition'
+SCHEMA_NOT_FOUND = 'cannot find schema in RAML resource definition'
+SCHEMA_INVALID = 'invalid json schema'
+
+
+def raml_routes(raml):
+    """Reduce a parsed RAML document to the routes and schemas needed for validation
+    """
+    resources = []
+    for resource in raml.resources:
+        schema_name = None
+        if resource.body:
+            for body in resource.body:
+                if body.mime_type == "application/json":
+                    schema_name = body.schema
+                    break
+        resources.append([resource.path, resource.method.lower(), schema_name])
+    schemas = {}
+    for schema in raml.schemas:
+        for name, value in schema.items():
+            schemas.setdefault(name, value)
+    return {"resources": resources, "schemas": schemas}
+
+
+def parse_routes(schema_folder, raml_files):
+    """Parse the RAML file for each sub-domain into routes, as plain JSON data
+
+    ramlfications is imported here as it is slow to import and is not needed when a current schema bundle is loaded.
+    """
+    import ramlfications
+    routes = {sub_domain: raml_routes(ramlfications.parse(os.path.join(schema_folder, raml_file)))
+              for sub_domain, raml_file in raml_files.items()}
+    # Schemas with '$ref's come back holding lazy reference proxies, serialise them as the data they refer to
+    return json.loads(json.dumps(routes, default=lambda proxy: proxy.__subject__))
+
+
+def bundle_hash(files, raml_files):
+    """Content hash of the schema files and the RAML file used by each sub-domain, identifying a schema bundle
+    """
+    digest = hashlib.sha256(json.dumps(raml_files, sort_keys=True).encode('utf-8'))
+    for file_name in sorted(files):
+        digest.update(b'\0' + file_name.encode('utf-8') + b'\0' + files[file_name].encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_bundle(schema_folder, raml_files, files=None):
+    """Compile the routes and schemas of every sub-domain into a bundle, with the hash of the files it was built from
+    """
+    files = files if files is not None else load_schema_files(schema_folder)
+    return {"hash": bundle_hash(files, raml_files), "routes": parse_routes(schema_folder, raml_files)}
+
+
+def load_routes(schema_folder, raml_files, bundle_path, files):
+    """Routes for every sub-domain from the schema bundle if it was built from the current files, else parsed from the RAML
+
+    Returns (routes, source) where source is 'bundle' or 'raml'.
+    """
+    try:
+        with open(bundle_path, encoding='utf-8') as bundle_file:
+            bundle = json.load(bundle_file)
+    except (OSError, ValueError):
+        bundle = {}
+    if isinstance(bundle, dict) and bundle.get("hash") == bundle_hash(files, raml_files):
+        return bundle["routes"], "bundle"
+    return parse_routes(schema_folder, raml_files), "raml"
+
+
+def load_schema_files(schema_folder):
+    """Read every file in the schema folder into memory, returning contents keyed by file name
+    """
+    files = {}
+    for file_name in sorted(os.listdir(schema_folder)):
+        path = os.path.join(schema_folder, file_name)
+        if os.path.isfile(path):
+            with open(path, encoding='utf-8') as schema_file:
+                files[file_name] = schema_file.read()
+    return files
+
+
+class SchemaRegistry(object):
+    """Ready-to-use JSON schema validators for every register end point and named schema definition
+
+    Built once at startup; all '$ref' resolution is served from an in-memory store of the schema folder. Safe to share
+    between threads.
+    """
+
+    def __init__(self, schema_folder, routes, files=None):
+        start = time.time()
+        self.base_uri = 'file://' + schema_folder + '/'
+        self.files = files if files is not None else load_schema_files(schema_folder)
+        self.store = {}
+        for file_name, content in self.files.items():
+            if file_name.endswith('.json'):
+                self.store[self.base_uri + file_name] = json.loads(content)
+        # Validators are not thread-safe (their ref resolvers track scope), so each thread gets its own copies
+        self._local = threading.local()
+        self._local.validators = {}
+        self.endpoints = {}
+        for sub_domain, register_routes in routes.items():
+            for path, method, schema_name in register_routes["resources"]:
+                key = (sub_domain, path, method)
+                if schema_name is None or schema_name not in register_routes["schemas"]:
+                    self.endpoints[key] = SCHEMA_NOT_FOUND
+                else:
+                    self.endpoints[key] = self._prebuild(key, register_routes["schemas"][schema_name])
+        self.definitions = {}
+        for uri in sorted(self.store):
+            for name in self.store[uri].get("definitions", {}):
+                ref = "{}#/definitions/{}".format(uri[len(self.base_uri):], name)
+                self.definitions[ref] = self._prebuild(ref, {"$ref": ref})
+        self.build_time = time.time() - start
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+    def _prebuild(self, key, schema):
+        # Returns the schema, or an error if no validator can be built for it
+        validator = self._build_validator(schema)
+        if isinstance(validator, str):
+            return validator
+        self._local.validators[key] = validator
+        return schema
+
+    def _build_validator(self, schema):
+        # Each validator gets its own resolver so local '#/definitions' refs resolve against its own schema
+        resolver = jsonschema.RefResolver(self.base_uri, schema, store=self.store)
+        try:
+            jsonschema.Draft4Validator.check_schema(schema)
+            return jsonschema.Draft4Validator(schema, resolver=resolver)
+        except jsonschema.SchemaError:
+            return SCHEMA_INVALID
+
+    def _thread_validator(self, key, schema):
+        validators = getattr(self._local, 'validators', None)
+        if validators is None:
+            validators = self._local.validators = {}
+        validator = validators.get(key)
+        if validator is None:
+            validator = validators[key] = self._build_validator(schema)
+        return validator
+
+    def _count(self, counter, key):
+        with self._lock:
+            counter[key] += 1
+
+    def endpoint_validator(self, sub_domain, end_point_pattern, method):
+        """Return (validator, error) for the given end point pattern (flask or RAML style) and method
+        """
+        raml_end_point = end_point_pattern.replace('<', '{').replace('>', '}')
+        key = (sub_domain, raml_end_point, method.lower())
+        entry = self.endpoints.get(key, RESOURCE_NOT_FOUND)
+        if isinstance(entry, str):
+            self._count(self.misses, "{} {} {}".format(*key))
+            return None, entry
+        self._count(self.hits, "{} {} {}".format(*key))
+        return self._thread_validator(key, entry), None
+
+    def definition_validator(self, ref):
+        """Return the validator for a named definition e.g. 'local-land-charge.json#/definitions/curie'
+        """
+        entry = self.definitions.get(ref)
+        if entry is None or isinstance(entry, str):
+            self._count(self.misses, ref)
+            raise KeyError("No valid schema definition '{}'".format(ref))
+        self._count(self.hits, ref)
+        return self._thread_validator(ref, entry)
+
+    def stats(self):
+        """Summary of the registry contents, lookup counts and build time
+        """
+        with self._lock:
+            return {"build-time": self.build_time,
+                    "schema-files": len(self.files),
+                    "endpoint-validators": len(self.endpoints),
+                    "definition-validators": len(self.definitions),
+                    "hits": dict(self.hits),
+                    "misses": dict(self.misses)}
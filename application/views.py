@@ -1,8 +1,27 @@
 import json
+import re
+import time
 import traceback
-from flask import request
+from urllib.parse import urlencode
 
-from application import app, register_utils
+from flask import Response, request
+from werkzeug.http import quote_etag
+
+import application
+from application import app, compression, curie_resolver, geometry_utils, metrics, record_stream, register_utils, write_queue
+
+
+# Characters that cannot be part of a primary id looked up by 'GET /records?ids=', as they would change the curie or register path
+INVALID_ID = re.compile(r'[:/?#\s]')
+
+app.wsgi_app = compression.DecompressRequestMiddleware(app.wsgi_app, app.config['MAX_DECOMPRESSED_REQUEST_BYTES'])
+
+
+def start():
+    """Start the register replicas and the write queue, called by the process that serves the API once it is loaded
+    """
+    register_utils.start_replicas()
+    register_utils.start_write_queue()
 
 
 @app.route("/")
@@ -11,6 +30,36 @@ def check_status():
     return request.headers['Host'].split('.')[0] + " API running."
 
 
+@app.route("/metrics")
+def get_metrics():
+    """Request counts and timings with cache, register, replica and startup statistics, in the Prometheus text format
+    """
+    if not app.config['METRICS_ENABLED']:
+        return (json.dumps({"errors": ['metrics are disabled']}), 404, {"Content-Type": "application/json"})
+    return (metrics.METRICS.render(register_utils.service_metrics()), 200, {"Content-Type": "text/plain; version=0.0.4"})
+
+
+@app.before_request
+def start_timing():
+    metrics.start_request()
+
+
+@app.after_request
+def finish_timing(response):
+    # Unknown sub-domains share one label so arbitrary Host headers cannot grow the metrics
+    sub_domain = request.headers.get('Host', '').split('.')[0]
+    if sub_domain not in register_utils.REGISTER_INFO:
+        sub_domain = 'other'
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    return metrics.finish_request(response, route, request.method, sub_domain)
+
+
+@app.after_request
+def compress(response):
+    # Registered after finish_timing so it runs first, and compression is included in the request timing
+    return compression.compress_response(response)
+
+
 @app.errorhandler(Exception)
 def internal_exception_handler(error):
     """Catch all for logging unexcepted errors
@@ -30,16 +79,181 @@ def get_records():
     if sub_domain not in register_utils.REGISTER_INFO:
         app.logger.warn("Invalid sub-domain '{}' used for records retrieval".format(sub_domain))
         return (json.dumps({"errors": ['invalid sub-domain']}), 400, {"Content-Type": "application/json"})
-    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(resolve)], request.method, None)
+    if request.args.get('ids') is not None:
+        return get_records_by_id(sub_domain, request.args.get('ids'))
+    if request.args.get('page-size') is not None or request.args.get('cursor') is not None:
+        return get_records_page(sub_domain, resolve)
+    if app.config['STREAM_RECORDS']:
+        return stream_records(sub_domain, resolve)
+    not_modified = cached_not_modified(sub_domain, resolve)
+    if not_modified is not None:
+        return not_modified
+    cached = register_utils.RESPONSE_CACHE.get((sub_domain, request.path, resolve))
+    if cached is not None:
+        app.logger.info("Retrieved records for sub-domain '{}' from response cache".format(sub_domain))
+        return tagged_response(sub_domain, resolve, *cached)
+    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(register_resolve(resolve))], request.method, None)
     if response.status_code != 200:
         app.logger.error("Failed to retrieve records for sub-domain '{}' response was '{}'".format(sub_domain, response.text))
         return_value = json.dumps({"errors": [response.text]})
     else:
         app.logger.info("Retrieved records for sub-domain '{}'".format(sub_domain))
-        return_value = json.dumps(response.json(), sort_keys=True)
+        return_value, records = register_body(sub_domain, resolve, response)
+        if resolve is not None:
+            etag = register_utils.body_etag(return_value)
+        elif records is None:
+            # Relayed without decoding, which would cost nearly as much as the re-encoding it saved
+            etag = register_utils.raw_records_etag(return_value)
+        else:
+            etag = register_utils.records_etag(records)
+        register_utils.RESPONSE_CACHE.set((sub_domain, request.path, resolve), (return_value, etag))
+        return tagged_response(sub_domain, resolve, return_value, etag)
     return (return_value, response.status_code, {"Content-Type": "application/json"})
 
 
+def register_resolve(resolve):
+    """Resolve value to send to the register, None when the API resolves curie links itself
+    """
+    return None if resolve == '1' and app.config['RESOLVE_IN_API'] else resolve
+
+
+def register_body(sub_domain, resolve, response):
+    """Body for a successful register response, and its decoded value or None if it was not decoded
+
+    The register's bytes are relayed untouched when they are already canonical and no links are resolved in the API
+    """
+    if register_resolve(resolve) == resolve:
+        return register_utils.CANONICAL_RELAY.encode(sub_domain, response)
+    value = resolve_links(resolve, register_utils.JSON_CODEC.decode_response(response))
+    return register_utils.JSON_CODEC.dumps(value), value
+
+
+def decoded(body, value):
+    """JSON value of a register response body, decoding a body relayed without decoding only when its value is needed
+    """
+    return value if value is not None else register_utils.JSON_CODEC.loads(body)
+
+
+def resolve_links(resolve, value):
+    """The register's JSON value, with its curie links resolved by the API if the register was not asked to resolve them
+    """
+    if register_resolve(resolve) == resolve:
+        return value
+    with metrics.timed('resolve'):
+        return curie_resolver.resolve(value, app.config['RESOLVE_MAX_DEPTH'])
+
+
+def cached_not_modified(sub_domain, resolve):
+    """304 response if the client already has the representation last returned for this path, without calling the register
+
+    Returns None if the request is not conditional or the entity tag is not cached, resolved representations are never cached
+    """
+    if resolve is not None or not request.if_none_match:
+        return None
+    etag = register_utils.ETAG_CACHE.get((sub_domain, request.path))
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    app.logger.info("Answered '{}' for sub-domain '{}' from entity tag cache".format(request.path, sub_domain))
+    return ('', 304, {"ETag": quote_etag(etag)})
+
+
+def tagged_response(sub_domain, resolve, return_value, etag):
+    """Response with the entity tag of the representation, or 304 if it matches 'If-None-Match'
+    """
+    headers = {"Content-Type": "application/json"}
+    if etag is None:
+        return (return_value, 200, headers)
+    if resolve is None:
+        register_utils.ETAG_CACHE.set((sub_domain, request.path), etag)
+    headers["ETag"] = quote_etag(etag)
+    if request.if_none_match.contains_weak(etag):
+        return ('', 304, {"ETag": headers["ETag"]})
+    return (return_value, 200, headers)
+
+
+def stream_records(sub_domain, resolve):
+    """Relay all records for register (indicated by sub-domain) to the client in chunks as they are received
+    """
+    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(resolve)], request.method, None, stream=True)
+    if response.status_code != 200:
+        app.logger.error("Failed to retrieve records for sub-domain '{}' response was '{}'".format(sub_domain, response.text))
+        response.close()
+        return (json.dumps({"errors": [response.text]}), response.status_code, {"Content-Type": "application/json"})
+    app.logger.info("Streaming records for sub-domain '{}'".format(sub_domain))
+    return Response(record_stream.relay(response, app.config['STREAM_CHUNK_SIZE'], app.config['STREAM_CANONICAL']),
+                    200, {"Content-Type": "application/json"})
+
+
+def get_records_page(sub_domain, resolve):
+    """Retrieve the page of records after the given entry-number cursor for register (indicated by sub-domain)
+
+    Pagination parameters are forwarded to the register; if it does not paginate, the page is selected from its streamed response
+    """
+    try:
+        page_size = int(request.args.get('page-size', app.config['MAX_PAGE_SIZE']))
+        cursor = int(request.args.get('cursor', 0))
+    except ValueError:
+        page_size = cursor = -1
+    if not 0 < page_size <= app.config['MAX_PAGE_SIZE'] or cursor < 0:
+        app.logger.warn("Invalid page '{}' used for records retrieval for sub-domain '{}'".format(request.query_string, sub_domain))
+        return (json.dumps({"errors": ["page-size must be between 1 and {} and cursor must be an entry-number".format(app.config['MAX_PAGE_SIZE'])]}),
+                400, {"Content-Type": "application/json"})
+    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(register_resolve(resolve)), "page-size={}".format(page_size),
+                                                                          "cursor={}".format(cursor)], request.method, None, stream=True)
+    if response.status_code != 200:
+        app.logger.error("Failed to retrieve records page for sub-domain '{}' response was '{}'".format(sub_domain, response.text))
+        response.close()
+        return (json.dumps({"errors": [response.text]}), response.status_code, {"Content-Type": "application/json"})
+    try:
+        page, more = record_stream.select_page(record_stream.iter_items(response.iter_content(chunk_size=app.config['STREAM_CHUNK_SIZE'])),
+                                               cursor, page_size)
+    finally:
+        response.close()
+    next_cursor = register_next_cursor(response)
+    if next_cursor is None and more:
+        next_cursor = record_stream.entry_number(page[-1][1])
+    headers = {"Content-Type": "application/json"}
+    if next_cursor is not None:
+        next_args = {"page-size": page_size, "cursor": next_cursor}
+        if resolve is not None:
+            next_args["resolve"] = resolve
+        headers["Next-Cursor"] = str(next_cursor)
+        headers["Link"] = '<{}records?{}>; rel="next"'.format(request.url_root, urlencode(sorted(next_args.items())))
+    app.logger.info("Retrieved {} records after entry {} for sub-domain '{}'".format(len(page), cursor, sub_domain))
+    return (json.dumps(resolve_links(resolve, dict(page)), sort_keys=True), 200, headers)
+
+
+def register_next_cursor(response):
+    """Next cursor supplied by the register, from a 'Next-Cursor' header or the cursor of a 'Link' rel="next" header
+    """
+    if response.headers.get('Next-Cursor'):
+        return int(response.headers['Next-Cursor'])
+    match = re.search(r'<[^>]*[?&]cursor=(\d+)[^>]*>\s*;\s*rel="?next"?', response.headers.get('Link', ''))
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def get_records_by_id(sub_domain, ids):
+    """Retrieve the records with the given comma separated identifiers for register (indicated by sub-domain)
+    """
+    primary_ids = [primary_id for primary_id in ids.split(',') if primary_id]
+    if not primary_ids or len(primary_ids) > app.config['MAX_LOOKUP_IDS']:
+        app.logger.warn("Invalid ids '{}' used for records retrieval for sub-domain '{}'".format(ids, sub_domain))
+        return (json.dumps({"errors": ["between 1 and {} ids must be supplied".format(app.config['MAX_LOOKUP_IDS'])]}), 400,
+                {"Content-Type": "application/json"})
+    invalid = [primary_id for primary_id in primary_ids if INVALID_ID.search(primary_id)]
+    if invalid:
+        app.logger.warn("Invalid ids '{}' used for records retrieval for sub-domain '{}'".format(ids, sub_domain))
+        return (json.dumps({"errors": ["ids must not contain ':', '/', '?', '#' or whitespace: {}".format(', '.join(invalid))]}), 400,
+                {"Content-Type": "application/json"})
+    curies = {primary_id: "{}:{}".format(sub_domain, primary_id) for primary_id in primary_ids}
+    records = register_utils.retrieve_curies(curies.values())
+    found = {primary_id: records[curie] for primary_id, curie in curies.items() if records[curie] is not None}
+    app.logger.info("Retrieved {} of {} records by id for sub-domain '{}'".format(len(found), len(curies), sub_domain))
+    return (json.dumps(found, sort_keys=True), 200, {"Content-Type": "application/json"})
+
+
 @app.route("/record/<primary_id>", methods=["GET"])
 def get_record(primary_id):
     """Get record for the given identifier for register (indicated by sub-domain)
@@ -49,23 +263,51 @@ def get_record(primary_id):
     if sub_domain not in register_utils.REGISTER_INFO:
         app.logger.warn("Invalid sub-domain '{}' used for record retrieval".format(sub_domain))
         return (json.dumps({"errors": ['invalid sub-domain']}), 400, {"Content-Type": "application/json"})
-    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(resolve)], request.method, None)
+    not_modified = cached_not_modified(sub_domain, resolve)
+    if not_modified is not None:
+        return not_modified
+    cached = register_utils.RESPONSE_CACHE.get((sub_domain, request.path, resolve))
+    if cached is not None:
+        app.logger.info("Retrieved record '{}' for sub-domain '{}' from response cache".format(primary_id, sub_domain))
+        return tagged_response(sub_domain, resolve, *cached)
+    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(register_resolve(resolve))], request.method, None)
     if response.status_code != 200:
         app.logger.warn("Failed to retrieve record '{}' for sub-domain '{}' response was '{}'".format(primary_id, sub_domain, response.text))
         return_value = json.dumps({"errors": [response.text]})
     else:
         app.logger.info("Retrieved record '{}' for sub-domain '{}'".format(primary_id, sub_domain))
-        return_value = json.dumps(response.json(), sort_keys=True)
+        return_value, record = register_body(sub_domain, resolve, response)
+        etag = register_utils.record_etag(decoded(return_value, record)) if resolve is None else register_utils.body_etag(return_value)
+        register_utils.RESPONSE_CACHE.set((sub_domain, request.path, resolve), (return_value, etag))
+        return tagged_response(sub_domain, resolve, return_value, etag)
     return (return_value, response.status_code, {"Content-Type": "application/json"})
 
 
+def max_errors_arg():
+    """Most schema errors to report from the 'max-errors' query parameter, 0 for all, or None for the configured default
+
+    Returns (max errors, None), or (None, error response) if the parameter is not a whole number
+    """
+    try:
+        max_errors = int(request.args['max-errors']) if 'max-errors' in request.args else None
+    except ValueError:
+        max_errors = -1
+    if max_errors is not None and max_errors < 0:
+        app.logger.warn("Invalid max-errors '{}' used".format(request.args['max-errors']))
+        return None, (json.dumps({"errors": ["max-errors must be a whole number"]}), 400, {"Content-Type": "application/json"})
+    return max_errors, None
+
+
 @app.route("/records", methods=["POST"])
 def create_record():
     """Create records using given JSON for register (indicated by sub-domain)
     """
     sub_domain = request.headers['Host'].split('.')[0]
     json_payload = request.get_json()
-    result = register_utils.validate_json(sub_domain, '/records', request.method, json_payload)
+    max_errors, invalid = max_errors_arg()
+    if invalid:
+        return invalid
+    result = register_utils.validate_json(sub_domain, '/records', request.method, json_payload, max_errors)
     if len(result['errors']) > 0:
         app.logger.warn("Error validating create json for sub-domain '{}' error(s) were '{}'".format(sub_domain, str(result['errors'])))
         return (json.dumps(result), 400, {"Content-Type": "application/json"})
@@ -73,6 +315,9 @@ def create_record():
     if len(result['errors']) > 0:
         app.logger.warn("Error in additional validation of create json for sub-domain '{}' error(s) were '{}'".format(sub_domain, str(result['errors'])))
         return (json.dumps(result), 400, {"Content-Type": "application/json"})
+    queued = queue_write(sub_domain, json_payload)
+    if queued is not None:
+        return queued
     resolve = request.args.get('resolve')
     response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(resolve)], request.method, json_payload)
     if response.status_code != 201:
@@ -81,20 +326,110 @@ def create_record():
         headers = {"Content-Type": "application/json"}
     else:
         app.logger.info("Created record for sub-domain '{}'".format(sub_domain))
-        record = response.json()
-        return_value = json.dumps(record, sort_keys=True)
+        record = register_utils.JSON_CODEC.decode_response(response)
+        primary_id = record[register_utils.REGISTER_INFO[sub_domain]['primary-id']]
+        register_utils.invalidate_record(sub_domain, primary_id)
+        return_value = register_utils.JSON_CODEC.dumps(record)
         headers = {"Content-Type": "application/json",
-                   "Location": "{}record/{}".format(request.url_root, record[register_utils.REGISTER_INFO[sub_domain]['primary-id']])}
+                   "Location": "{}record/{}".format(request.url_root, primary_id)}
     return (return_value, response.status_code, headers)
 
 
+def queue_write(sub_domain, json_payload):
+    """202 response for a validated write queued to be sent to the register later, or None if it is to be written now
+    """
+    prefer = [preference.split('=')[0].strip().lower() for preference in request.headers.get('Prefer', '').split(',')]
+    if register_utils.WRITE_QUEUE is None or (app.config['ASYNC_WRITES'] == 'prefer' and 'respond-async' not in prefer):
+        return None
+    try:
+        job = register_utils.WRITE_QUEUE.submit(sub_domain, request.method, request.path, ["resolve={}".format(request.args.get('resolve'))],
+                                                json_payload)
+    except write_queue.QueueNotStarted:
+        # Served without views.start(), so written now rather than accepted and never sent
+        app.logger.warn("Write queue not started, writing {} for sub-domain '{}' now".format(request.method, sub_domain))
+        return None
+    except write_queue.QueueFull as e:
+        app.logger.warn("Write queue full, rejected {} for sub-domain '{}'".format(request.method, sub_domain))
+        return (json.dumps({"errors": [str(e)]}), 503, {"Content-Type": "application/json", "Retry-After": "1"})
+    app.logger.info("Queued {} of '{}' for sub-domain '{}' as job '{}'".format(request.method, request.path, sub_domain, job['id']))
+    headers = {"Content-Type": "application/json", "Location": "{}jobs/{}".format(request.url_root, job['id'])}
+    if 'respond-async' in prefer:
+        headers["Preference-Applied"] = "respond-async"
+    return (json.dumps(job_status(job), sort_keys=True), 202, headers)
+
+
+def job_status(job):
+    return {"id": job['id'],
+            "state": job['state'],
+            "attempts": job['attempts'],
+            "status": job['status'],
+            "errors": job['errors'],
+            "created": job['created'],
+            "updated": job['updated'],
+            "location": "{}record/{}".format(request.url_root, job['record-id']) if job['record-id'] is not None else None}
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """State of a queued write for register (indicated by sub-domain), with the written record's location once it is done
+    """
+    sub_domain = request.headers['Host'].split('.')[0]
+    job = register_utils.WRITE_QUEUE.find(job_id) if register_utils.WRITE_QUEUE is not None else None
+    if job is None or job['register'] != sub_domain:
+        app.logger.warn("Job '{}' not found for sub-domain '{}'".format(job_id, sub_domain))
+        return (json.dumps({"errors": ['job not found']}), 404, {"Content-Type": "application/json"})
+    return (json.dumps(job_status(job), sort_keys=True), 200, {"Content-Type": "application/json"})
+
+
+@app.route("/records/batch", methods=["POST"])
+def create_records():
+    """Create records using given JSON array for register (indicated by sub-domain), returning a result per record
+    """
+    sub_domain = request.headers['Host'].split('.')[0]
+    json_payload = request.get_json()
+    if sub_domain not in register_utils.REGISTER_INFO:
+        app.logger.warn("Invalid sub-domain '{}' used for batch create".format(sub_domain))
+        return (json.dumps({"errors": ['invalid sub-domain']}), 400, {"Content-Type": "application/json"})
+    mode = request.args.get('mode', app.config['BATCH_MODE'])
+    if not isinstance(json_payload, list) or not 0 < len(json_payload) <= app.config['MAX_BATCH_SIZE'] or mode not in ('atomic', 'partial'):
+        app.logger.warn("Invalid batch create request for sub-domain '{}'".format(sub_domain))
+        error = "body must be an array of 1 to {} records and mode must be 'atomic' or 'partial'".format(app.config['MAX_BATCH_SIZE'])
+        return (json.dumps({"errors": [error]}), 400, {"Content-Type": "application/json"})
+    max_errors, invalid = max_errors_arg()
+    if invalid:
+        return invalid
+    validation = register_utils.validate_batch(sub_domain, '/records', '/records', 'POST', json_payload, max_errors)
+    results = [{"index": index, "status": 400 if result['errors'] else None, "errors": result['errors']} for index, result in enumerate(validation)]
+    valid = [index for index, result in enumerate(validation) if not result['errors']]
+    if not valid or (mode == 'atomic' and len(valid) < len(json_payload)):
+        app.logger.warn("Error validating batch create json for sub-domain '{}', {} of {} records invalid".format(sub_domain, len(json_payload) - len(valid),
+                                                                                                                  len(json_payload)))
+        return (json.dumps({"results": results}, sort_keys=True), 400, {"Content-Type": "application/json"})
+    resolve = request.args.get('resolve')
+    created = register_utils.create_records(sub_domain, [json_payload[index] for index in valid], ["resolve={}".format(resolve)])
+    for index, (status_code, record, error) in zip(valid, created):
+        results[index]["status"] = status_code
+        if record is None:
+            results[index]["errors"] = [error]
+        else:
+            primary_id = record[register_utils.REGISTER_INFO[sub_domain]['primary-id']]
+            register_utils.invalidate_record(sub_domain, primary_id)
+            results[index]["location"] = "{}record/{}".format(request.url_root, primary_id)
+    failed = len([result for result in results if result["errors"]])
+    app.logger.info("Created {} of {} records in batch for sub-domain '{}'".format(len(results) - failed, len(results), sub_domain))
+    return (json.dumps({"results": results}, sort_keys=True), 207 if failed else 201, {"Content-Type": "application/json"})
+
+
 @app.route("/record/<primary_id>", methods=["PUT"])
 def update_record(primary_id):
     """Update given record using given JSON for register (indicated by sub-domain)
     """
     sub_domain = request.headers['Host'].split('.')[0]
     json_payload = request.get_json()
-    result = register_utils.validate_json(sub_domain, '/record/<primary_id>', request.method, json_payload)
+    max_errors, invalid = max_errors_arg()
+    if invalid:
+        return invalid
+    result = register_utils.validate_json(sub_domain, '/record/<primary_id>', request.method, json_payload, max_errors)
     if len(result['errors']) > 0:
         app.logger.warn("Error validating update json for sub-domain '{}' error(s) were '{}'".format(sub_domain, str(result['errors'])))
         return (json.dumps(result), 400, {"Content-Type": "application/json"})
@@ -102,6 +437,9 @@ def update_record(primary_id):
     if len(result['errors']) > 0:
         app.logger.warn("Error in additional validation of update json for sub-domain '{}' error(s) were '{}'".format(sub_domain, str(result['errors'])))
         return (json.dumps(result), 400, {"Content-Type": "application/json"})
+    queued = queue_write(sub_domain, json_payload)
+    if queued is not None:
+        return queued
     resolve = request.args.get('resolve')
     response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(resolve)], request.method, json_payload)
     if response.status_code != 200:
@@ -109,7 +447,8 @@ def update_record(primary_id):
         return_value = json.dumps({"errors": [response.text]})
     else:
         app.logger.info("Updated record '{}' for sub-domain '{}'".format(primary_id, sub_domain))
-        return_value = json.dumps(response.json(), sort_keys=True)
+        register_utils.invalidate_record(sub_domain, primary_id)
+        return_value = register_utils.CANONICAL_RELAY.encode(sub_domain, response)[0]
     return (return_value, response.status_code, {"Content-Type": "application/json"})
 
 
@@ -122,17 +461,31 @@ def geometry_search(function):
     if sub_domain not in register_utils.REGISTER_INFO or not register_utils.REGISTER_INFO[sub_domain]['geometry-search']:
         app.logger.warn("Invalid sub-domain '{}' used for geometry search".format(sub_domain))
         return (json.dumps({"errors": ['invalid sub-domain']}), 400, {"Content-Type": "application/json"})
-    result = register_utils.validate_json(sub_domain, '/records/geometry/<function>', request.method, json_payload)
+    max_errors, invalid = max_errors_arg()
+    if invalid:
+        return invalid
+    result = register_utils.validate_json(sub_domain, '/records/geometry/<function>', request.method, json_payload, max_errors)
     if len(result['errors']) > 0:
         app.logger.warn("Error validating geometry search json for sub-domain '{}' error(s) were '{}'".format(sub_domain, str(result['errors'])))
         return (json.dumps(result), 400, {"Content-Type": "application/json"})
     resolve = request.args.get('resolve')
-    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(resolve)], request.method, json_payload)
+    cache_key = (sub_domain, resolve, geometry_utils.geometry_key(function, resolve, json_payload, app.config['GEOMETRY_CACHE_PRECISION']))
+    cached = register_utils.GEOMETRY_CACHE.get(cache_key)
+    if cached is not None:
+        app.logger.info("Geometry search for sub-domain '{}' served from cache".format(sub_domain))
+        return (cached[0], 200, {"Content-Type": "application/json", "Truncated": cached[1]})
+    response = register_utils.register_request(sub_domain, request.path, ["resolve={}".format(register_resolve(resolve))], request.method,
+                                               json_payload)
     if response.status_code != 200:
         app.logger.warn("Failure geometry searching for sub-domain '{}' response was '{}'".format(sub_domain, response.text))
         return_value = json.dumps({"errors": [response.text]})
     else:
         app.logger.info("Geometry search completed for sub-domain '{}'".format(sub_domain))
-        return_value = json.dumps(response.json(), sort_keys=True)
+        return_value = register_body(sub_domain, resolve, response)[0]
+        register_utils.GEOMETRY_CACHE.set(cache_key, (return_value, response.headers.get('Truncated')))
 
     return (return_value, response.status_code, {"Content-Type": "application/json", "Truncated": response.headers.get('Truncated')})
+
+
+register_utils.STARTUP_STATS["startup-seconds"] = round(time.time() - application.started, 3)
+app.logger.info("API loaded in {:.3f}s".format(register_utils.STARTUP_STATS["startup-seconds"]))
@@ -0,0 +1,296 @@
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+
+from application import app
+
+
+# States of jobs that are yet to be written, which are queued again when the journal is replayed
+PENDING_STATES = ('queued', 'running')
+# Register responses worth sending a job again for, any other failure is final
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class QueueFull(Exception):
+    """Raised when a write is submitted while the queue already holds as many pending jobs as it allows
+    """
+
+
+class QueueNotStarted(Exception):
+    """Raised when a write is submitted to a queue whose worker threads are not running, so it would never be sent
+    """
+
+
+class WriteQueue(object):
+    """Register writes accepted for later, sent by a pool of worker threads and recorded in a JSON lines journal
+
+    send(job) writes a job to the register and returns (status code, primary id of the written record or None,
+    error text or None). Jobs are retried with backoff, up to max_attempts sends, when send raises or the register
+    answers with one of RETRY_STATUSES. Each job's id is sent as its idempotency key, so a job sent again after a
+    failure or a restart is not applied twice by a register that honours the key. Updates to the same record are sent
+    one after another in the order they were submitted, a job being retried holding back those after it.
+
+    Each process claims its own journal in directory, through a lock file, and queues again the pending jobs of the
+    journal when it starts, so the jobs of a process that stopped are taken on by the next process to claim it. Job ids
+    name their journal, so any process can report on any job. At most history finished jobs are kept.
+    """
+
+    def __init__(self, directory, send, workers, max_pending, max_attempts, retry_backoff, history):
+        self.directory = directory
+        self.send = send
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.history = history
+        self.jobs = OrderedDict()
+        self.counters = Counter()
+        self.index = None
+        self._finished = deque()
+        self._pending = 0
+        self._lines = 0
+        self._journal = None
+        self._lock_file = None
+        self._queue = queue.Queue()
+        # Jobs waiting behind the job being sent for each record, by job_key
+        self._waiting = {}
+        self._lock = threading.Condition()
+        self._threads = []
+
+    def journal_path(self, index):
+        return os.path.join(self.directory, "journal-{}.jsonl".format(index))
+
+    def _claim(self):
+        # The first journal whose lock file no other process holds, locks are released when their process exits
+        os.makedirs(self.directory, exist_ok=True)
+        index = 0
+        while True:
+            lock_file = open(os.path.join(self.directory, "journal-{}.lock".format(index)), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                index += 1
+                continue
+            return index, lock_file
+
+    def start(self):
+        """Claim a journal, queue its pending jobs again and start the worker threads
+        """
+        if self._threads:
+            return
+        self.index, self._lock_file = self._claim()
+        with self._lock:
+            jobs = read_journal(self.journal_path(self.index))
+            self.jobs.update(jobs)
+            for job in jobs.values():
+                if job['state'] in PENDING_STATES:
+                    job['state'] = 'queued'
+                    self._pending += 1
+                    self._enqueue(job)
+            # The earliest finished are the first forgotten
+            for job in sorted((job for job in jobs.values() if job['state'] not in PENDING_STATES), key=lambda job: job['updated']):
+                self._finish(job)
+            self._compact()
+        if self._pending:
+            app.logger.info("Queued {} pending writes again from journal '{}'".format(self._pending, self.journal_path(self.index)))
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name="write-queue-{}".format(number))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the worker threads once they finish their current jobs and release the journal
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def submit(self, register, method, end_point, parameters, payload):
+        """Queue a write to the register once it is in the journal, returning the job
+        """
+        with self._lock:
+            if not self._threads:
+                raise QueueNotStarted("write queue is not started")
+            if self._pending >= self.max_pending:
+                self.counters['rejected'] += 1
+                raise QueueFull("write queue is full")
+            now = round(time.time(), 3)
+            job = {"id": "{}-{}".format(self.index, uuid.uuid4().hex), "register": register, "method": method.lower(), "end-point": end_point,
+                   "parameters": parameters, "payload": payload, "state": "queued", "attempts": 0, "status": None, "record-id": None,
+                   "errors": [], "created": now, "updated": now}
+            self.jobs[job['id']] = job
+            # Only acknowledged once it would survive the process stopping
+            try:
+                self._write(job, sync=True)
+            except OSError:
+                del self.jobs[job['id']]
+                raise
+            self._pending += 1
+            self.counters['submitted'] += 1
+            self._enqueue(job)
+        return dict(job)
+
+    def find(self, job_id):
+        """Copy of a job, from this process or else from the journal its id names, or None if there is no such job
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        index = job_id.split('-', 1)[0]
+        if not index.isdigit() or int(index) == self.index:
+            return None
+        return read_journal(self.journal_path(int(index))).get(job_id)
+
+    def wait(self, timeout=None):
+        """Whether every pending job was written, or failed, within timeout seconds
+        """
+        with self._lock:
+            return self._lock.wait_for(lambda: self._pending == 0, timeout)
+
+    def _enqueue(self, job):
+        # Handed to the workers unless an earlier job for the same record is yet to finish
+        key = job_key(job)
+        if key in self._waiting:
+            self._waiting[key].append(job['id'])
+        else:
+            self._waiting[key] = deque()
+            self._queue.put(job['id'])
+
+    def _release(self, job):
+        # The next job for the record, if any, can be sent now this one has finished
+        key = job_key(job)
+        if self._waiting[key]:
+            self._queue.put(self._waiting[key].popleft())
+        else:
+            del self._waiting[key]
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            self._process(job_id)
+
+    def _process(self, job_id):
+        with self._lock:
+            job = self.jobs[job_id]
+            self._update(job, state="running", attempts=job['attempts'] + 1)
+            job = dict(job)
+        try:
+            status, record_id, error = self.send(job)
+        except Exception as e:
+            status, record_id, error = None, None, str(e) or e.__class__.__name__
+        with self._lock:
+            job = self.jobs[job_id]
+            if error is None:
+                self._update(job, state="done", status=status, **{"record-id": record_id})
+            elif (status is None or status in RETRY_STATUSES) and job['attempts'] < self.max_attempts:
+                self.counters['retries'] += 1
+                self._update(job, state="queued", status=status, errors=[error])
+                delay = self.retry_backoff * (2 ** (job['attempts'] - 1))
+                timer = threading.Timer(delay, self._queue.put, [job_id])
+                timer.daemon = True
+                timer.start()
+                return
+            else:
+                app.logger.warn("Failed to write job '{}' to register '{}': {}".format(job_id, job['register'], error))
+                self._update(job, state="failed", status=status, errors=[error])
+            self._pending -= 1
+            self.counters[job['state']] += 1
+            self._release(job)
+            self._finish(job)
+            self._lock.notify_all()
+
+    def _update(self, job, **changes):
+        job.update(changes, updated=round(time.time(), 3))
+        self._write(dict(changes, id=job['id'], updated=job['updated']))
+
+    def _finish(self, job):
+        # Finished jobs no longer need their payload, and only the latest history of them are kept
+        job.pop('payload', None)
+        self._finished.append(job['id'])
+        while len(self._finished) > self.history:
+            del self.jobs[self._finished.popleft()]
+
+    def _write(self, entry, sync=False):
+        if self._journal is None:
+            self._journal = open(self.journal_path(self.index), 'a')
+        self._journal.write(json.dumps(entry, sort_keys=True) + "\n")
+        self._journal.flush()
+        if sync:
+            os.fsync(self._journal.fileno())
+        self._lines += 1
+        # Rewritten as one line per job once mostly made up of superseded updates
+        if self._lines > 4 * len(self.jobs) + 1000:
+            self._compact()
+
+    def _compact(self):
+        path = self.journal_path(self.index)
+        with open(path + ".tmp", 'w') as journal:
+            for job in self.jobs.values():
+                journal.write(json.dumps(job, sort_keys=True) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        if self._journal is not None:
+            self._journal.close()
+        os.replace(path + ".tmp", path)
+        self._journal = open(path, 'a')
+        self._lines = len(self.jobs)
+
+    def stats(self):
+        """Journal index, pending and held job counts and job counters of the queue
+        """
+        with self._lock:
+            states = Counter(job['state'] for job in self.jobs.values())
+            return {"journal": self.index,
+                    "queued": states['queued'],
+                    "running": states['running'],
+                    "held": len(self.jobs),
+                    "submitted": self.counters['submitted'],
+                    "done": self.counters['done'],
+                    "failed": self.counters['failed'],
+                    "retries": self.counters['retries'],
+                    "rejected": self.counters['rejected']}
+
+
+def job_key(job):
+    """Key of the record a job writes to, for updates, or of the job itself for creates, which can be sent in any order
+    """
+    return (job['register'], job['end-point']) if job['method'] == 'put' else job['id']
+
+
+def read_journal(path):
+    """Latest state of each job in a journal, in the order they were submitted
+    """
+    jobs = OrderedDict()
+    if not os.path.exists(path):
+        return jobs
+    with open(path) as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by a stop mid write, or still being written by the journal's process
+                continue
+            if entry['id'] in jobs:
+                jobs[entry['id']].update(entry)
+            elif 'register' in entry:
+                jobs[entry['id']] = entry
+    return jobs
@@ -0,0 +1,211 @@
+"""Microbenchmarks for the validation and proxy hot paths
+
+Times schema validation for each register and method, additional validation with cached and uncached curies, JSON
+serialisation of large record sets and geometry validation. Results are written as JSON and compared against a stored
+baseline, exiting non-zero if any benchmark is slower than the baseline by more than the threshold.
+
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --update-baseline
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections import OrderedDict
+
+os.environ.setdefault('SETTINGS', 'application.config.TestConfig')
+
+from application import app, geometry_validators, record_stream, register_utils  # noqa: E402
+from mock import MagicMock, patch  # noqa: E402
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+ENTRY = {"entry-number": "1", "entry-timestamp": "2016-01-01T00:00:00", "item-hash": "sha-256:abc"}
+PAYLOADS = {
+    "local-land-charge": {"charge-type": "Planning", "further-information": [{"information-location": "further-information-location:1",
+                                                                              "references": ["ref"]}],
+                          "geometry": {"type": "Point", "coordinates": [292225.6, 92976.9],
+                                       "crs": {"type": "name", "properties": {"name": "EPSG:27700"}}},
+                          "originating-authority": "llc-registering-authority:1", "statutory-provisions": ["statutory-provision:1"],
+                          "land-description": "Land at the corner", "works-particulars": "Road widening"},
+    "statutory-provision": {"provision": "section 1", "statutory-instrument": "Planning Act", "year": "1990"},
+    "llc-registering-authority": {"name": "Plymouth City Council", "authority-type": "Local Authority"},
+    "further-information-location": {"location": "Planning Department, Civic Centre"}
+}
+
+
+def polygon(vertices):
+    """Closed square polygon with the given number of positions around its exterior
+    """
+    side = vertices // 4
+    ring = []
+    for index in range(side):
+        ring.append([290000 + index, 90000])
+    for index in range(side):
+        ring.append([290000 + side, 90000 + index])
+    for index in range(side):
+        ring.append([290000 + side - index, 90000 + side])
+    for index in range(side):
+        ring.append([290000, 90000 + side - index])
+    return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+
+
+def charge_with_provisions(count):
+    charge = copy.deepcopy(PAYLOADS["local-land-charge"])
+    charge["statutory-provisions"] = ["statutory-provision:{}".format(index) for index in range(count)]
+    return charge
+
+
+def provision_record(curie):
+    index = curie.split(':')[1]
+    return {"statutory-provision": index, "provision": "section {}".format(index), "statutory-instrument": "Planning Act",
+            "year": "1990", "entry-number": index}
+
+
+def fake_register_request(sub_domain, end_point, parameters, method, json_payload, stream=False):
+    # Register responses without network I/O, so uncached lookups measure the API's own overhead
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = provision_record("{}:{}".format(sub_domain, end_point.split('/')[-1]))
+    return response
+
+
+def records(count):
+    return {str(index): dict(ENTRY, **{"local-land-charge": str(index), "entry-number": str(index),
+                                       "charge-type": "Planning", "geometry": polygon(8),
+                                       "statutory-provisions": ["statutory-provision:{}".format(index % 50)],
+                                       "further-information": [], "registration-date": "2016-01-01"})
+            for index in range(count)}
+
+
+def benchmarks():
+    """Ordered mapping of benchmark name to a function of no arguments to time
+    """
+    cases = OrderedDict()
+    for sub_domain, payload in PAYLOADS.items():
+        primary_id = register_utils.REGISTER_INFO[sub_domain]['primary-id']
+        update = dict(payload, **{primary_id: "1"})
+        cases["validate_json/{}/post".format(sub_domain)] = \
+            lambda sub_domain=sub_domain, payload=payload: register_utils.validate_json(sub_domain, '/records', 'post', payload)
+        cases["validate_json/{}/put".format(sub_domain)] = \
+            lambda sub_domain=sub_domain, update=update: register_utils.validate_json(sub_domain, '/record/<primary_id>', 'put', update)
+    cases["validate_json/local-land-charge/geometry-search"] = \
+        lambda: register_utils.validate_json('local-land-charge', '/records/geometry/<function>', 'post', polygon(100))
+
+    for count in (1, 10, 50):
+        charge = charge_with_provisions(count)
+        cases["additional_validation/cached/{}-provisions".format(count)] = \
+            lambda charge=charge: register_utils.additional_validation('local-land-charge', '/records', '/records', 'POST', charge)
+        cases["additional_validation/uncached/{}-provisions".format(count)] = \
+            lambda charge=charge: uncached(register_utils.additional_validation, 'local-land-charge', '/records', '/records', 'POST', charge)
+
+    for count in (1000, 10000):
+        all_records = records(count)
+        body = json.dumps(all_records).encode('utf-8')
+        cases["serialise/json.dumps/{}-records".format(count)] = lambda all_records=all_records: json.dumps(all_records, sort_keys=True)
+        cases["serialise/canonical_chunks/{}-records".format(count)] = \
+            lambda body=body: b''.join(record_stream.canonical_chunks([body[i:i + 65536] for i in range(0, len(body), 65536)], 65536))
+
+    for vertices in (100, 1000, 10000):
+        geometry = polygon(vertices)
+        cases["geometry/check_geometry/{}-vertices".format(vertices)] = \
+            lambda geometry=geometry: geometry_validators.check_geometry(geometry, app.config['GEOMETRY_MAX_VERTICES'])
+        cases["geometry/schema/{}-vertices".format(vertices)] = \
+            lambda geometry=geometry: register_utils.SCHEMA_REGISTRY.endpoint_validator(
+                'local-land-charge', '/records/geometry/<function>', 'post')[0].is_valid(geometry)
+    return cases
+
+
+def uncached(function, *args):
+    register_utils.CURIE_CACHE.clear()
+    return function(*args)
+
+
+def time_benchmark(function, repeat, min_time):
+    """Median and minimum seconds per call over repeat rounds, each round long enough to take at least min_time
+    """
+    function()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(timings), "min": min(timings), "number": number, "repeat": repeat}
+
+
+def run(names, repeat, min_time):
+    results = OrderedDict()
+    with patch('application.register_utils.register_request', side_effect=fake_register_request), \
+            patch.dict(app.config, {'REGISTER_BULK_LOOKUP': False}):
+        for name, function in benchmarks().items():
+            if names and not any(name.startswith(prefix) for prefix in names):
+                continue
+            register_utils.CURIE_CACHE.clear()
+            results[name] = time_benchmark(function, repeat, min_time)
+            sys.stderr.write("{:<60} {:>12.1f} us\n".format(name, results[name]["median"] * 1e6))
+    return {"python": platform.python_version(), "platform": platform.platform(), "results": results}
+
+
+def compare(results, baseline, threshold):
+    """Names of benchmarks whose median is more than threshold times the baseline median, printing every comparison
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            sys.stderr.write("{:<60} no baseline\n".format(name))
+            continue
+        ratio = result["median"] / base["median"]
+        regressed = ratio > threshold
+        sys.stderr.write("{:<60} {:>6.2f}x baseline{}\n".format(name, ratio, " REGRESSION" if regressed else ""))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the validation and proxy microbenchmarks")
+    parser.add_argument("names", nargs="*", help="only run benchmarks whose names start with these prefixes")
+    parser.add_argument("--output", help="file to write results to, default stdout")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown against the baseline reported as a regression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds each timed round should take at least")
+    args = parser.parse_args(argv)
+    results = run(args.names, args.repeat, args.min_time)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            baseline_file.write(output + "\n")
+        return 0
+    if not os.path.exists(args.baseline):
+        sys.stderr.write("No baseline at {}\n".format(args.baseline))
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    return 1 if compare(results, baseline, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
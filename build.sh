@@ -1,3 +1,4 @@
 #!/bin/bash
 
 pip install -r requirements.txt
+python build_schema_bundle.py
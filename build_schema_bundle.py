@@ -0,0 +1,29 @@
+"""Compile the RAML routes and schemas of every register into the schema bundle loaded by the API at startup
+
+The bundle records a hash of the schema folder, so the API parses the RAML itself if the schemas change without the
+bundle being rebuilt.
+
+    python build_schema_bundle.py [bundle path]
+"""
+import json
+import os
+import sys
+
+os.environ.setdefault('SETTINGS', 'application.config.Config')
+
+from application import app, register_utils, schema_registry  # noqa: E402
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    bundle_path = argv[0] if argv else app.config['SCHEMA_BUNDLE']
+    bundle = schema_registry.build_bundle(app.static_folder + '/schema',
+                                          {sub_domain: info["raml-file"] for sub_domain, info in register_utils.REGISTER_INFO.items()})
+    with open(bundle_path, 'w', encoding='utf-8') as bundle_file:
+        json.dump(bundle, bundle_file, sort_keys=True)
+    sys.stderr.write("Wrote schema bundle {} to {}\n".format(bundle["hash"], bundle_path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Validate an NDJSON file of register records offline, spreading the work across a pool of processes
+
+Records are checked against the RAML-derived schemas and the additional validators that need no register lookups.
+Invalid records are written to the report as NDJSON lines of {"line": <line number>, "errors": [...]} and a
+throughput summary is written to stderr as JSON.
+
+    python bulk_validate.py local-land-charge charges.ndjson --report errors.ndjson
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+os.environ.setdefault('SETTINGS', 'application.config.Config')
+
+from application import register_utils, charge_validators  # noqa: E402
+
+
+# Additional validators that can run without looking anything up in the register
+LOCAL_VALIDATORS = {
+    "local-land-charge": [charge_validators.validate_instrument_provisions, charge_validators.validate_further_information]
+}
+END_POINT_PATTERNS = {"post": "/records", "put": "/record/<primary_id>"}
+
+_register = None
+_method = None
+_max_errors = None
+
+
+def _init_worker(register, method, max_errors=0):
+    global _register, _method, _max_errors
+    _register = register
+    _method = method
+    _max_errors = max_errors
+
+
+def validate_line(numbered_line):
+    """Validate one NDJSON line, returning (line number, errors)
+    """
+    line_number, line = numbered_line
+    try:
+        json_payload = json.loads(line)
+    except ValueError as e:
+        return line_number, ["Invalid JSON: {}".format(str(e))]
+    end_point_pattern = END_POINT_PATTERNS[_method]
+    errors = register_utils.validate_json(_register, end_point_pattern, _method, json_payload, _max_errors)['errors']
+    if not errors:
+        pri_id = register_utils.REGISTER_INFO[_register]['primary-id']
+        end_point = "/record/{}".format(json_payload.get(pri_id)) if _method == 'put' else end_point_pattern
+        for validator in LOCAL_VALIDATORS.get(_register, []):
+            errors = errors + validator(_register, end_point, end_point_pattern, _method, json_payload)['errors']
+    return line_number, errors
+
+
+def read_batches(ndjson_file, batch_size):
+    """Yield lists of (line number, line) for the non-blank lines of the file
+    """
+    batch = []
+    for line_number, line in enumerate(ndjson_file, 1):
+        if line.strip():
+            batch.append((line_number, line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def validate_file(register, method, ndjson_file, report_file, processes, chunk_size, max_errors=0):
+    """Validate every record in the file, writing errors to the report and returning a summary
+    """
+    start = time.time()
+    summary = {"records": 0, "invalid": 0}
+    pool = multiprocessing.Pool(processes, _init_worker, (register, method, max_errors))
+    try:
+        # Read in batches so the whole file is never queued in memory at once
+        for batch in read_batches(ndjson_file, chunk_size * processes * 4):
+            for line_number, errors in pool.imap(validate_line, batch, chunk_size):
+                summary["records"] += 1
+                if errors:
+                    summary["invalid"] += 1
+                    report_file.write(json.dumps({"line": line_number, "errors": errors}) + "\n")
+    finally:
+        pool.terminate()
+    summary["valid"] = summary["records"] - summary["invalid"]
+    summary["seconds"] = round(time.time() - start, 3)
+    summary["records-per-second"] = round(summary["records"] / summary["seconds"], 1) if summary["seconds"] else None
+    summary["processes"] = processes
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate an NDJSON file of register records")
+    parser.add_argument("register", choices=sorted(register_utils.REGISTER_INFO))
+    parser.add_argument("ndjson", help="file with one JSON record per line")
+    parser.add_argument("--method", choices=sorted(END_POINT_PATTERNS), default="post", help="validate records for creation or update")
+    parser.add_argument("--report", help="file to write errors to, default stdout")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=100, help="records sent to a process at a time")
+    parser.add_argument("--max-errors", type=int, default=0, help="schema errors reported per record, 0 for all")
+    args = parser.parse_args(argv)
+    report_file = open(args.report, 'w') if args.report else sys.stdout
+    try:
+        with open(args.ndjson, encoding='utf-8') as ndjson_file:
+            summary = validate_file(args.register, args.method, ndjson_file, report_file, args.processes, args.chunk_size,
+                                    args.max_errors)
+    finally:
+        if args.report:
+            report_file.close()
+    sys.stderr.write(json.dumps(summary, sort_keys=True) + "\n")
+    return 1 if summary["invalid"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+import os
+
+# Threaded workers so a request waiting on the register does not block a whole worker process
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '3'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+
+def post_worker_init(worker):
+    # Replicas and the write queue belong to the worker processes, not to whatever imports the application
+    from application import views
+    views.start()
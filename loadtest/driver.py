@@ -0,0 +1,240 @@
+"""Replay a weighted mix of GET, POST, PUT and geometry search traffic against the API and report per route throughput,
+latency percentiles and histogram and error rate as JSON
+
+Without --target the API is started in-process in front of a stub register, so a run needs nothing else listening:
+
+    python -m loadtest.driver --concurrency 8 --duration 30 --latency 0.005 0.02 --error-rate 0.01
+    python -m loadtest.driver --target http://localhost:5001 --domain landregistry.gov.uk --output report.json
+"""
+import argparse
+import bisect
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from werkzeug.serving import make_server
+
+from loadtest.stub_register import StubRegister, canned_records, charge
+
+
+# Upper bounds (milliseconds) of the latency histogram buckets, the last bucket holding everything slower
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+DEFAULT_MIX = OrderedDict([("get-record", 50), ("get-records", 10), ("create", 15), ("update", 10), ("geometry", 15)])
+REGISTER = "local-land-charge"
+
+
+def get_record(rng, records):
+    return "GET /record/<primary_id>", "GET", "/record/{}".format(rng.randint(1, records)), None
+
+
+def get_records(rng, records):
+    return "GET /records", "GET", "/records?page-size=100", None
+
+
+def create(rng, records):
+    payload = charge(rng.randint(1, records))
+    # The register assigns the primary id and registration date of new charges
+    del payload[REGISTER]
+    del payload["registration-date"]
+    return "POST /records", "POST", "/records", payload
+
+
+def update(rng, records):
+    index = rng.randint(1, records)
+    return "PUT /record/<primary_id>", "PUT", "/record/{}".format(index), charge(index)
+
+
+def geometry(rng, records):
+    x = rng.randint(290000, 300000)
+    y = rng.randint(90000, 100000)
+    search = {"type": "Polygon", "coordinates": [[[x, y], [x + 100, y], [x + 100, y + 100], [x, y + 100], [x, y]]],
+              "crs": {"type": "name", "properties": {"name": "EPSG:27700"}}}
+    return "POST /records/geometry/<function>", "POST", "/records/geometry/intersects", search
+
+
+OPERATIONS = {"get-record": get_record, "get-records": get_records, "create": create, "update": update, "geometry": geometry}
+
+
+def parse_mix(text):
+    """Operation weights from 'name=weight,...', e.g. 'get-record=80,geometry=20'
+    """
+    mix = OrderedDict()
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise ValueError("unknown operation '{}', expected one of {}".format(name, sorted(OPERATIONS)))
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(latencies, fraction):
+    """Nearest-rank percentile of sorted latencies
+    """
+    if not latencies:
+        return None
+    return latencies[min(len(latencies) - 1, max(0, int(round(fraction * len(latencies))) - 1))]
+
+
+def histogram(latencies):
+    """Counts of latencies (milliseconds) per bucket, keyed by the bucket's upper bound
+    """
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for latency in latencies:
+        counts[bisect.bisect_left(HISTOGRAM_BUCKETS, latency)] += 1
+    labels = ["<={}".format(bound) for bound in HISTOGRAM_BUCKETS] + [">{}".format(HISTOGRAM_BUCKETS[-1])]
+    return OrderedDict(zip(labels, counts))
+
+
+class LoadDriver(object):
+    """Send requests for a weighted mix of operations from concurrent workers, recording latency and outcome per route
+
+    A response is counted as an error when its status is 500 or above or the request fails; 4xx responses are counted
+    separately as they are usually the stub's canned data not matching the request rather than the API failing.
+    """
+
+    def __init__(self, target, host, mix, records, seed=None):
+        self.target = target.rstrip('/')
+        self.host = host
+        self.choices = list(mix)
+        self.cumulative = []
+        total = 0
+        for name in self.choices:
+            total += mix[name]
+            self.cumulative.append(total)
+        self.records = records
+        self.seed = seed
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def run(self, concurrency, duration=None, requests_total=None):
+        """Run until duration seconds have passed or requests_total requests have been sent, and return the report
+        """
+        remaining = [requests_total]
+        deadline = time.monotonic() + duration if duration is not None else None
+        workers = [threading.Thread(target=self._work, args=(index, deadline, remaining)) for index in range(concurrency)]
+        start = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.report(time.monotonic() - start, concurrency)
+
+    def _next(self, deadline, remaining):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        with self.lock:
+            if remaining[0] is None:
+                return True
+            remaining[0] -= 1
+            return remaining[0] >= 0
+
+    def _work(self, index, deadline, remaining):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        session = requests.Session()
+        headers = {"Host": self.host, "Content-Type": "application/json"}
+        while self._next(deadline, remaining):
+            name = self.choices[bisect.bisect_right(self.cumulative, rng.random() * self.cumulative[-1])]
+            route, method, path, payload = OPERATIONS[name](rng, self.records)
+            body = json.dumps(payload) if payload is not None else None
+            start = time.monotonic()
+            try:
+                status = session.request(method, self.target + path, data=body, headers=headers).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = (time.monotonic() - start) * 1000
+            with self.lock:
+                result = self.results.setdefault(route, {"latencies": [], "errors": 0, "client-errors": 0})
+                result["latencies"].append(elapsed)
+                if status is None or status >= 500:
+                    result["errors"] += 1
+                elif status >= 400:
+                    result["client-errors"] += 1
+
+    def report(self, seconds, concurrency):
+        routes = OrderedDict()
+        for route in sorted(self.results):
+            result = self.results[route]
+            latencies = sorted(result["latencies"])
+            routes[route] = OrderedDict([
+                ("requests", len(latencies)),
+                ("requests-per-second", round(len(latencies) / seconds, 1) if seconds else None),
+                ("errors", result["errors"]),
+                ("error-rate", round(result["errors"] / len(latencies), 4)),
+                ("client-errors", result["client-errors"]),
+                ("latency-ms", OrderedDict([(name, round(percentile(latencies, fraction), 3))
+                                            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))])),
+                ("histogram-ms", histogram(latencies))])
+        total = sum(route["requests"] for route in routes.values())
+        errors = sum(route["errors"] for route in routes.values())
+        return OrderedDict([("seconds", round(seconds, 3)), ("concurrency", concurrency), ("requests", total),
+                            ("requests-per-second", round(total / seconds, 1) if seconds else None),
+                            ("error-rate", round(errors / total, 4) if total else None), ("routes", routes)])
+
+
+class LocalApi(object):
+    """The API served in-process on a free port, sending register requests to register_url
+    """
+
+    def __init__(self, register_url):
+        os.environ.setdefault('SETTINGS', 'application.config.Config')
+        from application.views import app
+        self.config = app.config
+        self.register_url = register_url
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.previous_url = self.config['LLC_REGISTER_URL']
+        self.config['LLC_REGISTER_URL'] = self.register_url
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.config['LLC_REGISTER_URL'] = self.previous_url
+
+
+def run(args):
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    duration = None if args.requests else args.duration
+    host = "{}.{}".format(REGISTER, args.domain)
+    if args.target:
+        return LoadDriver(args.target, host, mix, args.records, args.seed).run(args.concurrency, duration, args.requests)
+    with StubRegister(canned_records(args.records), latency=tuple(args.latency), error_rate=args.error_rate, seed=args.seed) as stub:
+        with LocalApi(stub.url) as api:
+            return LoadDriver(api.url, host, mix, args.records, args.seed).run(args.concurrency, duration, args.requests)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a mix of API traffic and report per route latency and errors")
+    parser.add_argument("--target", help="URL of a running API, default an in-process API in front of a stub register")
+    parser.add_argument("--domain", default="localhost", help="domain after the register sub-domain in the Host header")
+    parser.add_argument("--mix", help="operation weights as name=weight,... from {}".format(', '.join(sorted(OPERATIONS))))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run for")
+    parser.add_argument("--requests", type=int, help="total requests to send instead of running for a duration")
+    parser.add_argument("--records", type=int, default=1000, help="local land charges in the stub, and ids requested")
+    parser.add_argument("--latency", type=float, nargs=2, default=[0, 0], metavar=("MIN", "MAX"), help="stub register latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of stub register requests failing")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="file to write the report to, default stdout")
+    args = parser.parse_args(argv)
+    report = run(args)
+    text = json.dumps(report, indent=2) + "\n"
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text)
+    else:
+        sys.stdout.write(text)
+    return 1 if report["error-rate"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
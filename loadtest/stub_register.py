@@ -0,0 +1,170 @@
+"""Local register backend serving canned records over HTTP, for tests and load testing the API without a real register
+
+    python -m loadtest.stub_register --port 5002 --records 1000 --latency 0.005 0.02 --error-rate 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from flask import Flask, request
+from werkzeug.serving import make_server
+
+
+class StubRegister(object):
+    """Local register backend serving canned records over HTTP
+
+    records is a dictionary of register name to dictionary of primary id to record. When bulk_lookup is False
+    'GET /<register>/records?ids=' is not found, and when batch_create is False 'POST /<register>/records/batch' is not
+    found, as on a register without those features. Every response is delayed by a random time between the latency
+    bounds (seconds), and error_rate is the fraction of requests answered with a 500 error.
+    """
+
+    def __init__(self, records, bulk_lookup=True, batch_create=True, latency=(0, 0), error_rate=0, geometry_results=10,
+                 host='127.0.0.1', port=0, seed=None):
+        self.records = records
+        self.bulk_lookup = bulk_lookup
+        self.batch_create = batch_create
+        self.latency = latency
+        self.error_rate = error_rate
+        self.geometry_results = geometry_results
+        self.random = random.Random(seed)
+        self.requests = []
+        self.lock = threading.Lock()
+        self.app = Flask(__name__)
+        self.app.before_request(self.inject)
+        self.app.add_url_rule('/<register>/record/<primary_id>', 'record', self.get_record)
+        self.app.add_url_rule('/<register>/record/<primary_id>', 'update', self.update_record, methods=['PUT'])
+        self.app.add_url_rule('/<register>/records', 'records', self.get_records)
+        self.app.add_url_rule('/<register>/records', 'create', self.create_record, methods=['POST'])
+        self.app.add_url_rule('/<register>/records/batch', 'create_batch', self.create_records, methods=['POST'])
+        self.app.add_url_rule('/<register>/records/geometry/<function>', 'geometry', self.geometry_search, methods=['POST'])
+        self.server = make_server(host, port, self.app, threaded=True)
+        self.url = 'http://{}:{}'.format(host, self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+
+    def inject(self):
+        # Simulated register latency and failures, applied before any route
+        with self.lock:
+            delay = self.random.uniform(*self.latency)
+            fail = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return (json.dumps({"errors": ["injected error"]}), 500, {"Content-Type": "application/json"})
+
+    def get_record(self, register, primary_id):
+        self.requests.append(request.full_path)
+        record = self.records.get(register, {}).get(primary_id)
+        if record is None:
+            return (json.dumps({"errors": ["not found"]}), 404, {"Content-Type": "application/json"})
+        return (json.dumps(record), 200, {"Content-Type": "application/json"})
+
+    def get_records(self, register):
+        self.requests.append(request.full_path)
+        records = self.records.get(register, {})
+        if 'ids' in request.args:
+            if not self.bulk_lookup:
+                return (json.dumps({"errors": ["not found"]}), 404, {"Content-Type": "application/json"})
+            records = {primary_id: records[primary_id] for primary_id in request.args['ids'].split(',') if primary_id in records}
+        return (json.dumps(records), 200, {"Content-Type": "application/json"})
+
+    def _store(self, register, record, primary_id=None):
+        with self.lock:
+            records = self.records.setdefault(register, {})
+            primary_id = primary_id or str(len(records) + 1)
+            entry_number = 1 + max([int(stored.get('entry-number', 0)) for stored in records.values()] or [0])
+            record = dict(record, **{register: primary_id, "entry-number": str(entry_number)})
+            records[primary_id] = record
+        return record
+
+    def _create(self, register, record):
+        return self._store(register, record)
+
+    def create_record(self, register):
+        self.requests.append('POST ' + request.full_path)
+        return (json.dumps(self._create(register, request.get_json())), 201, {"Content-Type": "application/json"})
+
+    def create_records(self, register):
+        self.requests.append('POST ' + request.full_path)
+        if not self.batch_create:
+            return (json.dumps({"errors": ["not found"]}), 404, {"Content-Type": "application/json"})
+        return (json.dumps([self._create(register, record) for record in request.get_json()]), 201, {"Content-Type": "application/json"})
+
+    def update_record(self, register, primary_id):
+        self.requests.append('PUT ' + request.full_path)
+        if primary_id not in self.records.get(register, {}):
+            return (json.dumps({"errors": ["not found"]}), 404, {"Content-Type": "application/json"})
+        return (json.dumps(self._store(register, request.get_json(), primary_id)), 200, {"Content-Type": "application/json"})
+
+    def geometry_search(self, register, function):
+        self.requests.append('POST ' + request.full_path)
+        records = self.records.get(register, {})
+        found = {primary_id: records[primary_id] for primary_id in sorted(records)[:self.geometry_results]}
+        truncated = len(records) > self.geometry_results
+        return (json.dumps(found), 200, {"Content-Type": "application/json", "Truncated": str(truncated)})
+
+
+def canned_records(count):
+    """Records for every register, with local land charges referring to the other registers' records
+    """
+    records = {"statutory-provision": {}, "llc-registering-authority": {}, "further-information-location": {}, "local-land-charge": {}}
+    entry_number = 0
+    for index in range(1, 51):
+        entry_number += 1
+        records["statutory-provision"][str(index)] = {"statutory-provision": str(index), "provision": "section {}".format(index),
+                                                      "statutory-instrument": "Planning Act", "year": "1990",
+                                                      "entry-number": str(entry_number)}
+        records["llc-registering-authority"][str(index)] = {"llc-registering-authority": str(index), "name": "Council {}".format(index),
+                                                            "authority-type": "Local Authority", "entry-number": str(entry_number)}
+        records["further-information-location"][str(index)] = {"further-information-location": str(index),
+                                                               "location": "Office {}".format(index), "entry-number": str(entry_number)}
+    for index in range(1, count + 1):
+        entry_number += 1
+        records["local-land-charge"][str(index)] = charge(index, entry_number)
+    return records
+
+
+def charge(index, entry_number=None):
+    """Valid local land charge numbered index, referring to canned records of the other registers
+    """
+    x = 290000 + (index % 1000) * 10
+    y = 90000 + (index // 1000) * 10
+    record = {"local-land-charge": str(index), "charge-type": "Planning", "registration-date": "2016-01-01",
+              "further-information": [{"information-location": "further-information-location:{}".format(1 + index % 50), "references": []}],
+              "geometry": {"type": "Polygon", "coordinates": [[[x, y], [x + 10, y], [x + 10, y + 10], [x, y + 10], [x, y]]],
+                           "crs": {"type": "name", "properties": {"name": "EPSG:27700"}}},
+              "originating-authority": "llc-registering-authority:{}".format(1 + index % 50),
+              "statutory-provisions": ["statutory-provision:{}".format(1 + index % 50)],
+              "charge-description": "Land at plot {}".format(index)}
+    if entry_number is not None:
+        record["entry-number"] = str(entry_number)
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve canned register records")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--records", type=int, default=1000, help="number of local land charges")
+    parser.add_argument("--latency", type=float, nargs=2, default=[0, 0], metavar=("MIN", "MAX"), help="seconds added to each response")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with a 500 error")
+    parser.add_argument("--geometry-results", type=int, default=10, help="records returned by each geometry search")
+    args = parser.parse_args(argv)
+    stub = StubRegister(canned_records(args.records), latency=tuple(args.latency), error_rate=args.error_rate,
+                        geometry_results=args.geometry_results, host=args.host, port=args.port)
+    print("Stub register serving on {}".format(stub.url))
+    stub.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-from application.views import app
+from application.views import app, start
 import os
 
+# With the reloader the serving process is the child it starts, so the parent that only watches for changes starts nothing
+if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    start()
 app.run(host="0.0.0.0", port=int(os.getenv("PORT", "5001")))
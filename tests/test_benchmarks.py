@@ -0,0 +1,32 @@
+import unittest
+
+from application import register_utils
+from benchmarks import run_benchmarks
+from mock import patch
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    @patch('application.register_utils.register_request', side_effect=run_benchmarks.fake_register_request)
+    def test_benchmarks_run(self, mock_register_request):
+        for name, function in run_benchmarks.benchmarks().items():
+            if name.endswith('10000-records') or name.endswith('10000-vertices'):
+                continue
+            function()
+        register_utils.CURIE_CACHE.clear()
+
+    def test_payloads_valid(self):
+        for sub_domain, payload in run_benchmarks.PAYLOADS.items():
+            self.assertEqual(register_utils.validate_json(sub_domain, '/records', 'post', payload)['errors'], [])
+        self.assertEqual(register_utils.validate_json('local-land-charge', '/records/geometry/<function>', 'post', run_benchmarks.polygon(100)),
+                         {"errors": [], "bbox": [290000, 90000, 290025, 90025]})
+
+    def test_time_benchmark(self):
+        result = run_benchmarks.time_benchmark(lambda: None, 3, 0.001)
+        self.assertEqual(result["repeat"], 3)
+        self.assertGreaterEqual(result["number"], 1)
+
+    def test_compare(self):
+        baseline = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}}}
+        results = {"results": {"a": {"median": 1.2}, "b": {"median": 2.0}, "c": {"median": 1.0}}}
+        self.assertEqual(run_benchmarks.compare(results, baseline, 1.5), ["b"])
@@ -0,0 +1,58 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import bulk_validate
+from mock import patch
+
+
+class TestBulkValidate(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ndjson = os.path.join(self.directory.name, 'records.ndjson')
+        self.report = os.path.join(self.directory.name, 'report.ndjson')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_records(self, lines):
+        with open(self.ndjson, 'w') as ndjson_file:
+            ndjson_file.write("\n".join(lines) + "\n")
+
+    def test_validate_file(self):
+        valid = json.dumps({"provision": "section", "statutory-instrument": "Act", "year": "1900"})
+        self.write_records([valid, json.dumps({"provision": "section"}), "", "{not json", valid])
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            self.assertEqual(bulk_validate.main(['statutory-provision', self.ndjson, '--report', self.report, '--processes', '2',
+                                                 '--chunk-size', '1']), 1)
+        summary = json.loads(stderr.getvalue())
+        self.assertEqual((summary['records'], summary['valid'], summary['invalid'], summary['processes']), (4, 2, 2, 2))
+        with open(self.report) as report_file:
+            report = [json.loads(line) for line in report_file]
+        self.assertEqual([entry['line'] for entry in report], [2, 4])
+        self.assertEqual(len(report[0]['errors']), 2)
+        self.assertTrue(report[1]['errors'][0].startswith('Invalid JSON'))
+
+    def test_validate_file_max_errors(self):
+        self.write_records([json.dumps({"provision": "section"})])
+        with patch('sys.stderr', new_callable=io.StringIO):
+            bulk_validate.main(['statutory-provision', self.ndjson, '--report', self.report, '--processes', '1', '--max-errors', '1'])
+        with open(self.report) as report_file:
+            self.assertEqual(len(json.loads(report_file.readline())['errors']), 1)
+
+    def test_validate_file_all_valid(self):
+        self.write_records([json.dumps({"provision": "section", "statutory-instrument": "Act", "year": "1900"})])
+        with patch('sys.stderr', new_callable=io.StringIO):
+            self.assertEqual(bulk_validate.main(['statutory-provision', self.ndjson, '--report', self.report, '--processes', '1']), 0)
+
+    def test_local_validators(self):
+        bulk_validate._init_worker('local-land-charge', 'post')
+        with patch('application.register_utils.validate_json') as mock_validate_json:
+            mock_validate_json.return_value = {"errors": []}
+            line = json.dumps({"further-information": [{"information-location": "a:1"}, {"information-location": "a:1"}]})
+            self.assertEqual(bulk_validate.validate_line((1, line)),
+                             (1, ["At least one of 'statutory-provisions' or 'instrument' must be supplied.",
+                                  "Further information locations must be unique"]))
@@ -0,0 +1,92 @@
+import threading
+import unittest
+
+from application import cache
+from mock import patch
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_get_set(self):
+        ttl_cache = cache.TTLCache(10, 60)
+        self.assertIsNone(ttl_cache.get('a'))
+        ttl_cache.set('a', {"thing": "ame"})
+        self.assertEqual(ttl_cache.get('a'), {"thing": "ame"})
+        self.assertEqual(ttl_cache.stats(), {'hits': 1, 'misses': 1, 'expirations': 0, 'evictions': 0, 'invalidations': 0, 'size': 1,
+                                             'weight': 1, 'hit-ratio': 0.5})
+
+    @patch('application.cache.time.monotonic')
+    def test_expiry(self, mock_monotonic):
+        ttl_cache = cache.TTLCache(10, 60)
+        mock_monotonic.return_value = 100
+        ttl_cache.set('a', 1)
+        ttl_cache.set('b', 2, ttl=3600)
+        mock_monotonic.return_value = 161
+        self.assertIsNone(ttl_cache.get('a'))
+        self.assertEqual(ttl_cache.get('b'), 2)
+        self.assertEqual(ttl_cache.stats()['expirations'], 1)
+
+    def test_zero_ttl_not_cached(self):
+        ttl_cache = cache.TTLCache(10, 60)
+        ttl_cache.set('a', 1, ttl=0)
+        self.assertEqual(len(ttl_cache), 0)
+
+    def test_lru_eviction(self):
+        ttl_cache = cache.TTLCache(2, 60)
+        ttl_cache.set('a', 1)
+        ttl_cache.set('b', 2)
+        ttl_cache.get('a')
+        ttl_cache.set('c', 3)
+        self.assertEqual(ttl_cache.get('a'), 1)
+        self.assertIsNone(ttl_cache.get('b'))
+        self.assertEqual(ttl_cache.get('c'), 3)
+        self.assertEqual(ttl_cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        ttl_cache = cache.TTLCache(10, 60)
+        ttl_cache.set('a', 1)
+        ttl_cache.invalidate('a')
+        ttl_cache.invalidate('not-there')
+        self.assertIsNone(ttl_cache.get('a'))
+        self.assertEqual(ttl_cache.stats()['invalidations'], 1)
+
+    def test_invalidate_where(self):
+        ttl_cache = cache.TTLCache(10, 60)
+        ttl_cache.set(('a', 1), 1)
+        ttl_cache.set(('a', 2), 2)
+        ttl_cache.set(('b', 1), 3)
+        ttl_cache.invalidate_where(lambda key: key[0] == 'a')
+        self.assertEqual(len(ttl_cache), 1)
+        self.assertEqual(ttl_cache.get(('b', 1)), 3)
+        self.assertEqual(ttl_cache.stats()['invalidations'], 2)
+
+    def test_weighed(self):
+        ttl_cache = cache.TTLCache(10, 60, weigh=len)
+        ttl_cache.set('a', 'aaaa')
+        ttl_cache.set('b', 'bbbb')
+        ttl_cache.set('c', 'ccc')
+        self.assertIsNone(ttl_cache.get('a'))
+        self.assertEqual(ttl_cache.stats()['weight'], 7)
+        ttl_cache.set('b', 'b')
+        self.assertEqual(ttl_cache.stats()['weight'], 4)
+        # Too heavy to ever be cached
+        ttl_cache.set('d', 'd' * 11)
+        self.assertIsNone(ttl_cache.get('d'))
+        self.assertEqual(len(ttl_cache), 2)
+
+    def test_threads(self):
+        ttl_cache = cache.TTLCache(50, 60)
+
+        def worker(offset):
+            for i in range(1000):
+                ttl_cache.set(offset + i % 100, i)
+                ttl_cache.get(offset + (i + 1) % 100)
+
+        threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = ttl_cache.stats()
+        self.assertEqual(stats['size'], 50)
+        self.assertEqual(stats['hits'] + stats['misses'], 4000)
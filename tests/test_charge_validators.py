@@ -185,6 +185,31 @@ class TestChargeValidatorsS52(unittest.TestCase):
             {'errors': ["Charges with " + LAND_COMP_ACT_S52 + " provision must conform to land-compensation-charge-s52 definition"]})
 
 
+class TestProvisionClassification(unittest.TestCase):
+
+    def test_provision_key(self):
+        self.assertEqual(charge_validators.provision_key(" Land  Compensation Act", 1973, "Section 8(4) "),
+                         ("land compensation act", "1973", "section 8(4)"))
+        self.assertEqual(charge_validators.PROVISION_RULES[charge_validators.provision_key(
+            land_compensation_act_s52["statutory-instrument"], land_compensation_act_s52["year"], land_compensation_act_s52["provision"])], "s52")
+
+    @patch('application.charge_validators.register_utils.retrieve_curie')
+    def test_classify_provision(self, mock_curie_retrieve):
+        mock_curie_retrieve.side_effect = [land_compensation_act_s8, {"provision": "section"}, None, Exception("an exception")]
+        classified = [charge_validators.classify_provision("statutory-provision:{}".format(n)) for n in range(4)]
+        self.assertEqual([(provision.valid, provision.rule) for provision in classified], [(True, "s8"), (True, None), (False, None), (False, None)])
+        self.assertEqual(classified[3].error, "an exception")
+
+    @patch('application.charge_validators.register_utils.retrieve_curie')
+    def test_classification_shared_in_scope(self, mock_curie_retrieve):
+        mock_curie_retrieve.side_effect = [land_compensation_act_s8]
+        with register_utils.validation_scope():
+            for validator in (charge_validators.validate_s8_compensation_charge, charge_validators.validate_s52_compensation_charge,
+                              charge_validators.validate_statutory_provisions):
+                self.assertEqual(validator('local-land-charge', '/', '/', 'post', valid_s8), {'errors': []})
+        self.assertEqual(mock_curie_retrieve.call_count, 1)
+
+
 class TestChargeValidatorInstrumentProvisions(unittest.TestCase):
 
     def test_validate_instrument_provisions_instrumentonly(self):
@@ -201,6 +226,11 @@ class TestChargeValidatorInstrumentProvisions(unittest.TestCase):
 
 class TestValidateStatutoryProvisions(unittest.TestCase):
 
+    def test_statutory_provision_curies(self):
+        self.assertEqual(charge_validators.statutory_provision_curies(
+            "blah", "blah", "blah", "blah", {"statutory-provisions": ["statutory-provision:321", 5]}), ["statutory-provision:321"])
+        self.assertEqual(charge_validators.statutory_provision_curies("blah", "blah", "blah", "blah", {}), [])
+
     @patch('application.charge_validators.register_utils.retrieve_curie')
     def test_validate_statutory_provisions_exception(self, mock_curie_retrieve):
         mock_curie_retrieve.side_effect = [Exception("an exception")]
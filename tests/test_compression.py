@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+import unittest
+
+from application import app, compression, register_utils
+from mock import MagicMock, patch
+
+
+class TestCompression(unittest.TestCase):
+
+    records = {str(index): {"local-land-charge": str(index), "charge-type": "Planning", "entry-number": str(index)} for index in range(1, 101)}
+
+    def setUp(self):
+        app.config.from_object(os.environ.get('SETTINGS'))
+        self.app = app.test_client()
+        register_utils.ETAG_CACHE.clear()
+        register_utils.RESPONSE_CACHE.clear()
+
+    def get_records(self, mock_register_request, headers):
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.json.return_value = self.records
+        return self.app.get('/records', headers=dict({"Host": "local-land-charge.something.gov"}, **headers))
+
+    def test_gzip_chunks(self):
+        self.assertEqual(gzip.decompress(b''.join(compression.gzip_chunks([b'{"a": ', '"b"}', b''], 6))), b'{"a": "b"}')
+
+    @patch('application.views.register_utils.register_request')
+    def test_response_compressed(self, mock_register_request):
+        response = self.get_records(mock_register_request, {"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertEqual(json.loads(gzip.decompress(response.data).decode()), self.records)
+        self.assertEqual(response.headers['ETag'], 'W/"entry-100"')
+
+    @patch('application.views.register_utils.register_request')
+    def test_response_not_accepted(self, mock_register_request):
+        for headers in ({}, {"Accept-Encoding": "gzip;q=0, identity"}):
+            response = self.get_records(mock_register_request, headers)
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+            self.assertEqual(json.loads(response.data.decode()), self.records)
+
+    @patch('application.views.register_utils.register_request')
+    def test_response_below_minimum_size(self, mock_register_request):
+        with patch.dict(app.config, {'COMPRESS_MIN_SIZE': 1000000}):
+            response = self.get_records(mock_register_request, {"Accept-Encoding": "gzip"})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @patch('application.views.register_utils.register_request')
+    def test_not_modified_with_weak_tag(self, mock_register_request):
+        self.get_records(mock_register_request, {"Accept-Encoding": "gzip"})
+        response = self.get_records(mock_register_request, {"Accept-Encoding": "gzip", "If-None-Match": 'W/"entry-100"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @patch('application.views.register_utils.register_request')
+    def test_streamed_response_compressed(self, mock_register_request):
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.iter_content.return_value = [b'{"1": {"b": 1, ', b'"a": 2}}']
+        with patch.dict(app.config, {'STREAM_RECORDS': True}):
+            response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov", "Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertNotIn('Content-Length', response.headers)
+            self.assertEqual(gzip.decompress(response.data), b'{"1": {"a": 2, "b": 1}}')
+
+    @patch('application.views.register_utils.validate_json')
+    def test_compressed_request_body(self, mock_validate_json):
+        mock_validate_json.return_value = {"errors": ["an error"]}
+        self.app.post('/records', data=gzip.compress(json.dumps({"some": "json"}).encode()),
+                      headers={"Host": "local-land-charge.something.gov", "Content-Type": "application/json", "Content-Encoding": "gzip"})
+        self.assertEqual(mock_validate_json.call_args[0][3], {"some": "json"})
+
+    def test_invalid_compressed_request_body(self):
+        response = self.app.post('/records', data=b'not gzip', headers={"Host": "local-land-charge.something.gov",
+                                                                        "Content-Type": "application/json", "Content-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(json.loads(response.data.decode())['errors'][0].startswith('invalid gzip request body'))
+
+    def test_decompressed_size_limit(self):
+        middleware = compression.DecompressRequestMiddleware(MagicMock(), 10)
+        start_response = MagicMock()
+        body = gzip.compress(b'x' * 11)
+        middleware({'HTTP_CONTENT_ENCODING': 'gzip', 'CONTENT_LENGTH': str(len(body)), 'wsgi.input': MagicMock(read=lambda length: body)},
+                   start_response)
+        self.assertEqual(start_response.call_args[0][0], '400 BAD REQUEST')
+        self.assertFalse(middleware.wsgi_app.called)
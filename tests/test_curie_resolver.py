@@ -0,0 +1,56 @@
+import unittest
+
+from application import app, curie_resolver, register_utils
+from loadtest.stub_register import StubRegister
+from mock import patch
+
+
+class TestCurieResolver(unittest.TestCase):
+
+    records = {"statutory-provision": {"1": {"statutory-provision": "1", "provision": "section 1"}},
+               "further-information-location": {"1": {"further-information-location": "1", "see-also": "statutory-provision:1"}},
+               "local-land-charge": {
+                   "1": {"local-land-charge": "1", "statutory-provisions": ["statutory-provision:1", "statutory-provision:9"],
+                         "further-information": [{"information-location": "further-information-location:1"}],
+                         "item-hash": "sha-256:abc"},
+                   "2": {"local-land-charge": "2", "statutory-provisions": ["statutory-provision:1"]}}}
+
+    def setUp(self):
+        register_utils.CURIE_CACHE.clear()
+
+    def resolve(self, max_depth, bulk_lookup=False):
+        with StubRegister(self.records) as stub:
+            with patch.dict(app.config, {'LLC_REGISTER_URL': stub.url, 'REGISTER_BULK_LOOKUP': bulk_lookup}):
+                return curie_resolver.resolve(self.records["local-land-charge"], max_depth), stub.requests
+
+    def test_curie_links(self):
+        self.assertEqual(list(curie_resolver.curie_links(self.records["local-land-charge"]["1"])),
+                         ["statutory-provision:1", "statutory-provision:9", "further-information-location:1"])
+
+    def test_resolve(self):
+        resolved, requests = self.resolve(1)
+        self.assertEqual(resolved["1"]["statutory-provisions"], [self.records["statutory-provision"]["1"], "statutory-provision:9"])
+        self.assertEqual(resolved["2"]["statutory-provisions"], [self.records["statutory-provision"]["1"]])
+        self.assertEqual(resolved["1"]["further-information"][0]["information-location"]["see-also"], "statutory-provision:1")
+        self.assertEqual(resolved["1"]["item-hash"], "sha-256:abc")
+        # Links shared between records are fetched once
+        self.assertEqual(sorted(requests), ["/further-information-location/record/1?", "/statutory-provision/record/1?",
+                                            "/statutory-provision/record/9?"])
+
+    def test_resolve_depth(self):
+        resolved, requests = self.resolve(2)
+        self.assertEqual(resolved["1"]["further-information"][0]["information-location"]["see-also"], self.records["statutory-provision"]["1"])
+        self.assertEqual(len(requests), 3)
+
+    def test_resolve_bulk_lookup(self):
+        resolved, requests = self.resolve(1, bulk_lookup=True)
+        self.assertEqual(resolved["2"]["statutory-provisions"], [self.records["statutory-provision"]["1"]])
+        self.assertEqual(sorted(requests), ["/further-information-location/records?ids=1", "/statutory-provision/records?ids=1%2C9"])
+
+    def test_resolve_cached(self):
+        register_utils.CURIE_CACHE.set("statutory-provision:1", {"statutory-provision": "1", "provision": "cached"})
+        register_utils.CURIE_CACHE.set("statutory-provision:9", {"statutory-provision": "9"})
+        register_utils.CURIE_CACHE.set("further-information-location:1", {"further-information-location": "1"})
+        resolved, requests = self.resolve(1)
+        self.assertEqual(resolved["2"]["statutory-provisions"][0]["provision"], "cached")
+        self.assertEqual(requests, [])
@@ -0,0 +1,37 @@
+import unittest
+
+from application import geometry_utils
+
+
+square = {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]}
+
+
+class TestGeometryUtils(unittest.TestCase):
+
+    def test_canonical_point(self):
+        self.assertEqual(geometry_utils.canonical_geometry({"type": "Point", "coordinates": [292225.67273620487, -0.0001]}, 3),
+                         {"type": "Point", "coordinates": [292225.673, 0.0]})
+
+    def test_canonical_polygon_orientation_and_start(self):
+        clockwise = {"type": "Polygon", "coordinates": [[[10, 10], [10, 0], [0, 0], [0, 10], [10, 10]]]}
+        self.assertEqual(geometry_utils.canonical_geometry(square, 3), geometry_utils.canonical_geometry(clockwise, 3))
+        self.assertEqual(geometry_utils.canonical_geometry(clockwise, 3)['coordinates'],
+                         [[[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0], [0.0, 0.0]]])
+
+    def test_canonical_polygon_hole_clockwise(self):
+        polygon = {"type": "MultiPolygon", "coordinates": [[[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+                                                            [[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]]]]}
+        self.assertEqual(geometry_utils.canonical_geometry(polygon, 3)['coordinates'][0][1],
+                         [[2.0, 2.0], [2.0, 4.0], [4.0, 4.0], [4.0, 2.0], [2.0, 2.0]])
+
+    def test_canonical_not_geometry(self):
+        self.assertEqual(geometry_utils.canonical_geometry({"some": "json"}, 3), {"some": "json"})
+        self.assertEqual(geometry_utils.canonical_geometry({"type": "Point", "coordinates": "abc"}, 3), {"type": "Point", "coordinates": "abc"})
+
+    def test_geometry_key(self):
+        moved = {"type": "Polygon", "coordinates": [[[10, 0.0001], [10, 10], [0, 10], [0, 0], [10, 0]]]}
+        key = geometry_utils.geometry_key('intersects', None, square, 3)
+        self.assertEqual(geometry_utils.geometry_key('intersects', None, moved, 3), key)
+        self.assertNotEqual(geometry_utils.geometry_key('intersects', None, moved, 4), key)
+        self.assertNotEqual(geometry_utils.geometry_key('within', None, square, 3), key)
+        self.assertNotEqual(geometry_utils.geometry_key('intersects', '1', square, 3), key)
@@ -0,0 +1,52 @@
+import unittest
+
+from application import geometry_validators
+
+
+square = {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]}
+
+
+class TestGeometryValidators(unittest.TestCase):
+
+    def test_check_point(self):
+        self.assertEqual(geometry_validators.check_geometry({"type": "Point", "coordinates": [292225.6, 92976.9]}, 100),
+                         ([], [292225.6, 92976.9, 292225.6, 92976.9]))
+
+    def test_check_polygon_bbox(self):
+        self.assertEqual(geometry_validators.check_geometry(square, 100), ([], [0, 0, 10, 10]))
+
+    def test_check_collection(self):
+        collection = {"type": "GeometryCollection", "geometries": [square, {"type": "LineString", "coordinates": [[20, 5], [30, 15]]}]}
+        self.assertEqual(geometry_validators.check_geometry(collection, 100), ([], [0, 0, 30, 15]))
+
+    def test_check_unclosed_ring(self):
+        polygon = {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 1]]]}
+        self.assertEqual(geometry_validators.check_geometry(polygon, 100), (["geometry: Polygon rings must end at their first position"], None))
+
+    def test_check_min_positions(self):
+        self.assertEqual(geometry_validators.check_geometry({"type": "LineString", "coordinates": [[0, 0]]}, 100),
+                         (["geometry: LineString must have at least 2 positions"], None))
+        self.assertEqual(geometry_validators.check_geometry({"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [0, 0]]]}, 100),
+                         (["geometry: Polygon ring must have at least 4 positions"], None))
+
+    def test_check_shape(self):
+        for coordinates in ([[0, 0], [1]], [[0, 0, 0], [1, 1, 1]], [["a", "b"], [1, 1]], "abc"):
+            errors, bbox = geometry_validators.check_geometry({"type": "MultiPoint", "coordinates": coordinates}, 100)
+            self.assertEqual(len(errors), 1)
+
+    def test_check_finite(self):
+        self.assertEqual(geometry_validators.check_geometry({"type": "Point", "coordinates": [float('nan'), 1]}, 100),
+                         (["geometry: coordinates must be finite numbers"], None))
+
+    def test_check_bounds(self):
+        errors, bbox = geometry_validators.check_geometry({"type": "Point", "coordinates": [-1.5, 51.2]}, 100)
+        self.assertEqual(errors, ["geometry: coordinates must be within the bounds [0, 0, 700000, 1300000] of EPSG:27700"])
+        unknown_crs = {"type": "Point", "coordinates": [-1.5, 51.2], "crs": {"type": "name", "properties": {"name": "EPSG:4326"}}}
+        self.assertEqual(geometry_validators.check_geometry(unknown_crs, 100), ([], [-1.5, 51.2, -1.5, 51.2]))
+
+    def test_check_too_many_positions(self):
+        self.assertEqual(geometry_validators.check_geometry(square, 4), (["geometry: geometry has too many positions"], None))
+
+    def test_check_not_geometry(self):
+        self.assertEqual(geometry_validators.check_geometry({"some": "json"}, 100), ([], None))
+        self.assertEqual(geometry_validators.check_geometry("abc", 100), ([], None))
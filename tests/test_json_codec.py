@@ -0,0 +1,72 @@
+import unittest
+
+from application import json_codec
+from mock import MagicMock
+
+
+def register_response(content):
+    response = MagicMock()
+    response.content = content
+    response.json.side_effect = lambda: json_codec.JSONCodec().loads(content)
+    return response
+
+
+class TestJSONCodec(unittest.TestCase):
+
+    def test_codecs_sort_keys(self):
+        value = {"b": [1, {"d": None, "c": "é"}], "a": True}
+        self.assertEqual(json_codec.JSONCodec().dumps(value), '{"a": true, "b": [1, {"c": "\\u00e9", "d": null}]}')
+        codec = json_codec.load_codec('orjson')
+        self.assertEqual(codec.name, 'orjson')
+        self.assertEqual(codec.dumps(value), '{"a":true,"b":[1,{"c":"é","d":null}]}')
+        self.assertEqual(codec.loads(codec.dumps(value).encode('utf-8')), value)
+
+    def test_load_codec_unavailable(self):
+        class Missing(json_codec.JSONCodec):
+            def __init__(self):
+                raise ImportError("No module named 'missing'")
+        json_codec.CODECS['missing'] = Missing
+        try:
+            self.assertEqual(json_codec.load_codec('missing').name, 'json')
+        finally:
+            del json_codec.CODECS['missing']
+
+
+class TestCanonicalRelay(unittest.TestCase):
+
+    canonical = b'{"a": "thing", "entry-number": "3"}'
+    other = b'{"entry-number": "3", "a": "thing"}'
+
+    def test_detect_trusts_after_samples(self):
+        relay = json_codec.CanonicalRelay(json_codec.JSONCodec(), 'detect', 3, 4)
+        for _ in range(3):
+            self.assertEqual(relay.encode('local-land-charge', register_response(self.canonical)),
+                             (self.canonical.decode(), {"a": "thing", "entry-number": "3"}))
+        self.assertEqual(relay.stats()['trusted'], ['local-land-charge'])
+        results = [relay.encode('local-land-charge', register_response(self.canonical))[1] for _ in range(8)]
+        # Every fourth trusted response is checked again
+        self.assertEqual([value is None for value in results], [True, True, True, False, True, True, True, False])
+        self.assertEqual(relay.stats()['relayed'], 6)
+        self.assertEqual(relay.stats()['checks'], 5)
+
+    def test_detect_mismatch_resets(self):
+        relay = json_codec.CanonicalRelay(json_codec.JSONCodec(), 'detect', 2, 0)
+        relay.encode('local-land-charge', register_response(self.canonical))
+        body, value = relay.encode('local-land-charge', register_response(self.other))
+        self.assertEqual(body, self.canonical.decode())
+        relay.encode('local-land-charge', register_response(self.canonical))
+        self.assertEqual(relay.stats()['trusted'], [])
+        self.assertEqual(relay.stats()['mismatches'], 1)
+        # Registers are trusted separately
+        relay.encode('other-register', register_response(self.canonical))
+        relay.encode('other-register', register_response(self.canonical))
+        self.assertEqual(relay.encode('other-register', register_response(self.other)), (self.other, None))
+
+    def test_modes(self):
+        relay = json_codec.CanonicalRelay(json_codec.JSONCodec(), 'true', 20, 100)
+        self.assertEqual(relay.encode('local-land-charge', register_response(self.other)), (self.other, None))
+        relay = json_codec.CanonicalRelay(json_codec.JSONCodec(), 'false', 20, 100)
+        for _ in range(30):
+            self.assertEqual(relay.encode('local-land-charge', register_response(self.canonical))[0], self.canonical.decode())
+        self.assertEqual(relay.stats()['checks'], 0)
+        self.assertEqual(relay.stats()['relayed'], 0)
@@ -0,0 +1,91 @@
+import json
+import time
+import unittest
+
+import requests
+from application import register_utils
+from loadtest import driver
+from loadtest.stub_register import StubRegister, canned_records, charge
+
+
+class TestLoadtestStubRegister(unittest.TestCase):
+
+    def test_latency(self):
+        with StubRegister(canned_records(1), latency=(0.05, 0.05)) as stub:
+            start = time.monotonic()
+            response = requests.get(stub.url + '/local-land-charge/record/1')
+            self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(response.status_code, 200)
+
+    def test_error_injection(self):
+        with StubRegister(canned_records(1), error_rate=1) as stub:
+            response = requests.get(stub.url + '/local-land-charge/record/1')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(stub.requests, [])
+
+    def test_update(self):
+        with StubRegister(canned_records(2)) as stub:
+            response = requests.put(stub.url + '/local-land-charge/record/2', json=charge(2))
+            missing = requests.put(stub.url + '/local-land-charge/record/3', json=charge(3))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['local-land-charge'], '2')
+        self.assertEqual(response.json()['entry-number'], '53')
+        self.assertEqual(missing.status_code, 404)
+
+    def test_geometry_search(self):
+        with StubRegister(canned_records(3), geometry_results=2) as stub:
+            response = requests.post(stub.url + '/local-land-charge/records/geometry/intersects', json={})
+        self.assertEqual(sorted(response.json()), ['1', '2'])
+        self.assertEqual(response.headers['Truncated'], 'True')
+
+    def test_canned_charges_valid(self):
+        for index in range(1, 4):
+            result = register_utils.validate_json('local-land-charge', '/record/<primary_id>', 'put', charge(index))
+            self.assertEqual(result['errors'], [])
+
+
+class TestLoadtestDriver(unittest.TestCase):
+
+    def setUp(self):
+        register_utils.CURIE_CACHE.clear()
+        register_utils.ETAG_CACHE.clear()
+        register_utils.RESPONSE_CACHE.clear()
+        register_utils.GEOMETRY_CACHE.clear()
+
+    def test_percentile(self):
+        latencies = list(range(1, 101))
+        self.assertEqual(driver.percentile(latencies, 0.5), 50)
+        self.assertEqual(driver.percentile(latencies, 0.99), 99)
+        self.assertEqual(driver.percentile(latencies, 1.0), 100)
+        self.assertEqual(driver.percentile([7], 0.5), 7)
+        self.assertIsNone(driver.percentile([], 0.5))
+
+    def test_histogram(self):
+        result = driver.histogram([0.5, 1, 3, 7000])
+        self.assertEqual(result['<=1'], 2)
+        self.assertEqual(result['<=5'], 1)
+        self.assertEqual(result['>5000'], 1)
+        self.assertEqual(sum(result.values()), 4)
+
+    def test_parse_mix(self):
+        self.assertEqual(list(driver.parse_mix('get-record=3,geometry').items()), [('get-record', 3.0), ('geometry', 1.0)])
+        self.assertRaises(ValueError, driver.parse_mix, 'delete=1')
+
+    def test_run(self):
+        with StubRegister(canned_records(10), seed=1) as stub:
+            with driver.LocalApi(stub.url) as api:
+                report = driver.LoadDriver(api.url, 'local-land-charge.localhost', driver.DEFAULT_MIX, 10, seed=1).run(2, requests_total=40)
+        self.assertEqual(report['requests'], 40)
+        self.assertEqual(report['error-rate'], 0)
+        self.assertEqual(sum(route['requests'] for route in report['routes'].values()), 40)
+        for route in report['routes'].values():
+            self.assertEqual(route['client-errors'], 0)
+            self.assertEqual(sum(route['histogram-ms'].values()), route['requests'])
+        json.dumps(report)
+
+    def test_run_counts_errors(self):
+        with StubRegister(canned_records(10), error_rate=1) as stub:
+            with driver.LocalApi(stub.url) as api:
+                report = driver.LoadDriver(api.url, 'local-land-charge.localhost', driver.parse_mix('get-record'), 10).run(1, requests_total=5)
+        self.assertEqual(report['routes']['GET /record/<primary_id>']['errors'], 5)
+        self.assertEqual(report['error-rate'], 1)
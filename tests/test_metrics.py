@@ -0,0 +1,64 @@
+import time
+import unittest
+
+from application import app, metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counter(self):
+        registry = metrics.Metrics()
+        registry.inc("requests_total", (("route", "/records"),))
+        registry.inc("requests_total", (("route", "/records"),), 2)
+        text = registry.render()
+        self.assertIn("# TYPE requests_total counter\n", text)
+        self.assertIn('requests_total{route="/records"} 3\n', text)
+
+    def test_histogram(self):
+        registry = metrics.Metrics()
+        registry.observe("duration_seconds", (("route", "/records"),), 0.003)
+        registry.observe("duration_seconds", (("route", "/records"),), 20)
+        text = registry.render()
+        self.assertIn("# TYPE duration_seconds histogram\n", text)
+        self.assertIn('duration_seconds_bucket{route="/records",le="0.0025"} 0\n', text)
+        self.assertIn('duration_seconds_bucket{route="/records",le="0.005"} 1\n', text)
+        self.assertIn('duration_seconds_bucket{route="/records",le="10"} 1\n', text)
+        self.assertIn('duration_seconds_bucket{route="/records",le="+Inf"} 2\n', text)
+        self.assertIn('duration_seconds_sum{route="/records"} 20.003\n', text)
+        self.assertIn('duration_seconds_count{route="/records"} 2\n', text)
+
+    def test_render_families(self):
+        text = metrics.Metrics().render([("ready", "gauge", "Is ready", [((("name", 'a"b'),), True), ((), None)])])
+        self.assertEqual(text, '# HELP ready Is ready\n# TYPE ready gauge\nready{name="a\\"b"} 1\nready NaN\n')
+
+    def test_nested_phases_exclusive(self):
+        timing = metrics.RequestTiming()
+        timing.start("validator")
+        time.sleep(0.02)
+        timing.start("curie-fetch")
+        time.sleep(0.02)
+        timing.stop()
+        timing.stop()
+        self.assertGreaterEqual(timing.phases["curie-fetch"], 0.02)
+        self.assertGreaterEqual(timing.phases["validator"], 0.02)
+        self.assertLess(timing.phases["validator"], 0.04)
+        self.assertEqual(list(timing.phases), ["curie-fetch", "validator"])
+
+    def test_header(self):
+        timing = metrics.RequestTiming()
+        timing.phases["schema-validation"] = 0.0015
+        self.assertEqual(timing.header(0.01), "schema-validation;dur=1.50, total;dur=10.00")
+
+    def test_timed_outside_request(self):
+        with metrics.timed("schema-validation"):
+            pass
+
+    def test_timed_not_nested(self):
+        with app.test_request_context():
+            metrics.start_request()
+            with metrics.timed("curie-fetch"):
+                with metrics.timed("register", nested=False):
+                    pass
+            with metrics.timed("register", nested=False):
+                pass
+            self.assertEqual(sorted(metrics._timing().phases), ["curie-fetch", "register"])
@@ -0,0 +1,65 @@
+import json
+import unittest
+
+from application import record_stream
+from mock import MagicMock
+
+records = {"1": {"local-land-charge": "1", "geometry": {"type": "Point", "coordinates": [292225.6, 92976.9]}, "further-information": []},
+           "2": {"local-land-charge": "2", "charge-type": "déjà vu", "end-date": None, "flag": True, "count": 12345}}
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestIterItems(unittest.TestCase):
+
+    def test_iter_items_every_split(self):
+        data = json.dumps(records, indent=2, ensure_ascii=False).encode('utf-8')
+        for size in range(1, 20):
+            self.assertEqual(dict(record_stream.iter_items(split(data, size))), records)
+
+    def test_iter_items_order(self):
+        data = b'{"b": 1, "a": 2}'
+        self.assertEqual(list(record_stream.iter_items([data])), [("b", 1), ("a", 2)])
+
+    def test_iter_items_empty(self):
+        self.assertEqual(list(record_stream.iter_items([b' { } '])), [])
+
+    def test_iter_items_truncated(self):
+        with self.assertRaises(ValueError):
+            list(record_stream.iter_items([b'{"1": {"a": ']))
+
+    def test_iter_items_not_object(self):
+        with self.assertRaises(ValueError):
+            list(record_stream.iter_items([b'[1, 2]']))
+
+
+class TestCanonicalChunks(unittest.TestCase):
+
+    def test_canonical_matches_dumps(self):
+        data = json.dumps(records, separators=(',', ':')).encode('utf-8')
+        for chunk_size in (1, 64, 65536):
+            self.assertEqual(b''.join(record_stream.canonical_chunks(split(data, 7), chunk_size)),
+                             json.dumps(records, sort_keys=True).encode('utf-8'))
+
+    def test_canonical_empty(self):
+        self.assertEqual(b''.join(record_stream.canonical_chunks([b'{}'], 10)), b'{}')
+
+    def test_relay_closes_response(self):
+        response = MagicMock()
+        response.iter_content.return_value = [b'{"a"', b': 1}']
+        self.assertEqual(b''.join(record_stream.relay(response, 1024, False)), b'{"a": 1}')
+        response.iter_content.assert_called_once_with(chunk_size=1024)
+        self.assertTrue(response.close.called)
+
+
+class TestSelectPage(unittest.TestCase):
+
+    items = [("a", {"entry-number": "5"}), ("b", {"entry-number": "2"}), ("c", {"entry-number": "9"}), ("d", {"entry-number": "7"})]
+
+    def test_select_page_first(self):
+        self.assertEqual(record_stream.select_page(iter(self.items), 0, 2), ([("b", {"entry-number": "2"}), ("a", {"entry-number": "5"})], True))
+
+    def test_select_page_last(self):
+        self.assertEqual(record_stream.select_page(iter(self.items), 5, 2), ([("d", {"entry-number": "7"}), ("c", {"entry-number": "9"})], False))
@@ -0,0 +1,60 @@
+import threading
+import unittest
+
+import requests
+from application import register_client
+from mock import MagicMock, patch
+
+
+class TestRegisterClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = register_client.RegisterClient(5, 1.5, 10, 2, retry_backoff=0)
+
+    @patch('application.register_client.requests.Session.request')
+    def test_request_timeouts(self, mock_request):
+        mock_response = MagicMock()
+        mock_request.return_value = mock_response
+        self.assertEqual(self.client.request('GET', 'http://register/thing', json=None), mock_response)
+        mock_request.assert_called_once_with('get', 'http://register/thing', json=None, timeout=(1.5, 10), stream=False, headers=None)
+
+    def test_accept_encoding(self):
+        self.assertEqual(register_client.RegisterClient(5, 1.5, 10, 2, accept_encoding='gzip')._session().headers['Accept-Encoding'], 'gzip')
+
+    @patch('application.register_client.requests.Session.request')
+    def test_request_get_retried(self, mock_request):
+        mock_response = MagicMock()
+        mock_request.side_effect = [requests.ConnectionError("refused"), requests.Timeout("slow"), mock_response]
+        self.assertEqual(self.client.request('get', 'http://register/thing'), mock_response)
+        stats = self.client.stats()
+        self.assertEqual((stats['requests'], stats['errors'], stats['retries']), (3, 2, 2))
+
+    @patch('application.register_client.requests.Session.request')
+    def test_request_get_retries_bounded(self, mock_request):
+        mock_request.side_effect = requests.ConnectionError("refused")
+        self.assertRaises(requests.ConnectionError, self.client.request, 'get', 'http://register/thing')
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch('application.register_client.requests.Session.request')
+    def test_request_write_not_retried(self, mock_request):
+        mock_request.side_effect = requests.ConnectionError("refused")
+        self.assertRaises(requests.ConnectionError, self.client.request, 'put', 'http://register/thing', {"a": "b"})
+        self.assertEqual(mock_request.call_count, 1)
+
+    def test_sessions_share_pool(self):
+        sessions = []
+
+        def get_session():
+            sessions.append(self.client._session())
+
+        thread = threading.Thread(target=get_session)
+        thread.start()
+        thread.join()
+        get_session()
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertIs(sessions[0].get_adapter('http://register'), sessions[1].get_adapter('http://register'))
+
+    def test_stats_pools(self):
+        self.client.adapter.poolmanager.connection_from_url('http://register:5002')
+        self.assertEqual(self.client.stats()['pools'], [{"host": "http://register:5002", "max-size": 5, "connections-opened": 0,
+                                                         "requests": 0, "idle": 5}])
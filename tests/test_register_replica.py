@@ -0,0 +1,89 @@
+import threading
+import unittest
+
+from application import register_replica
+from mock import MagicMock, patch
+
+
+class TestRegisterReplica(unittest.TestCase):
+
+    def setUp(self):
+        self.fetch = MagicMock()
+        self.replica = register_replica.RegisterReplica('statutory-provision', self.fetch, 30, 300)
+
+    def test_not_ready(self):
+        self.assertFalse(self.replica.ready)
+        self.assertEqual(self.replica.lookup('1'), (False, None))
+
+    def test_load_and_lookup(self):
+        self.fetch.return_value = {"1": {"entry-number": "1", "provision": "a"}, "2": {"entry-number": "4", "provision": "b"}}
+        self.replica.sync()
+        self.fetch.assert_called_once_with(None)
+        self.assertTrue(self.replica.ready)
+        self.assertEqual(self.replica.lookup('1'), (True, {"entry-number": "1", "provision": "a"}))
+        # Possibly added since the sync, so left to the register
+        self.assertEqual(self.replica.lookup('3'), (False, None))
+        self.assertEqual((self.replica.stats()['hits'], self.replica.stats()['fallbacks']), (1, 1))
+        self.assertEqual(self.replica.stats()['latest-entry'], 4)
+
+    def test_incremental_sync(self):
+        self.fetch.side_effect = [{"1": {"entry-number": "1", "provision": "a"}, "2": {"entry-number": "4", "provision": "b"}},
+                                  {"1": {"entry-number": "1", "provision": "old"}, "3": {"entry-number": "5", "provision": "c"}}]
+        self.replica.sync()
+        self.replica.sync()
+        self.assertEqual(self.fetch.call_args[0], (4,))
+        self.assertEqual(self.replica.lookup('1'), (True, {"entry-number": "1", "provision": "a"}))
+        self.assertEqual(self.replica.lookup('3'), (True, {"entry-number": "5", "provision": "c"}))
+        self.assertEqual(self.replica.stats()['latest-entry'], 5)
+
+    @patch('application.register_replica.time.monotonic')
+    def test_stale(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.fetch.return_value = {"1": {"entry-number": "1"}}
+        self.replica.sync()
+        mock_monotonic.return_value = 401
+        self.assertEqual(self.replica.lookup('1'), (False, None))
+        self.assertEqual(self.replica.stats()['fallbacks'], 1)
+
+    def test_invalidate(self):
+        self.fetch.side_effect = [{"1": {"entry-number": "1"}}, {"1": {"entry-number": "2"}}]
+        self.replica.sync()
+        self.replica.invalidate('1')
+        self.assertEqual(self.replica.lookup('1'), (False, None))
+        self.replica.sync()
+        self.assertEqual(self.replica.lookup('1'), (True, {"entry-number": "2"}))
+
+    def test_invalidate_during_sync(self):
+        def fetch(cursor):
+            # Written after the fetch read the register
+            self.replica.invalidate('1')
+            return {"1": {"entry-number": "2"}}
+
+        self.fetch.return_value = {"1": {"entry-number": "1"}}
+        self.replica.sync()
+        self.replica.fetch = fetch
+        self.replica.sync()
+        self.assertEqual(self.replica.lookup('1'), (False, None))
+
+    def test_background_refresh(self):
+        synced = threading.Event()
+
+        def fetch(cursor):
+            synced.set()
+            return {"1": {"entry-number": "1"}}
+
+        replica = register_replica.RegisterReplica('statutory-provision', fetch, 30, 300)
+        replica.start()
+        self.assertTrue(synced.wait(5))
+        replica.stop()
+        for attempt in range(50):
+            if replica.ready:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(replica.lookup('1'), (True, {"entry-number": "1"}))
+
+    def test_sync_error(self):
+        self.fetch.side_effect = Exception("register down")
+        with self.assertRaises(Exception):
+            self.replica.sync()
+        self.assertFalse(self.replica.ready)
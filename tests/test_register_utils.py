@@ -1,9 +1,12 @@
+import threading
+import time
 import unittest
 import requests
 
-from application import register_utils
+from application import app, json_codec, register_utils, schema_registry
 import jsonschema
 from mock import patch, MagicMock
+from loadtest.stub_register import StubRegister
 
 
 class TestRegisterUtilsValidateJson(unittest.TestCase):
@@ -24,14 +27,45 @@ class TestRegisterUtilsValidateJson(unittest.TestCase):
                                                                                                   "year": "1900"}),
                          {"errors": []})
 
+    def test_validate_json_geometry_bbox(self):
+        self.assertEqual(register_utils.validate_json('local-land-charge', "/records/geometry/<function>", "post",
+                                                      {"type": "Point", "coordinates": [1, 2]}),
+                         {"errors": [], "bbox": [1, 2, 1, 2]})
+
+    def test_validate_json_geometry_rejected(self):
+        self.assertEqual(register_utils.validate_json('local-land-charge', "/records", "post",
+                                                      {"geometry": {"type": "LineString", "coordinates": [[1, 2]]}}),
+                         {"errors": ["geometry: LineString must have at least 2 positions"]})
+
     def test_validate_json_invalid(self):
         self.assertEqual(len(register_utils.validate_json('local-land-charge', "/records", "post", {})['errors']), 19)
 
-    @patch('application.register_utils.jsonschema.Draft4Validator')
+    def test_validate_json_max_errors(self):
+        self.assertEqual(len(register_utils.validate_json('local-land-charge', "/records", "post", {}, 1)['errors']), 1)
+        self.assertEqual(len(register_utils.validate_json('local-land-charge', "/records", "post", {}, 5)['errors']), 5)
+        self.assertEqual(len(register_utils.validate_json('local-land-charge', "/records", "post", {}, 0)['errors']), 19)
+
+    def test_validate_json_max_errors_stops_validation(self):
+        validator = MagicMock()
+        validator.iter_errors.return_value = (jsonschema.ValidationError("error {}".format(index)) for index in range(100))
+        with patch('application.register_utils.SCHEMA_REGISTRY.endpoint_validator', return_value=(validator, None)):
+            result = register_utils.validate_json('statutory-provision', "/records", "post", {}, 1)
+        self.assertEqual(result, {"errors": ["[], error 0"]})
+        self.assertEqual(len(list(validator.iter_errors.return_value)), 99)
+
+    def test_validate_json_max_errors_config(self):
+        with patch.dict(app.config, {'VALIDATION_MAX_ERRORS': 2}):
+            self.assertEqual(len(register_utils.validate_json('local-land-charge', "/records", "post", {})['errors']), 2)
+
+    @patch('application.schema_registry.jsonschema.Draft4Validator')
     def test_validate_json_schema_invalid(self, mock_validator):
-        mock_validator.side_effect = [jsonschema.SchemaError("error")]
-        self.assertEqual(register_utils.validate_json(
-            'statutory-provision', "/records", "post", {"dumbledore": "a provision"}), {"errors": ['invalid json schema']})
+        mock_validator.side_effect = jsonschema.SchemaError("error")
+        registry = schema_registry.SchemaRegistry(app.static_folder + '/schema',
+                                                  {'statutory-provision': {"resources": [["/records", "post", "a-schema"]],
+                                                                           "schemas": {"a-schema": {"type": "object"}}}})
+        with patch('application.register_utils.SCHEMA_REGISTRY', registry):
+            self.assertEqual(register_utils.validate_json(
+                'statutory-provision', "/records", "post", {"dumbledore": "a provision"}), {"errors": ['invalid json schema']})
 
 
 class TestRegisterUtilsAdditionalValidation(unittest.TestCase):
@@ -45,6 +79,205 @@ class TestRegisterUtilsAdditionalValidation(unittest.TestCase):
                          {"errors": []})
 
 
+class TestRegisterUtilsPrefetchCuries(unittest.TestCase):
+
+    def setUp(self):
+        register_utils.CURIE_CACHE.clear()
+
+    @patch('application.register_utils.register_request')
+    def test_additional_validation_prefetches_concurrently(self, mock_register_request):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_register(sub_domain, end_point, parameters, method, json_payload):
+            with lock:
+                active.append(end_point)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(end_point)
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {"provision": "section", "statutory-instrument": "Act", "year": "1900"}
+            return mock_response
+
+        mock_register_request.side_effect = slow_register
+        payload = {"statutory-provisions": ["statutory-provision:{}".format(i) for i in range(6)]}
+        register_utils.additional_validation('local-land-charge', '/records', '/records', 'post', payload)
+        self.assertEqual(mock_register_request.call_count, 6)
+        self.assertGreater(max(peak), 1)
+
+    @patch('application.register_utils.retrieve_curie')
+    def test_prefetch_curies_errors_ignored(self, mock_retrieve_curie):
+        mock_retrieve_curie.side_effect = [Exception("an exception"), None]
+        register_utils.prefetch_curies(["not-a-register:1", "local-land-charge:1"])
+        self.assertEqual(mock_retrieve_curie.call_count, 2)
+
+    @patch('application.register_utils.retrieve_curie')
+    def test_prefetch_curies_skips_cached(self, mock_retrieve_curie):
+        register_utils.CURIE_CACHE.set("local-land-charge:1", {"a": "record"})
+        register_utils.prefetch_curies(["local-land-charge:1"])
+        self.assertFalse(mock_retrieve_curie.called)
+
+
+class TestRegisterUtilsRetrieveCuries(unittest.TestCase):
+
+    records = {"statutory-provision": {"1": {"statutory-provision": "1"}, "2": {"statutory-provision": "2"}},
+               "local-land-charge": {"7": {"local-land-charge": "7"}}}
+
+    def setUp(self):
+        register_utils.CURIE_CACHE.clear()
+
+    def retrieve(self, stub, bulk_lookup):
+        with patch.dict(app.config, {'LLC_REGISTER_URL': stub.url, 'REGISTER_BULK_LOOKUP': bulk_lookup}):
+            return register_utils.retrieve_curies(["statutory-provision:1", "statutory-provision:2", "statutory-provision:3",
+                                                   "local-land-charge:7", "statutory-provision:1"])
+
+    def expected(self):
+        return {"statutory-provision:1": {"statutory-provision": "1"}, "statutory-provision:2": {"statutory-provision": "2"},
+                "statutory-provision:3": None, "local-land-charge:7": {"local-land-charge": "7"}}
+
+    def test_retrieve_curies_bulk(self):
+        with StubRegister(self.records) as stub:
+            self.assertEqual(self.retrieve(stub, True), self.expected())
+        self.assertEqual(sorted(stub.requests), ["/local-land-charge/records?ids=7", "/statutory-provision/records?ids=1%2C2%2C3"])
+
+    def test_retrieve_curies_bulk_unavailable(self):
+        with StubRegister(self.records, bulk_lookup=False) as stub:
+            self.assertEqual(self.retrieve(stub, True), self.expected())
+        self.assertEqual(sorted(stub.requests), ["/local-land-charge/record/7?", "/local-land-charge/records?ids=7",
+                                                 "/statutory-provision/record/1?", "/statutory-provision/record/2?",
+                                                 "/statutory-provision/record/3?", "/statutory-provision/records?ids=1%2C2%2C3"])
+
+    def test_retrieve_curies_single(self):
+        with StubRegister(self.records) as stub:
+            self.assertEqual(self.retrieve(stub, False), self.expected())
+        self.assertEqual(sorted(stub.requests), ["/local-land-charge/record/7?", "/statutory-provision/record/1?",
+                                                 "/statutory-provision/record/2?", "/statutory-provision/record/3?"])
+
+    def test_retrieve_curies_cached(self):
+        with StubRegister(self.records) as stub:
+            self.retrieve(stub, True)
+            self.assertEqual(self.retrieve(stub, True), self.expected())
+        self.assertEqual(sorted(stub.requests), ["/local-land-charge/records?ids=7", "/statutory-provision/records?ids=1%2C2%2C3",
+                                                 "/statutory-provision/records?ids=3"])
+
+    @patch('application.register_utils.retrieve_curie')
+    def test_retrieve_curies_error(self, mock_retrieve_curie):
+        mock_retrieve_curie.side_effect = [Exception("an exception"), None]
+        self.assertRaises(Exception, register_utils.retrieve_curies, ["local-land-charge:1", "local-land-charge:2"])
+        self.assertEqual(mock_retrieve_curie.call_count, 2)
+
+
+class TestRegisterUtilsReplicas(unittest.TestCase):
+
+    records = {"statutory-provision": {"1": {"statutory-provision": "1", "entry-number": "1"},
+                                       "2": {"statutory-provision": "2", "entry-number": "2"}}}
+
+    def setUp(self):
+        register_utils.CURIE_CACHE.clear()
+
+    def test_retrieve_from_replica(self):
+        with StubRegister({register: dict(records) for register, records in self.records.items()}) as stub:
+            with patch.dict(app.config, {'LLC_REGISTER_URL': stub.url, 'REGISTER_BULK_LOOKUP': False}):
+                replica = register_utils.register_replica.RegisterReplica(
+                    'statutory-provision', lambda cursor: register_utils._fetch_replica_records('statutory-provision', cursor), 30, 300)
+                with patch.dict(register_utils.REPLICAS, {'statutory-provision': replica}):
+                    # Not loaded yet, so looked up remotely
+                    self.assertEqual(register_utils.retrieve_curie("statutory-provision:1"), {"statutory-provision": "1", "entry-number": "1"})
+                    replica.sync()
+                    requests_made = len(stub.requests)
+                    self.assertEqual(register_utils.retrieve_curies(["statutory-provision:2", "statutory-provision:3"]),
+                                     {"statutory-provision:2": {"statutory-provision": "2", "entry-number": "2"}, "statutory-provision:3": None})
+                    # Only the record the replica does not hold is looked up remotely
+                    self.assertEqual(stub.requests[requests_made:], ["/statutory-provision/record/3?"])
+                    # Added to the register since the last sync
+                    stub.records['statutory-provision']['4'] = {"statutory-provision": "4", "entry-number": "3"}
+                    self.assertEqual(register_utils.retrieve_curie("statutory-provision:4"), {"statutory-provision": "4", "entry-number": "3"})
+                    replica.sync()
+        self.assertEqual(stub.requests, ["/statutory-provision/record/1?", "/statutory-provision/records?", "/statutory-provision/record/3?",
+                                         "/statutory-provision/record/4?", "/statutory-provision/records?page-size=1000&cursor=2"])
+
+    @patch('application.register_utils.register_request')
+    def test_fetch_replica_records_pages(self, mock_register_request):
+        first, second = MagicMock(), MagicMock()
+        first.status_code = second.status_code = 200
+        first.json.return_value = {"3": {"entry-number": "3"}}
+        first.headers = {"Next-Cursor": "3"}
+        second.json.return_value = {"4": {"entry-number": "4"}}
+        second.headers = {}
+        mock_register_request.side_effect = [first, second]
+        with patch.dict(app.config, {'REPLICA_PAGE_SIZE': 1}):
+            self.assertEqual(register_utils._fetch_replica_records('statutory-provision', 2), {"3": {"entry-number": "3"}, "4": {"entry-number": "4"}})
+        self.assertEqual(mock_register_request.call_args_list[1][0][2], ["page-size=1", "cursor=3"])
+
+    @patch('application.register_utils.register_request')
+    def test_fetch_replica_records_error(self, mock_register_request):
+        mock_register_request.return_value.status_code = 500
+        self.assertRaises(Exception, register_utils._fetch_replica_records, 'statutory-provision', None)
+
+    def test_invalidate_record_replica(self):
+        replica = MagicMock()
+        with patch.dict(register_utils.REPLICAS, {'statutory-provision': replica}):
+            register_utils.invalidate_record('statutory-provision', '5')
+        replica.invalidate.assert_called_once_with('5')
+
+
+class TestRegisterUtilsCreateRecords(unittest.TestCase):
+
+    def create(self, stub, batch_create):
+        with patch.dict(app.config, {'LLC_REGISTER_URL': stub.url, 'REGISTER_BATCH_CREATE': batch_create, 'BATCH_CHUNK_SIZE': 2}):
+            return register_utils.create_records("statutory-provision", [{"provision": str(i)} for i in range(3)], [])
+
+    def test_create_records_batch(self):
+        with StubRegister({}) as stub:
+            results = self.create(stub, True)
+        self.assertEqual([(status, record["provision"], error) for status, record, error in results], [(201, "0", None), (201, "1", None), (201, "2", None)])
+        self.assertEqual(stub.requests, ["POST /statutory-provision/records/batch?", "POST /statutory-provision/records/batch?"])
+
+    def test_create_records_batch_unavailable(self):
+        with StubRegister({}, batch_create=False) as stub:
+            results = self.create(stub, True)
+        self.assertEqual([(status, record["provision"], error) for status, record, error in results], [(201, "0", None), (201, "1", None), (201, "2", None)])
+        self.assertEqual(stub.requests.count("POST /statutory-provision/records/batch?"), 2)
+        self.assertEqual(stub.requests.count("POST /statutory-provision/records?"), 3)
+
+    def test_create_records_single(self):
+        with StubRegister({}) as stub:
+            results = self.create(stub, False)
+        self.assertEqual(sorted(record["statutory-provision"] for status, record, error in results), ["1", "2", "3"])
+        self.assertEqual(stub.requests, ["POST /statutory-provision/records?"] * 3)
+
+    @patch('application.register_utils.register_request')
+    def test_create_records_error(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_response.status_code = 500
+        mock_response.text = "Some backend error"
+        mock_register_request.return_value = mock_response
+        self.assertEqual(register_utils.create_records("statutory-provision", [{}], []), [(500, None, "Some backend error")])
+
+
+class TestRegisterUtilsValidateBatch(unittest.TestCase):
+
+    @patch('application.register_utils.prefetch_curies')
+    @patch('application.register_utils.retrieve_curie')
+    def test_validate_batch_shared_prefetch(self, mock_retrieve_curie, mock_prefetch_curies):
+        mock_retrieve_curie.return_value = {"provision": "section", "statutory-instrument": "Act", "year": "1900"}
+        results = register_utils.validate_batch('statutory-provision', '/record/1', '/record/<primary_id>', 'put',
+                                                [{"statutory-provision": "1", "provision": "section", "statutory-instrument": "Act", "year": "1900"},
+                                                 {"statutory-provision": "2"},
+                                                 "not a record"])
+        self.assertEqual(results[0], {"errors": []})
+        self.assertEqual(len(results[1]["errors"]), 3)
+        self.assertTrue(results[2]["errors"])
+        # The records being updated are fetched fresh rather than through the shared cache
+        self.assertEqual(mock_prefetch_curies.call_args_list[0][0], (set(), {"statutory-provision:1", "statutory-provision:2"}))
+
+    def test_validate_batch_invalid_subdomain(self):
+        self.assertEqual(register_utils.validate_batch('not-a-domain', '/records', '/records', 'post', [{}]), [{"errors": ['invalid sub-domain']}])
+
+
 class TestRegisterUtilsRetrieveCurie(unittest.TestCase):
 
     def setUp(self):
@@ -73,6 +306,40 @@ class TestRegisterUtilsRetrieveCurie(unittest.TestCase):
         mock_register_request.return_value = mock_response
         self.assertEqual(register_utils.retrieve_curie("local-land-charge:123"), {"thing": "ame"})
 
+    @patch('application.register_utils.register_request')
+    def test_retrieve_curie_fresh(self, mock_register_request):
+        register_utils.CURIE_CACHE.set("statutory-provision:1", {"a": "cached"})
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.json.return_value = {"a": "archived", "end-date": "2017-01-01"}
+        replica = MagicMock()
+        replica.lookup.return_value = (True, {"a": "replica"})
+        with patch.dict(register_utils.REPLICAS, {'statutory-provision': replica}):
+            with register_utils.validation_scope():
+                self.assertEqual(register_utils.retrieve_curie("statutory-provision:1", fresh=True), {"a": "archived", "end-date": "2017-01-01"})
+                # Fetched once per validation
+                self.assertEqual(register_utils.retrieve_curie("statutory-provision:1", fresh=True), {"a": "archived", "end-date": "2017-01-01"})
+            self.assertEqual(mock_register_request.call_count, 1)
+            self.assertFalse(replica.lookup.called)
+            self.assertEqual(register_utils.retrieve_curie("statutory-provision:1", fresh=True), {"a": "archived", "end-date": "2017-01-01"})
+            self.assertEqual(mock_register_request.call_count, 2)
+
+    @patch('application.register_utils.register_request')
+    def test_archived_elsewhere_cannot_be_updated(self, mock_register_request):
+        # Cached before the record was archived through another process
+        register_utils.CURIE_CACHE.set("llc-registering-authority:1", {"llc-registering-authority": "1"})
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.json.return_value = {"llc-registering-authority": "1", "end-date": "2017-01-01"}
+        result = register_utils.additional_validation('llc-registering-authority', '/record/1', '/record/<primary_id>', 'PUT',
+                                                      {"llc-registering-authority": "1"})
+        self.assertEqual(result, {"errors": ["Record has been archived, cannot update"]})
+        self.assertEqual(mock_register_request.call_count, 1)
+
+    @patch('application.register_utils.register_request')
+    def test_retrieve_curie_quoted(self, mock_register_request):
+        mock_register_request.return_value.status_code = 404
+        self.assertIsNone(register_utils.retrieve_curie("local-land-charge:a:b/../c?d#e"))
+        mock_register_request.assert_called_once_with("local-land-charge", "/record/a%3Ab%2F..%2Fc%3Fd%23e", [], 'get', None)
+
     @patch('application.register_utils.register_request')
     def test_retrieve_curie_500(self, mock_register_request):
         mock_response = MagicMock()
@@ -97,17 +364,131 @@ class TestRegisterUtilsRetrieveCurie(unittest.TestCase):
         self.assertEqual(result1, result2)
         self.assertEqual(result1, {"thing": "ame"})
 
+    @patch('application.register_utils.register_request')
+    def test_retrieve_curie_register_ttl(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"thing": "ame"}
+        mock_register_request.return_value = mock_response
+        with patch.dict(app.config['CURIE_CACHE_REGISTER_TTLS'], {"statutory-provision": 0}):
+            register_utils.retrieve_curie("statutory-provision:123")
+            register_utils.retrieve_curie("statutory-provision:123")
+        self.assertEqual(mock_register_request.call_count, 2)
+
+    @patch('application.register_utils.register_request')
+    def test_retrieve_curie_shared_between_validations(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"statutory-provision": "123"}
+        mock_register_request.return_value = mock_response
+        register_utils.retrieve_curie("statutory-provision:123")
+        register_utils.additional_validation('statutory-provision', '/records', '/records', 'post', {})
+        self.assertEqual(register_utils.retrieve_curie("statutory-provision:123"), {"statutory-provision": "123"})
+        self.assertEqual(mock_register_request.call_count, 1)
+
+    @patch('application.register_utils.register_request')
+    def test_invalidate_record(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.side_effect = [{"version": 1}, {"version": 2}]
+        mock_register_request.return_value = mock_response
+        self.assertEqual(register_utils.retrieve_curie("local-land-charge:123"), {"version": 1})
+        register_utils.invalidate_record("local-land-charge", "123")
+        self.assertEqual(register_utils.retrieve_curie("local-land-charge:123"), {"version": 2})
+
+
+class TestRegisterUtilsEtags(unittest.TestCase):
+
+    def test_record_etag(self):
+        self.assertEqual(register_utils.record_etag({"item-hash": "sha-256:abc"}), "sha-256:abc")
+        self.assertIsNone(register_utils.record_etag({"a": "thing"}))
+
+    def test_records_etag(self):
+        self.assertEqual(register_utils.records_etag({"1": {"entry-number": "3"}, "2": {"entry-number": "12"}}), "entry-12")
+        self.assertEqual(register_utils.records_etag({}), "entry-0")
+        self.assertIsNone(register_utils.records_etag({"1": {"entry-number": "3"}, "2": {"a": "thing"}}))
+
+    def test_raw_records_etag(self):
+        records = {"1": {"entry-number": "3", "note": '"entry-number": "99"'}, "2": {"entry-number": "12"}}
+        for codec in (json_codec.JSONCodec(), json_codec.load_codec('orjson')):
+            self.assertEqual(register_utils.raw_records_etag(codec.dumps(records).encode('utf-8')), "entry-12")
+        self.assertEqual(register_utils.raw_records_etag(b'{}'), "entry-0")
+        self.assertIsNone(register_utils.raw_records_etag(b'{"1": {"a": "thing"}}'))
+
+    def test_invalidate_record_etags(self):
+        register_utils.ETAG_CACHE.set(("local-land-charge", "/record/1"), "sha-256:abc")
+        register_utils.ETAG_CACHE.set(("local-land-charge", "/records"), "entry-1")
+        register_utils.invalidate_record("local-land-charge", "1")
+        self.assertIsNone(register_utils.ETAG_CACHE.get(("local-land-charge", "/record/1")))
+        self.assertIsNone(register_utils.ETAG_CACHE.get(("local-land-charge", "/records")))
+
+    def test_invalidate_record_responses(self):
+        register_utils.RESPONSE_CACHE.clear()
+        for key in (("local-land-charge", "/record/1", None), ("local-land-charge", "/record/2", None), ("local-land-charge", "/records", None),
+                    ("statutory-provision", "/record/1", None), ("statutory-provision", "/record/1", "1")):
+            register_utils.RESPONSE_CACHE.set(key, ("{}", None))
+        register_utils.invalidate_record("local-land-charge", "1")
+        self.assertEqual(len(register_utils.RESPONSE_CACHE), 2)
+        self.assertIsNotNone(register_utils.RESPONSE_CACHE.get(("local-land-charge", "/record/2", None)))
+        self.assertIsNotNone(register_utils.RESPONSE_CACHE.get(("statutory-provision", "/record/1", None)))
+
+
+class TestRegisterUtilsValidationScope(unittest.TestCase):
+
+    def setUp(self):
+        register_utils.CURIE_CACHE.clear()
+
+    @patch('application.register_utils.register_request')
+    def test_validation_scope_pins_records(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.side_effect = [{"version": 1}, {"version": 2}]
+        mock_register_request.return_value = mock_response
+        with register_utils.validation_scope():
+            self.assertEqual(register_utils.retrieve_curie("local-land-charge:1"), {"version": 1})
+            register_utils.invalidate_record("local-land-charge", "1")
+            self.assertEqual(register_utils.retrieve_curie("local-land-charge:1"), {"version": 1})
+        self.assertEqual(register_utils.retrieve_curie("local-land-charge:1"), {"version": 2})
+
+    @patch('application.register_utils.register_request')
+    def test_validation_scope_private_to_thread(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.side_effect = [{"version": 1}, {"version": 2}]
+        mock_register_request.return_value = mock_response
+        results = []
+
+        def other_validation():
+            with register_utils.validation_scope():
+                results.append(register_utils.retrieve_curie("local-land-charge:1"))
+
+        with register_utils.validation_scope():
+            register_utils.retrieve_curie("local-land-charge:1")
+            register_utils.invalidate_record("local-land-charge", "1")
+            thread = threading.Thread(target=other_validation)
+            thread.start()
+            thread.join()
+        self.assertEqual(results, [{"version": 2}])
+
+    def test_validation_scope_nested(self):
+        with register_utils.validation_scope():
+            register_utils._remember("local-land-charge:1", {"a": "record"})
+            with register_utils.validation_scope():
+                self.assertEqual(register_utils.retrieve_curie("local-land-charge:1"), {"a": "record"})
+            self.assertEqual(register_utils.retrieve_curie("local-land-charge:1"), {"a": "record"})
+        self.assertIsNone(register_utils.VALIDATION_STATE.curies)
+
 
 class TestRegisterUtilsRegisterRequest(unittest.TestCase):
 
-    @patch('application.register_utils.requests.get')
+    @patch('application.register_utils.REGISTER_CLIENT.request')
     def test_register_request_exception(self, mock_requests):
         mock_response = MagicMock()
         mock_requests.side_effect = [requests.HTTPError(response=mock_response)]
         mock_response.text = "something like went wrong or something"
         self.assertEqual(register_utils.register_request('a-domain', '/thing', [], 'get', {}), mock_response)
 
-    @patch('application.register_utils.requests.get')
+    @patch('application.register_utils.REGISTER_CLIENT.request')
     def test_register_request_exception_doctype(self, mock_requests):
         mock_response = MagicMock()
         mock_requests.side_effect = [requests.HTTPError(response=mock_response)]
@@ -119,8 +500,24 @@ class TestRegisterUtilsRegisterRequest(unittest.TestCase):
             exc = e
         self.assertEqual(str(exc), "500: Internal Server Error")
 
-    @patch('application.register_utils.requests.get')
+    @patch('application.register_utils.invalidate_record')
+    @patch('application.register_utils.register_request')
+    def test_send_write(self, mock_register_request, mock_invalidate):
+        job = {"id": "0-abc", "register": "local-land-charge", "method": "put", "end-point": "/record/1", "parameters": ["resolve=None"],
+               "payload": {"a": "thing"}}
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.json.return_value = {"local-land-charge": "1", "a": "thing"}
+        self.assertEqual(register_utils._send_write(job), (200, "1", None))
+        mock_register_request.assert_called_once_with("local-land-charge", "/record/1", ["resolve=None"], "put", {"a": "thing"},
+                                                      headers={"Idempotency-Key": "0-abc"})
+        mock_invalidate.assert_called_once_with("local-land-charge", "1")
+        mock_register_request.return_value.status_code = 409
+        mock_register_request.return_value.text = "conflict"
+        self.assertEqual(register_utils._send_write(job), (409, None, "conflict"))
+
+    @patch('application.register_utils.REGISTER_CLIENT.request')
     def test_register_request_ok(self, mock_requests):
         mock_response = MagicMock()
         mock_requests.return_value = mock_response
         self.assertEqual(register_utils.register_request('a-domain', '/thing', [], 'get', {}), mock_response)
+        mock_requests.assert_called_once_with('get', "{}/a-domain/thing?".format(app.config['LLC_REGISTER_URL']), json={}, stream=False, headers=None)
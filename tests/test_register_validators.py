@@ -40,3 +40,10 @@ class TestRegisterValidators(unittest.TestCase):
         mock_curie_retrieve.return_value = {'local-land-charge': '3'}
         self.assertEqual(register_validators.validate_archive_update("local-land-charge", "/whatever/1", "/whatever/{dwdw}", 'put', {'local-land-charge': '1'}),
                          {'errors': []})
+
+    def test_record_curies_put(self):
+        self.assertEqual(register_validators.record_curies("local-land-charge", "/record/1", "/record/<primary_id>", 'put', {'local-land-charge': '1'}),
+                         ["local-land-charge:1"])
+
+    def test_record_curies_post(self):
+        self.assertEqual(register_validators.record_curies("local-land-charge", "/records", "/records", 'post', {}), [])
@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from application import app, register_utils, schema_registry
+from mock import patch
+
+
+class TestSchemaRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = schema_registry.SchemaRegistry(app.static_folder + '/schema', register_utils.SCHEMA_ROUTES)
+
+    def test_endpoint_validator_flask_pattern(self):
+        validator, error = self.registry.endpoint_validator('local-land-charge', '/record/<primary_id>', 'PUT')
+        self.assertIsNone(error)
+        self.assertFalse(validator.is_valid({}))
+
+    def test_endpoint_validator_no_resource(self):
+        self.assertEqual(self.registry.endpoint_validator('local-land-charge', '/thing', 'delete'),
+                         (None, 'cannot find RAML resource definition'))
+
+    def test_endpoint_validator_no_schema(self):
+        self.assertEqual(self.registry.endpoint_validator('local-land-charge', '/records', 'get'),
+                         (None, 'cannot find schema in RAML resource definition'))
+
+    def test_definition_validator(self):
+        validator = self.registry.definition_validator('local-land-charge.json#/definitions/curie')
+        self.assertTrue(validator.is_valid('statutory-provision:1'))
+        self.assertFalse(validator.is_valid('nocurie'))
+
+    def test_definition_validator_unknown(self):
+        self.assertRaises(KeyError, self.registry.definition_validator, 'local-land-charge.json#/definitions/not-a-thing')
+
+    def test_geometry_validator_local_refs(self):
+        validator, error = self.registry.endpoint_validator('local-land-charge', '/records/geometry/<function>', 'post')
+        self.assertTrue(validator.is_valid({"type": "Point", "coordinates": [1, 2]}))
+        self.assertFalse(validator.is_valid({"type": "Point", "coordinates": [1]}))
+
+    def test_refs_resolved_from_memory(self):
+        validator, error = self.registry.endpoint_validator('statutory-provision', '/records', 'post')
+        with patch('builtins.open') as mock_open:
+            self.assertTrue(validator.is_valid({"provision": "section", "statutory-instrument": "Act", "year": "1900"}))
+            self.assertFalse(mock_open.called)
+
+    def test_validators_per_thread(self):
+        validators = []
+
+        def lookup():
+            validators.append(self.registry.endpoint_validator('local-land-charge', '/records', 'post')[0])
+            validators.append(self.registry.endpoint_validator('local-land-charge', '/records', 'post')[0])
+
+        thread = threading.Thread(target=lookup)
+        thread.start()
+        thread.join()
+        lookup()
+        self.assertIs(validators[0], validators[1])
+        self.assertIs(validators[2], validators[3])
+        self.assertIsNot(validators[0], validators[2])
+
+    def test_stats(self):
+        self.registry.endpoint_validator('statutory-provision', '/records', 'post')
+        self.registry.endpoint_validator('statutory-provision', '/records', 'post')
+        self.registry.endpoint_validator('statutory-provision', '/records', 'get')
+        stats = self.registry.stats()
+        self.assertEqual(stats['hits'], {'statutory-provision /records post': 2})
+        self.assertEqual(stats['misses'], {'statutory-provision /records get': 1})
+        self.assertEqual(stats['schema-files'], 10)
+        self.assertGreaterEqual(stats['build-time'], 0)
+
+
+class TestSchemaBundle(unittest.TestCase):
+
+    raml_files = {sub_domain: info["raml-file"] for sub_domain, info in register_utils.REGISTER_INFO.items()}
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.schema_folder = app.static_folder + '/schema'
+        self.files = schema_registry.load_schema_files(self.schema_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_bundle_current(self):
+        self.assertEqual(register_utils.STARTUP_STATS["schema-source"], "bundle")
+        self.assertEqual(register_utils.SCHEMA_ROUTES, schema_registry.parse_routes(self.schema_folder, self.raml_files))
+
+    def test_bundle_hash(self):
+        changed = dict(self.files, **{"geometry.json": self.files["geometry.json"] + " "})
+        self.assertEqual(len(schema_registry.bundle_hash(self.files, self.raml_files)), 64)
+        self.assertNotEqual(schema_registry.bundle_hash(changed, self.raml_files), schema_registry.bundle_hash(self.files, self.raml_files))
+        self.assertNotEqual(schema_registry.bundle_hash(self.files, {"local-land-charge": "local-land-charge.raml"}),
+                            schema_registry.bundle_hash(self.files, self.raml_files))
+
+    def test_load_routes_bundle(self):
+        bundle_path = os.path.join(self.folder, 'bundle.json')
+        with open(bundle_path, 'w') as bundle_file:
+            json.dump({"hash": schema_registry.bundle_hash(self.files, self.raml_files), "routes": {"a": "route"}}, bundle_file)
+        self.assertEqual(schema_registry.load_routes(self.schema_folder, self.raml_files, bundle_path, self.files), ({"a": "route"}, "bundle"))
+
+    @patch('application.schema_registry.parse_routes')
+    def test_load_routes_stale(self, mock_parse_routes):
+        mock_parse_routes.return_value = {"parsed": "routes"}
+        bundle_path = os.path.join(self.folder, 'bundle.json')
+        with open(bundle_path, 'w') as bundle_file:
+            json.dump({"hash": "old", "routes": {"a": "route"}}, bundle_file)
+        self.assertEqual(schema_registry.load_routes(self.schema_folder, self.raml_files, bundle_path, self.files), ({"parsed": "routes"}, "raml"))
+        self.assertEqual(schema_registry.load_routes(self.schema_folder, self.raml_files, bundle_path + '.missing', self.files),
+                         ({"parsed": "routes"}, "raml"))
@@ -1,8 +1,14 @@
 import json
 import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
-from application import app, views
+from application import app, register_utils, views, write_queue
 from mock import MagicMock, patch
 
 
@@ -15,6 +21,146 @@ class TestRoutes(unittest.TestCase):
     def test_health(self):
         self.assertEqual((self.app.get('/health')).status, '200 OK')
 
+    @patch('application.views.register_utils.start_write_queue')
+    @patch('application.views.register_utils.start_replicas')
+    def test_start(self, mock_start_replicas, mock_start_write_queue):
+        views.start()
+        self.assertTrue(mock_start_replicas.called)
+        self.assertTrue(mock_start_write_queue.called)
+
+    def test_import_starts_nothing(self):
+        # Tools such as bulk_validate.py import the application without serving it
+        with tempfile.TemporaryDirectory() as directory:
+            environment = dict(os.environ, SETTINGS='application.config.Config', ASYNC_WRITES='true', WRITE_QUEUE_DIR=os.path.join(directory, 'queue'))
+            threads = subprocess.check_output([sys.executable, '-c', 'import threading, application.views; print(threading.active_count())'],
+                                              env=environment, stderr=subprocess.DEVNULL)
+            self.assertEqual(threads.strip(), b'1')
+            self.assertFalse(os.path.exists(os.path.join(directory, 'queue')))
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        app.config.from_object(os.environ.get('SETTINGS'))
+        self.app = app.test_client()
+
+    @patch('application.views.register_utils.REGISTER_CLIENT.request')
+    def test_server_timing(self, mock_request):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.json.return_value = {"statutory-provision": "1", "provision": "section 1",
+                                                       "statutory-instrument": "Planning Act", "year": "1990"}
+        response = self.app.put('/record/1', data=json.dumps({"statutory-provision": "1", "provision": "section 1",
+                                                              "statutory-instrument": "Planning Act", "year": "1990"}),
+                                headers={"Host": "statutory-provision.something.gov", "Content-Type": "application/json"})
+        phases = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(phases[:2], ["schema-lookup", "schema-validation"])
+        self.assertIn("validate_primary_id", phases)
+        self.assertIn("register", phases)
+        self.assertEqual(phases[-1], "total")
+
+    def test_server_timing_disabled(self):
+        app.config['SERVER_TIMING'] = False
+        response = self.app.get('/health', headers={"Host": "local-land-charge.something.gov"})
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_metrics(self):
+        self.app.get('/health', headers={"Host": "local-land-charge.something.gov"})
+        self.app.get('/health', headers={"Host": "anything.something.gov"})
+        response = self.app.get('/metrics')
+        text = response.data.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('llc_api_requests_total{route="/health",method="GET",sub_domain="local-land-charge",status="200"}', text)
+        self.assertIn('llc_api_requests_total{route="/health",method="GET",sub_domain="other",status="200"}', text)
+        self.assertIn('llc_api_request_duration_seconds_count{route="/health",method="GET",sub_domain="local-land-charge"}', text)
+        self.assertIn('llc_api_cache_events_total{cache="curie",event="hits"}', text)
+        self.assertIn('llc_api_startup_seconds{stage="registry"}', text)
+
+    def test_metrics_disabled(self):
+        app.config['METRICS_ENABLED'] = False
+        response = self.app.get('/health', headers={"Host": "local-land-charge.something.gov"})
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEqual(self.app.get('/metrics').status_code, 404)
+
+
+@patch('application.views.register_utils.additional_validation', MagicMock(return_value={"errors": []}))
+@patch('application.views.register_utils.validate_json', MagicMock(return_value={"errors": []}))
+class TestAsyncWrites(unittest.TestCase):
+
+    def setUp(self):
+        app.config.from_object(os.environ.get('SETTINGS'))
+        app.config['ASYNC_WRITES'] = 'true'
+        self.app = app.test_client()
+        self.directory = tempfile.TemporaryDirectory()
+        self.send = MagicMock(return_value=(201, "2", None))
+        self.queue = write_queue.WriteQueue(self.directory.name, self.send, 1, 1, 3, 0, 10)
+        self.queue.start()
+        self.patcher = patch.object(register_utils, 'WRITE_QUEUE', self.queue)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.queue.stop()
+        self.directory.cleanup()
+
+    @patch('application.views.register_utils.register_request')
+    def test_create_queued(self, mock_register_request):
+        response = self.app.post('/records?resolve=1', data=json.dumps({"some": "json"}),
+                                 headers={"Host": "local-land-charge.something.gov", "Content-Type": "application/json"})
+        self.assertEqual(response.status_code, 202)
+        job = json.loads(response.data.decode())
+        self.assertEqual((job['state'], job['location']), ("queued", None))
+        self.assertEqual(response.headers['Location'], 'http://local-land-charge.something.gov/jobs/{}'.format(job['id']))
+        self.assertFalse(mock_register_request.called)
+        self.assertTrue(self.queue.wait(5))
+        sent = self.send.call_args[0][0]
+        self.assertEqual((sent['register'], sent['method'], sent['end-point'], sent['parameters'], sent['payload']),
+                         ('local-land-charge', 'post', '/records', ['resolve=1'], {"some": "json"}))
+        response = self.app.get('/jobs/{}'.format(job['id']), headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.status_code, 200)
+        job = json.loads(response.data.decode())
+        self.assertEqual((job['state'], job['status'], job['location']), ("done", 201, 'http://local-land-charge.something.gov/record/2'))
+
+    @patch('application.views.register_utils.register_request')
+    def test_queue_not_started(self, mock_register_request):
+        self.queue.stop()
+        mock_register_request.return_value.status_code = 201
+        mock_register_request.return_value.json.return_value = {"local-land-charge": "2"}
+        response = self.app.post('/records', data=json.dumps({"some": "json"}),
+                                 headers={"Host": "local-land-charge.something.gov", "Content-Type": "application/json"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers['Location'], 'http://local-land-charge.something.gov/record/2')
+        self.assertFalse(self.send.called)
+
+    def test_job_not_found(self):
+        job_id = self.queue.submit('local-land-charge', 'PUT', '/record/1', [], {})['id']
+        for host, path in (("statutory-provision.something.gov", job_id), ("local-land-charge.something.gov", "0-unknown")):
+            response = self.app.get('/jobs/{}'.format(path), headers={"Host": host})
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.data.decode(), '{"errors": ["job not found"]}')
+
+    @patch('application.views.register_utils.register_request')
+    def test_prefer(self, mock_register_request):
+        app.config['ASYNC_WRITES'] = 'prefer'
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.json.return_value = {"a": "thing"}
+        headers = {"Host": "local-land-charge.something.gov", "Content-Type": "application/json"}
+        response = self.app.put('/record/1', data=json.dumps({"a": "thing"}), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        response = self.app.put('/record/1', data=json.dumps({"a": "thing"}), headers=dict(headers, Prefer="respond-async, wait=10"))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Preference-Applied'], 'respond-async')
+        self.assertEqual(mock_register_request.call_count, 1)
+
+    def test_queue_full(self):
+        release = threading.Event()
+        self.send.side_effect = lambda job: release.wait(5) and (201, "2", None)
+        headers = {"Host": "local-land-charge.something.gov", "Content-Type": "application/json"}
+        self.assertEqual(self.app.post('/records', data=json.dumps({"some": "json"}), headers=headers).status_code, 202)
+        response = self.app.post('/records', data=json.dumps({"some": "json"}), headers=headers)
+        release.set()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data.decode(), '{"errors": ["write queue is full"]}')
+
 
 class TestException(unittest.TestCase):
 
@@ -33,6 +179,9 @@ class TestRegisterEndpoints(unittest.TestCase):
     def setUp(self):
         app.config.from_object(os.environ.get('SETTINGS'))
         self.app = app.test_client()
+        register_utils.ETAG_CACHE.clear()
+        register_utils.RESPONSE_CACHE.clear()
+        register_utils.GEOMETRY_CACHE.clear()
 
     def test_get_records_invalid_subdomain(self):
         response = self.app.get('/records')
@@ -56,6 +205,100 @@ class TestRegisterEndpoints(unittest.TestCase):
         response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov"})
         self.assertEqual(response.data.decode(), '{"a": "thing"}')
 
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_streamed(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b'{"1": {"b": 1, ', b'"a": 2}}']
+        with patch.dict(app.config, {'STREAM_RECORDS': True}):
+            response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov"})
+            self.assertEqual(response.data.decode(), '{"1": {"a": 2, "b": 1}}')
+        self.assertEqual(mock_register_request.call_args[1], {"stream": True})
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_streamed_raw(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b'{"1": {"b": 1, ', b'"a": 2}}']
+        with patch.dict(app.config, {'STREAM_RECORDS': True, 'STREAM_CANONICAL': False}):
+            response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov"})
+            self.assertEqual(response.data.decode(), '{"1": {"b": 1, "a": 2}}')
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_streamed_backend_error(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 400
+        mock_response.text = "Some backend error"
+        with patch.dict(app.config, {'STREAM_RECORDS': True}):
+            response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.data.decode(), '{"errors": ["Some backend error"]}')
+        self.assertTrue(mock_response.close.called)
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_page_emulated(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [json.dumps({"1": {"entry-number": "4"}, "2": {"entry-number": "6"},
+                                                               "3": {"entry-number": "8"}, "4": {"entry-number": "2"}}).encode()]
+        response = self.app.get('/records?page-size=2&cursor=3', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.data.decode(), '{"1": {"entry-number": "4"}, "2": {"entry-number": "6"}}')
+        self.assertEqual(response.headers['Next-Cursor'], '6')
+        self.assertEqual(response.headers['Link'], '<http://local-land-charge.something.gov/records?cursor=6&page-size=2>; rel="next"')
+        self.assertEqual(mock_register_request.call_args[0][2], ["resolve=None", "page-size=2", "cursor=3"])
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_page_last(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [b'{"1": {"entry-number": "4"}}']
+        response = self.app.get('/records?page-size=2', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.data.decode(), '{"1": {"entry-number": "4"}}')
+        self.assertNotIn('Link', response.headers)
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_page_native(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.headers = {"Link": '<http://register/local-land-charge/records?page-size=1&cursor=4>; rel="next"'}
+        mock_response.iter_content.return_value = [b'{"1": {"entry-number": "4"}}']
+        response = self.app.get('/records?page-size=1&resolve=1', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.headers['Next-Cursor'], '4')
+        self.assertEqual(response.headers['Link'], '<http://local-land-charge.something.gov/records?cursor=4&page-size=1&resolve=1>; rel="next"')
+
+    def test_get_records_page_invalid(self):
+        response = self.app.get('/records?page-size=0', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.status_code, 400)
+        response = self.app.get('/records?cursor=abc', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('application.views.register_utils.retrieve_curies')
+    def test_get_records_by_id(self, mock_retrieve_curies):
+        mock_retrieve_curies.return_value = {"local-land-charge:1": {"a": "thing"}, "local-land-charge:2": None}
+        response = self.app.get('/records?ids=1,2', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.data.decode(), '{"1": {"a": "thing"}}')
+        self.assertEqual(sorted(mock_retrieve_curies.call_args[0][0]), ["local-land-charge:1", "local-land-charge:2"])
+
+    @patch('application.views.register_utils.retrieve_curies')
+    def test_get_records_by_id_invalid(self, mock_retrieve_curies):
+        for ids in ('a:b', '../records', '1,2?x=y', '1#2', '1 2'):
+            response = self.app.get('/records', query_string={"ids": ids}, headers={"Host": "local-land-charge.something.gov"})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data.decode(), '{"errors": ["ids must not contain \':\', \'/\', \'?\', \'#\' or whitespace: 1 2"]}')
+        self.assertFalse(mock_retrieve_curies.called)
+
+    def test_get_records_by_id_none(self):
+        response = self.app.get('/records?ids=', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data.decode(), '{"errors": ["between 1 and 100 ids must be supplied"]}')
+
     def test_get_record_invalid_subdomain(self):
         response = self.app.get('/record/1')
         self.assertEqual(response.data.decode(), '{"errors": ["invalid sub-domain"]}')
@@ -78,12 +321,141 @@ class TestRegisterEndpoints(unittest.TestCase):
         response = self.app.get('/record/1', headers={"Host": "local-land-charge.something.gov"})
         self.assertEqual(response.data.decode(), '{"a": "thing"}')
 
+    @patch('application.views.register_utils.register_request')
+    def test_get_record_etag(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"a": "thing", "item-hash": "sha-256:abc"}
+        response = self.app.get('/record/1', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], '"sha-256:abc"')
+        response = self.app.get('/record/1', headers={"Host": "local-land-charge.something.gov", "If-None-Match": '"sha-256:abc"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data.decode(), '')
+        # Answered from the entity tag cache
+        self.assertEqual(mock_register_request.call_count, 1)
+        response = self.app.get('/record/1', headers={"Host": "local-land-charge.something.gov", "If-None-Match": '"sha-256:old"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.decode(), '{"a": "thing", "item-hash": "sha-256:abc"}')
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_record_etag_resolved(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"a": "thing", "item-hash": "sha-256:abc"}
+        response = self.app.get('/record/1?resolve=1', headers={"Host": "local-land-charge.something.gov"})
+        etag = response.headers['ETag']
+        self.assertNotEqual(etag, '"sha-256:abc"')
+        response = self.app.get('/record/1?resolve=1', headers={"Host": "local-land-charge.something.gov", "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        # Resolved entity tags are not cached, the response cache is invalidated by writes to any register
+        register_utils.invalidate_record("statutory-provision", "1")
+        response = self.app.get('/record/1?resolve=1', headers={"Host": "local-land-charge.something.gov", "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(mock_register_request.call_count, 2)
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_etag(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"1": {"entry-number": "3"}, "2": {"entry-number": "7"}}
+        response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.headers['ETag'], '"entry-7"')
+        register_utils.invalidate_record("local-land-charge", "2")
+        response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov", "If-None-Match": '"entry-7"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(mock_register_request.call_count, 2)
+
+    @patch('application.views.curie_resolver.resolve')
+    @patch('application.views.register_utils.register_request')
+    def test_get_records_resolved_in_api(self, mock_register_request, mock_resolve):
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.json.return_value = {"1": {"originating-authority": "llc-registering-authority:1"}}
+        mock_resolve.return_value = {"1": {"originating-authority": {"name": "A council"}}}
+        response = self.app.get('/records?resolve=1', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.data.decode(), '{"1": {"originating-authority": {"name": "A council"}}}')
+        mock_register_request.assert_called_with('local-land-charge', '/records', ['resolve=None'], 'GET', None)
+        mock_resolve.assert_called_with({"1": {"originating-authority": "llc-registering-authority:1"}}, 1)
+
+    @patch('application.views.curie_resolver.resolve')
+    @patch('application.views.register_utils.register_request')
+    def test_get_record_resolved_by_register(self, mock_register_request, mock_resolve):
+        app.config['RESOLVE_IN_API'] = False
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.json.return_value = {"originating-authority": {"name": "A council"}}
+        response = self.app.get('/record/1?resolve=1', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.data.decode(), '{"originating-authority": {"name": "A council"}}')
+        mock_register_request.assert_called_with('local-land-charge', '/record/1', ['resolve=1'], 'GET', None)
+        self.assertFalse(mock_resolve.called)
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_record_canonical_relayed(self, mock_register_request):
+        mock_register_request.return_value.status_code = 200
+        mock_register_request.return_value.content = b'{"a": "thing", "entry-number": "3", "item-hash": "sha-256:abc"}'
+        with patch.object(register_utils.CANONICAL_RELAY, 'mode', 'true'):
+            response = self.app.get('/record/1', headers={"Host": "local-land-charge.something.gov"})
+            self.assertEqual(response.data, b'{"a": "thing", "entry-number": "3", "item-hash": "sha-256:abc"}')
+            self.assertEqual(response.headers['ETag'], '"sha-256:abc"')
+            mock_register_request.return_value.content = b'{"1": {"entry-number": "3"}, "2": {"entry-number": "7"}}'
+            # The whole collection is never decoded, only scanned for its entry numbers
+            with patch.object(register_utils.JSON_CODEC, 'loads', side_effect=AssertionError("decoded")):
+                response = self.app.get('/records', headers={"Host": "local-land-charge.something.gov"})
+            self.assertEqual(response.data, b'{"1": {"entry-number": "3"}, "2": {"entry-number": "7"}}')
+            self.assertEqual(response.headers['ETag'], '"entry-7"')
+        self.assertFalse(mock_register_request.return_value.json.called)
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_record_response_cache(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"a": "thing"}
+        hits = register_utils.RESPONSE_CACHE.stats()['hits']
+        for path in ('/record/1', '/record/1', '/record/1?resolve=1', '/record/1?resolve=1', '/records', '/records'):
+            response = self.app.get(path, headers={"Host": "local-land-charge.something.gov"})
+            self.assertEqual(response.data.decode(), '{"a": "thing"}')
+        self.assertEqual(mock_register_request.call_count, 3)
+        # A write to the record discards its cached responses and all resolved responses
+        register_utils.invalidate_record("local-land-charge", "1")
+        for path in ('/record/1', '/record/1?resolve=1', '/records'):
+            self.app.get(path, headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(mock_register_request.call_count, 6)
+        self.assertEqual(register_utils.RESPONSE_CACHE.stats()['hits'] - hits, 3)
+
+    @patch('application.views.register_utils.register_request')
+    def test_get_record_response_cache_error(self, mock_register_request):
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 404
+        mock_response.text = "not found"
+        self.app.get('/record/1', headers={"Host": "local-land-charge.something.gov"})
+        self.app.get('/record/1', headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(mock_register_request.call_count, 2)
+
     @patch('application.views.register_utils.validate_json')
     def test_create_record_validate_json_errors(self, mock_validate_json):
         mock_validate_json.return_value = {"errors": ["an error"]}
         response = self.app.post('/records', data=json.dumps({"some": "json"}), headers={"Host": "local-land-charge.something.gov"})
         self.assertEqual(response.data.decode(), '{"errors": ["an error"]}')
 
+    @patch('application.views.register_utils.validate_json')
+    def test_create_record_max_errors(self, mock_validate_json):
+        mock_validate_json.return_value = {"errors": ["an error"]}
+        headers = {"Host": "local-land-charge.something.gov", "Content-Type": "application/json"}
+        self.app.post('/records?max-errors=1', data=json.dumps({"some": "json"}), headers=headers)
+        mock_validate_json.assert_called_with('local-land-charge', '/records', 'POST', {"some": "json"}, 1)
+        self.app.post('/records', data=json.dumps({"some": "json"}), headers=headers)
+        mock_validate_json.assert_called_with('local-land-charge', '/records', 'POST', {"some": "json"}, None)
+
+    def test_create_record_invalid_max_errors(self):
+        response = self.app.post('/records?max-errors=first', data=json.dumps({"some": "json"}),
+                                 headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data.decode(), '{"errors": ["max-errors must be a whole number"]}')
+
     @patch('application.views.register_utils.validate_json')
     @patch('application.views.register_utils.additional_validation')
     def test_create_record_additional_validation_errors(self, mock_additional_validation, mock_validate_json):
@@ -117,6 +489,62 @@ class TestRegisterEndpoints(unittest.TestCase):
         mock_response.json.return_value = {"i got": "created", "local-land-charge": "2"}
         response = self.app.post('/records', data=json.dumps({"some": "json"}), headers={"Host": "local-land-charge.something.gov"})
         self.assertEqual(response.data.decode(), '{"i got": "created", "local-land-charge": "2"}')
+        self.assertEqual(response.headers['Location'], 'http://local-land-charge.something.gov/record/2')
+
+    @patch('application.views.register_utils.validate_json')
+    @patch('application.views.register_utils.additional_validation')
+    @patch('application.views.register_utils.register_request')
+    @patch('application.views.register_utils.invalidate_record')
+    def test_create_record_invalidates_cache(self, mock_invalidate, mock_register_request, mock_additional_validation, mock_validate_json):
+        mock_validate_json.return_value = {"errors": []}
+        mock_additional_validation.return_value = {"errors": []}
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 201
+        mock_response.json.return_value = {"local-land-charge": "2"}
+        self.app.post('/records', data=json.dumps({"some": "json"}), headers={"Host": "local-land-charge.something.gov"})
+        mock_invalidate.assert_called_once_with('local-land-charge', '2')
+
+    def test_create_records_not_array(self):
+        response = self.app.post('/records/batch', data=json.dumps({"some": "json"}), headers={"Host": "local-land-charge.something.gov"},
+                                 content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    @patch('application.views.register_utils.validate_batch')
+    @patch('application.views.register_utils.create_records')
+    def test_create_records_atomic_rejected(self, mock_create_records, mock_validate_batch):
+        mock_validate_batch.return_value = [{"errors": []}, {"errors": ["an error"]}]
+        response = self.app.post('/records/batch', data=json.dumps([{}, {}]), headers={"Host": "local-land-charge.something.gov"},
+                                 content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data.decode()), {"results": [{"index": 0, "status": None, "errors": []},
+                                                                          {"index": 1, "status": 400, "errors": ["an error"]}]})
+        self.assertFalse(mock_create_records.called)
+
+    @patch('application.views.register_utils.validate_batch')
+    @patch('application.views.register_utils.create_records')
+    @patch('application.views.register_utils.invalidate_record')
+    def test_create_records_partial(self, mock_invalidate, mock_create_records, mock_validate_batch):
+        mock_validate_batch.return_value = [{"errors": []}, {"errors": ["an error"]}, {"errors": []}]
+        mock_create_records.return_value = [(201, {"local-land-charge": "5"}, None), (500, None, "Some backend error")]
+        response = self.app.post('/records/batch?mode=partial', data=json.dumps([{"a": 1}, {"a": 2}, {"a": 3}]),
+                                 headers={"Host": "local-land-charge.something.gov"}, content_type="application/json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(json.loads(response.data.decode()),
+                         {"results": [{"index": 0, "status": 201, "errors": [], "location": "http://local-land-charge.something.gov/record/5"},
+                                      {"index": 1, "status": 400, "errors": ["an error"]},
+                                      {"index": 2, "status": 500, "errors": ["Some backend error"]}]})
+        self.assertEqual(mock_create_records.call_args[0][1], [{"a": 1}, {"a": 3}])
+        mock_invalidate.assert_called_once_with('local-land-charge', '5')
+
+    @patch('application.views.register_utils.validate_batch')
+    @patch('application.views.register_utils.create_records')
+    def test_create_records_all_created(self, mock_create_records, mock_validate_batch):
+        mock_validate_batch.return_value = [{"errors": []}]
+        mock_create_records.return_value = [(201, {"local-land-charge": "5"}, None)]
+        response = self.app.post('/records/batch', data=json.dumps([{"a": 1}]), headers={"Host": "local-land-charge.something.gov"},
+                                 content_type="application/json")
+        self.assertEqual(response.status_code, 201)
 
     @patch('application.views.register_utils.validate_json')
     def test_update_record_validate_json_errors(self, mock_validate_json):
@@ -158,6 +586,20 @@ class TestRegisterEndpoints(unittest.TestCase):
         response = self.app.put('/record/1', data=json.dumps({"some": "json"}), headers={"Host": "local-land-charge.something.gov"})
         self.assertEqual(response.data.decode(), '{"i got": "created", "local-land-charge": "2"}')
 
+    @patch('application.views.register_utils.validate_json')
+    @patch('application.views.register_utils.additional_validation')
+    @patch('application.views.register_utils.register_request')
+    @patch('application.views.register_utils.invalidate_record')
+    def test_update_record_invalidates_cache(self, mock_invalidate, mock_register_request, mock_additional_validation, mock_validate_json):
+        mock_validate_json.return_value = {"errors": []}
+        mock_additional_validation.return_value = {"errors": []}
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"local-land-charge": "1"}
+        self.app.put('/record/1', data=json.dumps({"some": "json"}), headers={"Host": "local-land-charge.something.gov"})
+        mock_invalidate.assert_called_once_with('local-land-charge', '1')
+
     def test_geometry_search_invalid_subdomain(self):
         response = self.app.post('/records/geometry/intersects')
         self.assertEqual(response.data.decode(), '{"errors": ["invalid sub-domain"]}')
@@ -193,3 +635,72 @@ class TestRegisterEndpoints(unittest.TestCase):
         mock_response.json.return_value = {"some": "json"}
         response = self.app.post('/records/geometry/intersects', data=json.dumps({"some": "json"}), headers={"Host": "local-land-charge.something.gov"})
         self.assertEqual(response.data.decode(), '{"some": "json"}')
+
+    @patch('application.views.register_utils.validate_json')
+    @patch('application.views.register_utils.register_request')
+    def test_geometry_search_cached(self, mock_register_request, mock_validate_json):
+        mock_validate_json.return_value = {"errors": []}
+        mock_response = MagicMock()
+        mock_register_request.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"1": {"local-land-charge": "1"}}
+        mock_response.headers = {"Truncated": "True"}
+        square = {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]}
+        reversed_square = {"type": "Polygon", "coordinates": [[[0, 10], [10, 10], [10, 0], [0, 0], [0, 10]]]}
+        for geometry in (square, reversed_square):
+            response = self.app.post('/records/geometry/intersects', data=json.dumps(geometry), headers={"Host": "local-land-charge.something.gov"})
+            self.assertEqual(response.data.decode(), '{"1": {"local-land-charge": "1"}}')
+            self.assertEqual(response.headers['Truncated'], 'True')
+        self.assertEqual(mock_register_request.call_count, 1)
+        self.app.post('/records/geometry/within', data=json.dumps(square), headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(mock_register_request.call_count, 2)
+        register_utils.invalidate_record("local-land-charge", "2")
+        self.app.post('/records/geometry/intersects', data=json.dumps(square), headers={"Host": "local-land-charge.something.gov"})
+        self.assertEqual(mock_register_request.call_count, 3)
+
+
+class TestConcurrentRequests(unittest.TestCase):
+
+    def setUp(self):
+        app.config.from_object(os.environ.get('SETTINGS'))
+        register_utils.CURIE_CACHE.clear()
+
+    @patch('application.views.register_utils.register_request')
+    def test_concurrent_updates_validated_independently(self, mock_register_request):
+        def slow_register(sub_domain, end_point, parameters, method, json_payload, stream=False):
+            time.sleep(random.uniform(0, 0.02))
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            primary_id = end_point.split('/')[-1]
+            if method.lower() == 'get':
+                # Odd numbered records have been archived
+                record = {"statutory-provision": primary_id, "provision": "section", "statutory-instrument": "Act", "year": "1900"}
+                if int(primary_id) % 2:
+                    record["end-date"] = "2016-01-01"
+                mock_response.json.return_value = record
+            else:
+                mock_response.json.return_value = json_payload
+            return mock_response
+
+        mock_register_request.side_effect = slow_register
+        results = {}
+
+        def update(primary_id):
+            client = app.test_client()
+            response = client.put('/record/{}'.format(primary_id), headers={"Host": "statutory-provision.something.gov"},
+                                  data=json.dumps({"statutory-provision": str(primary_id), "provision": "section {}".format(primary_id),
+                                                   "statutory-instrument": "Act", "year": "1900"}),
+                                  content_type="application/json")
+            results[primary_id] = (response.status_code, json.loads(response.data.decode()))
+
+        threads = [threading.Thread(target=update, args=(primary_id,)) for primary_id in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for primary_id in range(20):
+            if primary_id % 2:
+                self.assertEqual(results[primary_id], (400, {"errors": ["Record has been archived, cannot update"]}))
+            else:
+                self.assertEqual(results[primary_id][0], 200)
+                self.assertEqual(results[primary_id][1]["provision"], "section {}".format(primary_id))
@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from application import write_queue
+from mock import MagicMock
+
+
+class TestWriteQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.send = MagicMock(return_value=(201, "1", None))
+        self.queues = []
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.stop()
+        self.directory.cleanup()
+
+    def queue(self, max_pending=10, history=100):
+        queue = write_queue.WriteQueue(self.directory.name, self.send, 2, max_pending, 3, 0, history)
+        self.queues.append(queue)
+        return queue
+
+    def test_submit_and_write(self):
+        queue = self.queue()
+        queue.start()
+        job = queue.submit('local-land-charge', 'POST', '/records', ['resolve=None'], {"a": "thing"})
+        self.assertEqual((job['id'][:2], job['state'], job['attempts']), ("0-", "queued", 0))
+        self.assertTrue(queue.wait(5))
+        sent = self.send.call_args[0][0]
+        self.assertEqual((sent['id'], sent['method'], sent['end-point'], sent['payload']), (job['id'], 'post', '/records', {"a": "thing"}))
+        job = queue.find(job['id'])
+        self.assertEqual((job['state'], job['attempts'], job['status'], job['record-id']), ("done", 1, 201, "1"))
+        self.assertNotIn('payload', job)
+        self.assertEqual(queue.stats()['done'], 1)
+
+    def test_retried(self):
+        self.send.side_effect = [ConnectionError("refused"), (503, None, "unavailable"), (201, "1", None)]
+        queue = self.queue()
+        queue.start()
+        job_id = queue.submit('local-land-charge', 'POST', '/records', [], {"a": "thing"})['id']
+        self.assertTrue(queue.wait(5))
+        job = queue.find(job_id)
+        self.assertEqual((job['state'], job['attempts'], job['status']), ("done", 3, 201))
+        self.assertEqual(queue.stats()['retries'], 2)
+
+    def test_failed(self):
+        self.send.side_effect = [(400, None, "invalid"), (503, None, "unavailable"), (503, None, "unavailable"), (503, None, "still unavailable")]
+        queue = self.queue()
+        queue.start()
+        invalid = queue.submit('local-land-charge', 'POST', '/records', [], {"a": "thing"})['id']
+        self.assertTrue(queue.wait(5))
+        unavailable = queue.submit('local-land-charge', 'POST', '/records', [], {"a": "thing"})['id']
+        self.assertTrue(queue.wait(5))
+        self.assertEqual({key: queue.find(invalid)[key] for key in ("state", "attempts", "status", "errors")},
+                         {"state": "failed", "attempts": 1, "status": 400, "errors": ["invalid"]})
+        self.assertEqual({key: queue.find(unavailable)[key] for key in ("state", "attempts", "status", "errors")},
+                         {"state": "failed", "attempts": 3, "status": 503, "errors": ["still unavailable"]})
+
+    def test_full(self):
+        release = threading.Event()
+        self.send.side_effect = lambda job: release.wait(5) and (201, "1", None)
+        queue = self.queue(max_pending=2)
+        queue.start()
+        queue.submit('local-land-charge', 'POST', '/records', [], {})
+        queue.submit('local-land-charge', 'POST', '/records', [], {})
+        self.assertRaises(write_queue.QueueFull, queue.submit, 'local-land-charge', 'POST', '/records', [], {})
+        release.set()
+        self.assertTrue(queue.wait(5))
+        queue.submit('local-land-charge', 'POST', '/records', [], {})
+        self.assertEqual(queue.stats()['rejected'], 1)
+
+    def test_updates_to_a_record_in_order(self):
+        sent = []
+        slow = threading.Event()
+
+        def send(job):
+            if job['payload']['v'] == 1:
+                slow.wait(0.2)
+            sent.append((job['end-point'], job['payload']['v']))
+            return 200, "1", None
+
+        self.send.side_effect = send
+        queue = write_queue.WriteQueue(self.directory.name, self.send, 4, 10, 3, 0, 100)
+        self.queues.append(queue)
+        queue.start()
+        queue.submit('local-land-charge', 'PUT', '/record/1', [], {"v": 1})
+        queue.submit('local-land-charge', 'PUT', '/record/1', [], {"v": 2})
+        queue.submit('local-land-charge', 'PUT', '/record/2', [], {"v": 3})
+        self.assertTrue(queue.wait(5))
+        # The other record's update is not held back
+        self.assertEqual(sent, [('/record/2', 3), ('/record/1', 1), ('/record/1', 2)])
+
+    def test_retried_update_holds_back_later_updates(self):
+        sent = []
+
+        def send(job):
+            sent.append(job['payload']['v'])
+            return (503, None, "unavailable") if sent == [1] else (200, "1", None)
+
+        self.send.side_effect = send
+        queue = write_queue.WriteQueue(self.directory.name, self.send, 4, 10, 3, 0.05, 100)
+        self.queues.append(queue)
+        queue.start()
+        first = queue.submit('local-land-charge', 'PUT', '/record/1', [], {"v": 1})['id']
+        queue.submit('local-land-charge', 'PUT', '/record/1', [], {"v": 2})
+        self.assertTrue(queue.wait(5))
+        self.assertEqual(sent, [1, 1, 2])
+        self.assertEqual(queue.find(first)['attempts'], 2)
+
+    def test_replayed_after_restart(self):
+        # Left by a process that stopped before writing its jobs
+        first, second = "0-first", "0-second"
+        with open(os.path.join(self.directory.name, "journal-0.jsonl"), 'w') as journal:
+            for job_id, method, end_point in ((first, "put", "/record/1"), (second, "post", "/records")):
+                journal.write(json.dumps({"id": job_id, "register": "local-land-charge", "method": method, "end-point": end_point, "parameters": [],
+                                          "payload": {}, "state": "queued", "attempts": 0, "status": None, "record-id": None, "errors": [],
+                                          "created": 1, "updated": 1}) + "\n")
+            journal.write(json.dumps({"id": first, "state": "running", "attempts": 1}) + "\n")
+            journal.write('{"id": "cut short')
+        restarted = self.queue()
+        restarted.start()
+        self.assertTrue(restarted.wait(5))
+        self.assertEqual(restarted.index, 0)
+        self.assertEqual([call[0][0]['id'] for call in self.send.call_args_list], [first, second])
+        self.assertEqual(restarted.find(first)['attempts'], 2)
+        self.assertEqual(restarted.find(second)['state'], "done")
+
+    def test_not_started(self):
+        queue = self.queue()
+        self.assertRaises(write_queue.QueueNotStarted, queue.submit, 'local-land-charge', 'POST', '/records', [], {})
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_journals_per_process(self):
+        first = self.queue()
+        first.start()
+        second = self.queue()
+        second.start()
+        self.assertEqual((first.index, second.index), (0, 1))
+        job_id = first.submit('local-land-charge', 'POST', '/records', [], {})['id']
+        self.assertTrue(first.wait(5))
+        # Reported from the journal it is recorded in
+        self.assertEqual(second.find(job_id)['state'], "done")
+        self.assertIsNone(second.find("1-unknown"))
+        self.assertIsNone(second.find("../unknown"))
+
+    def test_history_and_compaction(self):
+        queue = self.queue(history=2)
+        queue.start()
+        job_ids = [queue.submit('local-land-charge', 'POST', '/records', [], {})['id'] for _ in range(3)]
+        self.assertTrue(queue.wait(5))
+        self.assertEqual(len([job_id for job_id in job_ids if queue.find(job_id) is not None]), 2)
+        queue.stop()
+        restarted = self.queue(history=2)
+        restarted.start()
+        self.assertEqual(len(write_queue.read_journal(restarted.journal_path(0))), 2)
+        with open(restarted.journal_path(0)) as journal:
+            self.assertEqual(len(journal.readlines()), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, "journal-0.lock")))